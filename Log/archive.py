@@ -0,0 +1,175 @@
+import csv
+import io
+import json
+import os
+from datetime import datetime, timedelta
+from core.bloom import BloomFilter
+
+LOG_COLUMNS = ['id', 'level', 'message', 'module', 'user_id', 'created_at']
+MANIFEST_PREFIX = 'manifests/'
+ROW_GROUP_SIZE = 5000
+# Columns that get a bloom filter, with the number of distinct values each one is sized for
+BLOOM_COLUMNS = {'level': 16, 'module': 256, 'user_id': ROW_GROUP_SIZE}
+
+
+def manifest_name(filename):
+    """Object name of the manifest that describes the given log backup."""
+    return f"{MANIFEST_PREFIX}{filename}.json"
+
+
+class _CountingLines:
+    """Iterate a binary file line by line while tracking how many bytes were consumed."""
+
+    def __init__(self, fh):
+        self.fh = fh
+        self.offset = 0
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        line = self.fh.readline()
+        if not line:
+            raise StopIteration
+        self.offset += len(line)
+        return line.decode('utf-8')
+
+
+def _new_blooms(scale=1):
+    return {column: BloomFilter(capacity * scale) for column, capacity in BLOOM_COLUMNS.items()}
+
+
+def _new_row_group(offset):
+    return {'offset': offset, 'length': 0, 'row_count': 0, 'start': None, 'end': None, 'blooms': _new_blooms()}
+
+
+def _track(section, record, created_at):
+    section['row_count'] += 1
+    if section['start'] is None or created_at < section['start']:
+        section['start'] = created_at
+    if section['end'] is None or created_at > section['end']:
+        section['end'] = created_at
+    for column, bloom in section['blooms'].items():
+        bloom.add(record.get(column, ''))
+
+
+def _finish(section):
+    section['start'] = section['start'].isoformat() if section['start'] else None
+    section['end'] = section['end'].isoformat() if section['end'] else None
+    section['blooms'] = {column: bloom.to_dict() for column, bloom in section['blooms'].items()}
+    return section
+
+
+def build_manifest(filename, file_path, row_group_size=ROW_GROUP_SIZE):
+    """Scan a log backup CSV and describe its time range, bloom filters and row group byte ranges."""
+    manifest = {
+        'version': 1,
+        'object': filename,
+        'size': os.path.getsize(file_path),
+        'row_count': 0,
+        'start': None,
+        'end': None,
+        'blooms': _new_blooms(scale=4),
+        'row_groups': [],
+    }
+
+    with open(file_path, 'rb') as fh:
+        lines = _CountingLines(fh)
+        reader = csv.reader(lines)
+        header = next(reader, None) or LOG_COLUMNS
+        manifest['columns'] = header
+
+        group = _new_row_group(lines.offset)
+        for row in reader:
+            record = dict(zip(header, row))
+            created_at = datetime.fromisoformat(record['created_at'])
+            _track(manifest, record, created_at)
+            _track(group, record, created_at)
+            group['length'] = lines.offset - group['offset']
+
+            if group['row_count'] >= row_group_size:
+                manifest['row_groups'].append(_finish(group))
+                group = _new_row_group(lines.offset)
+
+        if group['row_count']:
+            manifest['row_groups'].append(_finish(group))
+
+    return _finish(manifest)
+
+
+def _may_match(section, start, end, filters):
+    """Use the time range and bloom filters of a manifest or row group to rule it out."""
+    if section['row_count'] == 0:
+        return False
+    if start is not None and section['end'] and datetime.fromisoformat(section['end']) < start:
+        return False
+    if end is not None and section['start'] and datetime.fromisoformat(section['start']) > end:
+        return False
+    for column, value in filters.items():
+        bloom = section['blooms'].get(column)
+        if bloom is not None and str(value) not in BloomFilter.from_dict(bloom):
+            return False
+    return True
+
+
+def _row_matches(record, start, end, filters, contains):
+    for column, value in filters.items():
+        if record.get(column) != str(value):
+            return False
+    if start is not None or end is not None:
+        created_at = datetime.fromisoformat(record['created_at'])
+        if start is not None and created_at < start:
+            return False
+        if end is not None and created_at > end:
+            return False
+    if contains and contains.lower() not in record.get('message', '').lower():
+        return False
+    return True
+
+
+def _read_manifest(minio_client, bucket_name, object_name):
+    response = minio_client.get_object(bucket_name, object_name)
+    try:
+        return json.loads(response.read())
+    finally:
+        response.close()
+        response.release_conn()
+
+
+def query_archive(minio_client, bucket_name, start=None, end=None, level=None, module=None, user_id=None, contains=None):
+    """
+    Yield archived log rows matching the filters.
+
+    Only manifests are listed; a backup is fetched only for the row groups whose
+    time range and bloom filters can match, and those byte ranges are parsed as a stream.
+    """
+    filters = {column: value for column, value in
+               (('level', level), ('module', module), ('user_id', user_id)) if value is not None}
+
+    # Backups are named after the time they were taken and only hold older rows,
+    # so anything written before the requested window (with a day of slack) is skipped
+    start_after = None
+    if start is not None:
+        start_after = MANIFEST_PREFIX + (start - timedelta(days=1)).strftime('%Y_%m_%d_%H_%M_%S')
+
+    for obj in minio_client.list_objects(bucket_name, prefix=MANIFEST_PREFIX, start_after=start_after):
+        manifest = _read_manifest(minio_client, bucket_name, obj.object_name)
+        if not _may_match(manifest, start, end, filters):
+            continue
+
+        header = manifest.get('columns', LOG_COLUMNS)
+        for group in manifest['row_groups']:
+            if not _may_match(group, start, end, filters):
+                continue
+
+            response = minio_client.get_object(
+                bucket_name, manifest['object'], offset=group['offset'], length=group['length']
+            )
+            try:
+                for row in csv.reader(io.TextIOWrapper(response, encoding='utf-8', newline='')):
+                    record = dict(zip(header, row))
+                    if _row_matches(record, start, end, filters, contains):
+                        yield record
+            finally:
+                response.close()
+                response.release_conn()
@@ -0,0 +1,171 @@
+import logging
+import os
+import random
+import re
+import threading
+import time
+
+# Ids, numbers and hex digests vary between otherwise identical messages
+_VARIABLE_PARTS = re.compile(r'[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}|\b[0-9a-f]{16,}\b|\d+', re.IGNORECASE)
+
+
+def message_template(record):
+    """Message of the record with variable parts masked, used to group identical messages."""
+    return _VARIABLE_PARTS.sub('#', str(record.msg))
+
+
+def _level(level):
+    return logging.getLevelName(level.upper()) if isinstance(level, str) else level
+
+
+class _CachedDecisionFilter(logging.Filter):
+    """
+    Base for filters attached to several handlers at once.
+
+    The decision is stored on the record the first time it is seen so every handler
+    keeps or drops the same records and rate limits count each record only once.
+    """
+
+    def __init__(self, loggers=None, levels=None):
+        super().__init__()
+        self.loggers = tuple(loggers) if loggers else ()
+        self.levels = {_level(level) for level in levels} if levels else None
+        self._attr = f'_log_filter_{id(self)}'
+
+    def applies_to(self, record):
+        if self.levels is not None and record.levelno not in self.levels:
+            return False
+        if self.loggers and not any(record.name == name or record.name.startswith(name + '.') for name in self.loggers):
+            return False
+        return True
+
+    def filter(self, record):
+        decision = getattr(record, self._attr, None)
+        if decision is None:
+            decision = self.decide(record) if self.applies_to(record) else True
+            setattr(record, self._attr, decision)
+        return decision
+
+    def decide(self, record):
+        raise NotImplementedError
+
+
+class SamplingFilter(_CachedDecisionFilter):
+    """
+    Keep only a fraction of records per level, e.g. rates={'INFO': 0.01}.
+
+    Levels without a rate are always kept. `patterns` limits sampling to records whose
+    message template matches one of the regular expressions.
+    """
+
+    def __init__(self, rates=None, patterns=None, loggers=None):
+        self.rates = {_level(level): float(rate) for level, rate in (rates or {}).items()}
+        super().__init__(loggers=loggers, levels=list(self.rates))
+        self.patterns = [re.compile(pattern) for pattern in patterns] if patterns else []
+
+    def decide(self, record):
+        rate = self.rates.get(record.levelno, 1.0)
+        if rate >= 1:
+            return True
+        if self.patterns and not any(pattern.search(str(record.msg)) for pattern in self.patterns):
+            return True
+        return random.random() < rate
+
+
+class RateLimitFilter(_CachedDecisionFilter):
+    """
+    Let at most `limit` identical records through per `period` seconds.
+
+    Records are identical when logger, level and message template match. Once a window
+    with dropped records has ended, a summary record with the suppressed count is
+    logged: when the template comes up again, when the window is pruned, or by a
+    background timer otherwise.
+    """
+
+    summary_attr = 'rate_limit_summary'
+    max_tracked = 1024
+
+    def __init__(self, limit=10, period=60, levels=None, loggers=None):
+        super().__init__(loggers=loggers, levels=levels)
+        self.limit = int(limit)
+        self.period = float(period)
+        self._windows = {}
+        self._lock = threading.Lock()
+        self._timer = None
+        if hasattr(os, 'register_at_fork'):
+            # Threads do not survive a fork, the child starts its own timer when it needs one
+            os.register_at_fork(after_in_child=self._reset_timer)
+
+    def applies_to(self, record):
+        return not getattr(record, self.summary_attr, False) and super().applies_to(record)
+
+    def decide(self, record):
+        template = message_template(record)
+        key = (record.name, record.levelno, template)
+        now = time.monotonic()
+        summaries = []
+
+        with self._lock:
+            window = self._windows.get(key)
+            if window is None or now - window['start'] >= self.period:
+                if window is not None and window['suppressed']:
+                    summaries.append((key, window))
+                if len(self._windows) >= self.max_tracked:
+                    summaries.extend(self._prune(now))
+                window = {'start': now, 'count': 0, 'suppressed': 0, 'origin': (record.pathname, record.lineno)}
+                self._windows[key] = window
+
+            window['count'] += 1
+            allowed = window['count'] <= self.limit
+            if not allowed:
+                window['suppressed'] += 1
+                self._ensure_timer()
+
+        self._log_summaries(summaries)
+        return allowed
+
+    def _prune(self, now):
+        """Drop ended windows and return the ones that still owe a summary."""
+        ended = [key for key, window in self._windows.items() if now - window['start'] >= self.period]
+        pending = []
+        for key in ended:
+            window = self._windows.pop(key)
+            if window['suppressed']:
+                pending.append((key, window))
+        return pending
+
+    def flush(self):
+        """Log the summaries of every ended window with dropped records."""
+        with self._lock:
+            summaries = self._prune(time.monotonic())
+        self._log_summaries(summaries)
+
+    def _ensure_timer(self):
+        # Called with the lock held
+        if self._timer is None or not self._timer.is_alive():
+            self._timer = threading.Thread(target=self._flush_periodically, name='log-rate-limit', daemon=True)
+            self._timer.start()
+
+    def _flush_periodically(self):
+        while True:
+            time.sleep(self.period)
+            self.flush()
+            with self._lock:
+                if not self._windows:
+                    self._timer = None
+                    return
+
+    def _reset_timer(self):
+        self._lock = threading.Lock()
+        self._timer = None
+
+    def _log_summaries(self, summaries):
+        for (name, levelno, template), window in summaries:
+            pathname, lineno = window['origin']
+            summary = logging.LogRecord(
+                name, levelno, pathname, lineno,
+                'Suppressed %d similar messages in the last %ds: %s',
+                (window['suppressed'], self.period, template), None,
+            )
+            setattr(summary, self.summary_attr, True)
+            logging.getLogger(name).handle(summary)
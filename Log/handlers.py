@@ -1,4 +1,13 @@
+import atexit
+import glob
+import gzip
 import logging
+import logging.handlers
+import os
+import queue
+import shutil
+import time
+from concurrent.futures import ThreadPoolExecutor
 
 class DatabaseLogHandler(logging.Handler):
     def emit(self, record):
@@ -12,3 +21,172 @@ class DatabaseLogHandler(logging.Handler):
             user_id=user_id,
         )
         log_entry.save()
+
+
+def process_log_name(filename, pid=None):
+    """Per-process name of a log file: logs/django_debug.log is written as logs/django_debug.<pid>.log."""
+    root, ext = os.path.splitext(filename)
+    return f"{root}.{pid or os.getpid()}{ext}"
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except OSError:
+        return True
+    return True
+
+
+class CompressingRotatingFileHandler(logging.handlers.RotatingFileHandler):
+    """
+    File handler that rotates by size and age, gzips rotated segments on a background
+    thread and deletes the oldest segments once the total size goes over max_total_bytes.
+
+    Every process writes and rotates its own file (see process_log_name), so web
+    workers, Celery children and beat never rotate over each other's segments. The
+    disk cap covers the files of every process and never deletes a live file of a
+    running process.
+    """
+
+    def __init__(self, filename, max_bytes=10 * 1024 * 1024, interval=24 * 60 * 60,
+                 max_total_bytes=200 * 1024 * 1024, encoding='utf-8', delay=False):
+        self.family = os.path.abspath(filename)
+        super().__init__(process_log_name(self.family), maxBytes=max_bytes, encoding=encoding, delay=delay)
+        self.interval = interval
+        self.max_total_bytes = max_total_bytes
+        self.rollover_at = time.time() + interval
+        self._compressor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='log-compress')
+
+    def shouldRollover(self, record):
+        if self.interval and time.time() >= self.rollover_at:
+            return True
+        return super().shouldRollover(record)
+
+    def doRollover(self):
+        if self.stream:
+            self.stream.close()
+            self.stream = None
+
+        if os.path.exists(self.baseFilename) and os.path.getsize(self.baseFilename) > 0:
+            segment = f"{self.baseFilename}.{time.strftime('%Y%m%d-%H%M%S')}"
+            suffix = 1
+            while os.path.exists(segment) or os.path.exists(segment + '.gz'):
+                segment = f"{self.baseFilename}.{time.strftime('%Y%m%d-%H%M%S')}-{suffix}"
+                suffix += 1
+            os.replace(self.baseFilename, segment)
+            self._compressor.submit(self._compress, segment)
+
+        self.rollover_at = time.time() + self.interval
+        if not self.delay:
+            self.stream = self._open()
+
+    def _compress(self, segment):
+        try:
+            with open(segment, 'rb') as source, gzip.open(segment + '.gz', 'wb') as target:
+                shutil.copyfileobj(source, target)
+            os.remove(segment)
+        except OSError:
+            pass
+        self._enforce_disk_cap()
+
+    def _family_files(self):
+        """(mtime, size, path, live pid or None) of the live files and segments of every process."""
+        root, ext = os.path.splitext(self.family)
+        files = []
+        for path in glob.glob(glob.escape(root) + '.*' + glob.escape(ext) + '*'):
+            pid = path[len(root) + 1:]
+            pid = pid[:-len(ext)] if ext and pid.endswith(ext) else None
+            try:
+                files.append((os.path.getmtime(path), os.path.getsize(path), path, int(pid) if pid and pid.isdigit() else None))
+            except OSError:
+                continue
+        return files
+
+    def _enforce_disk_cap(self):
+        files = self._family_files()
+        total = sum(size for _, size, _, _ in files)
+
+        # Oldest go first until everything fits in the budget again; a live file only once its process is gone
+        for _, size, path, pid in sorted(files):
+            if total <= self.max_total_bytes:
+                break
+            if pid is not None and (path == self.baseFilename or _pid_alive(pid)):
+                continue
+            try:
+                os.remove(path)
+                total -= size
+            except OSError:
+                continue
+
+    def close(self):
+        self._compressor.shutdown(wait=True)
+        super().close()
+
+
+class AsyncFileLogHandler(logging.handlers.QueueHandler):
+    """
+    Queue handler that hands records to a CompressingRotatingFileHandler running on a
+    QueueListener thread, so request threads never wait on disk I/O.
+
+    The queue is bounded; when the writer falls behind, records are dropped and counted
+    in `dropped`, and a warning with the count is written once there is room again.
+    Threads do not survive a fork, so a forked child (e.g. a Celery prefork worker)
+    starts its own queue, writer and listener on its own file.
+    """
+
+    def __init__(self, filename, max_bytes=10 * 1024 * 1024, interval=24 * 60 * 60,
+                 max_total_bytes=200 * 1024 * 1024, queue_size=10000):
+        directory = os.path.dirname(os.path.abspath(filename))
+        os.makedirs(directory, exist_ok=True)
+
+        super().__init__(queue.Queue(maxsize=queue_size))
+        self.filename = filename
+        self.options = {'max_bytes': max_bytes, 'interval': interval, 'max_total_bytes': max_total_bytes}
+        self.queue_size = queue_size
+        self.dropped = 0
+        self._reported = 0
+        self.listener = None
+        self._start()
+        atexit.register(self.close)
+        if hasattr(os, 'register_at_fork'):
+            os.register_at_fork(after_in_child=self._restart_in_child)
+
+    def _start(self):
+        self.target = CompressingRotatingFileHandler(self.filename, **self.options)
+        self.listener = logging.handlers.QueueListener(self.queue, self.target)
+        self.listener.start()
+
+    def _restart_in_child(self):
+        if self.listener is None:
+            return
+        # The parent's listener thread and compressor are gone here and its file is the parent's;
+        # the inherited stream is dropped without being flushed again
+        self.target.stream = None
+        self.createLock()
+        self.queue = queue.Queue(maxsize=self.queue_size)
+        self.dropped = self._reported = 0
+        self._start()
+
+    def enqueue(self, record):
+        try:
+            if self.dropped > self._reported:
+                self.queue.put_nowait(self._dropped_record(record))
+                self._reported = self.dropped
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def _dropped_record(self, record):
+        return logging.LogRecord(
+            record.name, logging.WARNING, __file__, 0,
+            'Dropped %d log records because the log writer fell behind', (self.dropped - self._reported,), None,
+        )
+
+    def close(self):
+        if self.listener is not None:
+            self.listener.stop()
+            self.listener = None
+            self.target.close()
+        super().close()
@@ -0,0 +1,50 @@
+import csv
+from datetime import datetime
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from Log.archive import LOG_COLUMNS, query_archive
+from core.task import initialize_minio_client
+
+
+def parse_datetime(value):
+    try:
+        parsed = datetime.fromisoformat(value)
+    except ValueError:
+        raise CommandError(f"Invalid datetime: {value}")
+    if timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed)
+    return parsed
+
+
+class Command(BaseCommand):
+    help = 'Search archived logs in MinIO using the per-file manifests and print matching rows as CSV'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--start', type=parse_datetime, help='Only rows created at or after this ISO datetime')
+        parser.add_argument('--end', type=parse_datetime, help='Only rows created at or before this ISO datetime')
+        parser.add_argument('--level', help='Exact log level, e.g. ERROR')
+        parser.add_argument('--module', help='Exact module name')
+        parser.add_argument('--user-id', help='Exact user id')
+        parser.add_argument('--contains', help='Case-insensitive substring of the message')
+
+    def handle(self, *args, **options):
+        minio_client = initialize_minio_client()
+        rows = query_archive(
+            minio_client,
+            settings.MINIO_BUCKET_NAME,
+            start=options['start'],
+            end=options['end'],
+            level=options['level'],
+            module=options['module'],
+            user_id=options['user_id'],
+            contains=options['contains'],
+        )
+
+        writer = csv.DictWriter(self.stdout, fieldnames=LOG_COLUMNS, extrasaction='ignore')
+        writer.writeheader()
+        count = 0
+        for row in rows:
+            writer.writerow(row)
+            count += 1
+        self.stderr.write(self.style.SUCCESS(f'{count} archived log rows matched'))
@@ -0,0 +1,235 @@
+import logging
+import os
+import tempfile
+from unittest import mock
+from django.test import SimpleTestCase
+from minio.error import S3Error
+from .filters import RateLimitFilter, SamplingFilter
+from .handlers import AsyncFileLogHandler, CompressingRotatingFileHandler, process_log_name
+from .uploads import UploadJournal, upload_file_resumable
+
+PART_SIZE = 4
+
+
+def no_such_upload():
+    return S3Error('NoSuchUpload', 'The specified upload does not exist', None, None, None, None)
+
+
+class FakeMinio:
+    """Keeps multipart uploads in memory, with the private methods minio 7.1.0 has."""
+
+    def __init__(self):
+        self.uploads = {}
+        self.objects = {}
+        self.sent_parts = []
+        self._ids = 0
+
+    def _create_multipart_upload(self, bucket_name, object_name, headers):
+        self._ids += 1
+        upload_id = f"upload-{self._ids}"
+        self.uploads[upload_id] = {}
+        return upload_id
+
+    def _upload_part(self, bucket_name, object_name, data, headers, upload_id, part_number):
+        if upload_id not in self.uploads:
+            raise no_such_upload()
+        self.uploads[upload_id][part_number] = data
+        self.sent_parts.append((upload_id, part_number))
+        return f"etag-{upload_id}-{part_number}"
+
+    def _complete_multipart_upload(self, bucket_name, object_name, upload_id, parts):
+        if upload_id not in self.uploads:
+            raise no_such_upload()
+        data = self.uploads.pop(upload_id)
+        self.objects[object_name] = b''.join(data[part.part_number] for part in parts)
+
+    def _abort_multipart_upload(self, bucket_name, object_name, upload_id):
+        self.uploads.pop(upload_id, None)
+
+    def fput_object(self, bucket_name, object_name, file_path, content_type=None, part_size=0):
+        with open(file_path, 'rb') as fh:
+            self.objects[object_name] = fh.read()
+
+
+class ResumableUploadTest(SimpleTestCase):
+    content = b'0123456789'
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.file_path = os.path.join(directory.name, 'logs.csv')
+        with open(self.file_path, 'wb') as fh:
+            fh.write(self.content)
+        self.journal = UploadJournal(directory.name)
+        self.client = FakeMinio()
+
+    def upload(self):
+        upload_file_resumable(self.client, 'bucket', 'logs.csv', self.file_path, self.journal, PART_SIZE)
+
+    def interrupted_upload(self):
+        """Journal and server state of an upload that crashed after its first part."""
+        upload_id = self.client._create_multipart_upload('bucket', 'logs.csv', {})
+        etag = self.client._upload_part('bucket', 'logs.csv', self.content[:PART_SIZE], {}, upload_id, 1)
+        self.journal.update('logs.csv', status='partial', upload_id=upload_id, size=len(self.content), part_size=PART_SIZE, parts={})
+        self.journal.record_part('logs.csv', 1, etag)
+        self.client.sent_parts = []
+        return upload_id
+
+    def test_resume_sends_only_missing_parts(self):
+        upload_id = self.interrupted_upload()
+
+        self.upload()
+
+        self.assertEqual(self.client.sent_parts, [(upload_id, 2), (upload_id, 3)])
+        self.assertEqual(self.client.objects['logs.csv'], self.content)
+        self.assertEqual(self.journal.get('logs.csv')['status'], 'completed')
+
+    def test_expired_upload_starts_again(self):
+        upload_id = self.interrupted_upload()
+        # The server dropped the upload, e.g. after its lifecycle expiry
+        del self.client.uploads[upload_id]
+
+        self.upload()
+
+        self.assertEqual([number for _, number in self.client.sent_parts], [1, 2, 3])
+        self.assertEqual(self.client.objects['logs.csv'], self.content)
+        entry = self.journal.get('logs.csv')
+        self.assertEqual(entry['status'], 'completed')
+        self.assertNotEqual(entry['upload_id'], upload_id)
+
+    def test_upload_aborted_during_a_fresh_upload_is_dropped_from_the_journal(self):
+        upload_part = self.client._upload_part
+
+        def abort_after_first_part(bucket_name, object_name, data, headers, upload_id, part_number):
+            etag = upload_part(bucket_name, object_name, data, headers, upload_id, part_number)
+            self.client._abort_multipart_upload(bucket_name, object_name, upload_id)
+            return etag
+
+        self.client._upload_part = abort_after_first_part
+        with self.assertRaises(S3Error):
+            self.upload()
+
+        self.assertIsNone(self.journal.get('logs.csv'))
+        self.assertNotIn('logs.csv', self.client.objects)
+
+    def test_completed_upload_is_skipped(self):
+        self.upload()
+        self.client.sent_parts = []
+
+        self.upload()
+
+        self.assertEqual(self.client.sent_parts, [])
+
+    def test_unsupported_minio_version_is_refused(self):
+        with mock.patch('minio.__version__', '8.0.0'):
+            with self.assertRaises(RuntimeError):
+                self.upload()
+
+
+def log_record(name, level, msg):
+    return logging.LogRecord(name, level, __file__, 1, msg, (), None)
+
+
+class SamplingFilterTest(SimpleTestCase):
+    def setUp(self):
+        self.sampler = SamplingFilter(rates={'INFO': 0}, patterns=[r'^(?!Success:|Error:)'], loggers=['django', 'core.MiddleWares'])
+
+    def test_request_lines_are_sampled(self):
+        self.assertFalse(self.sampler.filter(log_record('core.MiddleWares.middleware', logging.INFO, 'Request: GET /pujo/list')))
+        self.assertFalse(self.sampler.filter(log_record('django.server', logging.INFO, '"%s" %s %s')))
+
+    def test_audit_lines_errors_and_other_loggers_are_kept(self):
+        self.assertTrue(self.sampler.filter(log_record('django', logging.INFO, 'Success: Pujo created')))
+        self.assertTrue(self.sampler.filter(log_record('django', logging.ERROR, 'Internal Server Error')))
+        self.assertTrue(self.sampler.filter(log_record('user', logging.INFO, 'Request: GET /user')))
+
+
+class RateLimitFilterTest(SimpleTestCase):
+    def setUp(self):
+        self.limiter = RateLimitFilter(limit=2, period=60, levels=['ERROR'])
+        self.summaries = []
+        patcher = mock.patch.object(self.limiter, '_log_summaries', side_effect=self.summaries.extend)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        # The timer thread is not needed, flush() is called by hand
+        self.limiter._ensure_timer = lambda: None
+
+    def test_excess_records_are_dropped(self):
+        decisions = [self.limiter.filter(log_record('pujo', logging.ERROR, f'Error: pujo {index} not found')) for index in range(5)]
+        self.assertEqual(decisions, [True, True, False, False, False])
+
+    def test_summary_is_flushed_once_the_window_ends_without_a_repeat(self):
+        with mock.patch('Log.filters.time.monotonic', return_value=1000):
+            for index in range(5):
+                self.limiter.filter(log_record('pujo', logging.ERROR, f'Error: pujo {index} not found'))
+        with mock.patch('Log.filters.time.monotonic', return_value=1030):
+            self.limiter.flush()
+        self.assertEqual(self.summaries, [])
+
+        with mock.patch('Log.filters.time.monotonic', return_value=1061):
+            self.limiter.flush()
+        [(key, window)] = self.summaries
+        self.assertEqual(key, ('pujo', logging.ERROR, 'Error: pujo # not found'))
+        self.assertEqual(window['suppressed'], 3)
+
+    def test_pruning_keeps_pending_summaries(self):
+        self.limiter.max_tracked = 1
+        with mock.patch('Log.filters.time.monotonic', return_value=1000):
+            for _ in range(3):
+                self.limiter.filter(log_record('pujo', logging.ERROR, 'Error: first'))
+        with mock.patch('Log.filters.time.monotonic', return_value=1061):
+            self.limiter.filter(log_record('pujo', logging.ERROR, 'Error: second'))
+        self.assertEqual([(key[2], window['suppressed']) for key, window in self.summaries], [('Error: first', 1)])
+
+
+class ProcessLogFileTest(SimpleTestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.filename = os.path.join(directory.name, 'django_debug.log')
+
+    def write(self, path, size, age):
+        with open(path, 'wb') as fh:
+            fh.write(b'x' * size)
+        os.utime(path, (1000 + age, 1000 + age))
+
+    def test_disk_cap_keeps_live_files_of_running_processes(self):
+        handler = CompressingRotatingFileHandler(self.filename, max_total_bytes=250)
+        self.addCleanup(handler.close)
+        # No process has pid 2**22 + 1 on Linux (pid_max is at most 2**22)
+        dead_live_file = process_log_name(self.filename, pid=2 ** 22 + 1)
+        running_live_file = process_log_name(self.filename, pid=os.getppid())
+        old_segment = handler.baseFilename + '.20260101-000000.gz'
+        self.write(dead_live_file, 100, age=0)
+        self.write(running_live_file, 100, age=1)
+        self.write(old_segment, 100, age=2)
+
+        handler._enforce_disk_cap()
+
+        self.assertFalse(os.path.exists(dead_live_file))
+        self.assertTrue(os.path.exists(running_live_file))
+        self.assertTrue(os.path.exists(old_segment))
+
+    def test_forked_child_writes_its_own_file(self):
+        handler = AsyncFileLogHandler(self.filename, interval=0)
+        self.addCleanup(handler.close)
+        logger = logging.getLogger('log-handler-test')
+        logger.propagate = False
+        logger.addHandler(handler)
+        self.addCleanup(logger.removeHandler, handler)
+
+        pid = os.fork()
+        if pid == 0:
+            try:
+                logger.error('written by the child')
+                handler.close()
+            finally:
+                os._exit(0)
+        os.waitpid(pid, 0)
+        logger.error('written by the parent')
+        handler.close()
+
+        with open(process_log_name(self.filename, pid=pid)) as fh:
+            self.assertEqual(fh.read(), 'written by the child\n')
+        with open(process_log_name(self.filename)) as fh:
+            self.assertEqual(fh.read(), 'written by the parent\n')
@@ -0,0 +1,173 @@
+import hashlib
+import json
+import math
+import os
+import threading
+import minio
+from minio.datatypes import Part
+from minio.error import S3Error
+
+JOURNAL_NAME = '.upload_journal.json'
+
+
+class UploadJournal:
+    """Thread-safe record of finished and in-flight multipart uploads, persisted next to the backups."""
+
+    def __init__(self, directory):
+        self.path = os.path.join(directory, JOURNAL_NAME)
+        self._lock = threading.Lock()
+        try:
+            with open(self.path) as fh:
+                self._entries = json.load(fh)
+        except (FileNotFoundError, ValueError):
+            self._entries = {}
+
+    def get(self, filename):
+        with self._lock:
+            entry = self._entries.get(filename)
+            return json.loads(json.dumps(entry)) if entry is not None else None
+
+    def update(self, filename, **changes):
+        with self._lock:
+            self._entries.setdefault(filename, {}).update(changes)
+            self._flush()
+
+    def record_part(self, filename, part_number, etag):
+        with self._lock:
+            self._entries[filename].setdefault('parts', {})[str(part_number)] = etag
+            self._flush()
+
+    def discard(self, filename):
+        with self._lock:
+            if self._entries.pop(filename, None) is not None:
+                self._flush()
+
+    def _flush(self):
+        # Write to a temporary file first so a crash never leaves a truncated journal
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w') as fh:
+            json.dump(self._entries, fh)
+        os.replace(tmp_path, self.path)
+
+
+def file_etag(file_path, part_size):
+    """ETag MinIO reports for the file once it is uploaded by upload_file_resumable."""
+    digests = []
+    with open(file_path, 'rb') as fh:
+        while True:
+            chunk = fh.read(part_size)
+            if not chunk:
+                break
+            digests.append(hashlib.md5(chunk).digest())
+
+    if len(digests) <= 1:
+        return (digests[0] if digests else hashlib.md5(b'').digest()).hex()
+    # Multipart ETags are the MD5 of the concatenated part MD5s, suffixed with the part count
+    return f"{hashlib.md5(b''.join(digests)).hexdigest()}-{len(digests)}"
+
+
+class MultipartUploads:
+    """
+    The multipart calls upload_file_resumable needs from a Minio client.
+
+    minio only exposes them as private methods, so they are kept behind this adapter and
+    refused on minio versions they have not been checked against.
+    """
+
+    SUPPORTED_VERSIONS = ('7.1.',)
+
+    def __init__(self, minio_client):
+        if not minio.__version__.startswith(self.SUPPORTED_VERSIONS):
+            raise RuntimeError(f"Resumable uploads are not supported with minio {minio.__version__}")
+        self.client = minio_client
+
+    def put_file(self, bucket_name, object_name, file_path, content_type, part_size):
+        self.client.fput_object(bucket_name, object_name, file_path, content_type=content_type, part_size=part_size)
+
+    def create(self, bucket_name, object_name, content_type):
+        return self.client._create_multipart_upload(bucket_name, object_name, {'Content-Type': content_type})
+
+    def upload_part(self, bucket_name, object_name, upload_id, part_number, data):
+        return self.client._upload_part(bucket_name, object_name, data, {}, upload_id, part_number)
+
+    def complete(self, bucket_name, object_name, upload_id, parts):
+        """`parts` maps part numbers to their etags."""
+        self.client._complete_multipart_upload(
+            bucket_name, object_name, upload_id, [Part(number, parts[number]) for number in sorted(parts)]
+        )
+
+    def abort(self, bucket_name, object_name, upload_id):
+        self.client._abort_multipart_upload(bucket_name, object_name, upload_id)
+
+
+def _is_missing_upload(error):
+    return isinstance(error, S3Error) and error.code == 'NoSuchUpload'
+
+
+def upload_file_resumable(minio_client, bucket_name, filename, file_path, journal, part_size, content_type='application/csv'):
+    """
+    Upload a file, resuming an interrupted multipart upload recorded in the journal.
+
+    Files up to one part are sent with a single PUT; larger ones go through a multipart
+    upload whose parts are journaled as they finish so a crashed run only sends the rest.
+    A journaled upload the server no longer knows (expired or aborted) is started again once.
+    """
+    uploads = MultipartUploads(minio_client)
+    size = os.path.getsize(file_path)
+    entry = journal.get(filename)
+
+    if entry and (entry.get('size') != size or entry.get('part_size') != part_size):
+        # The file changed since the journal entry was written, start over
+        if entry.get('status') == 'partial' and entry.get('upload_id'):
+            try:
+                uploads.abort(bucket_name, filename, entry['upload_id'])
+            except S3Error:
+                pass
+        journal.discard(filename)
+        entry = None
+
+    if entry and entry.get('status') == 'completed':
+        print(f"File {filename} already uploaded according to the upload journal.")
+        return
+
+    if size <= part_size:
+        uploads.put_file(bucket_name, filename, file_path, content_type, part_size)
+        journal.update(filename, status='completed', size=size, part_size=part_size)
+        return
+
+    resuming = bool(entry and entry.get('upload_id'))
+    try:
+        _upload_parts(uploads, bucket_name, filename, file_path, journal, size, part_size, content_type, entry if resuming else None)
+    except S3Error as e:
+        if not _is_missing_upload(e):
+            raise
+        # The upload is gone on the server, so its journaled parts are useless
+        journal.discard(filename)
+        if not resuming:
+            raise
+        print(f"Upload of {filename} expired or was aborted on the server, starting it again.")
+        _upload_parts(uploads, bucket_name, filename, file_path, journal, size, part_size, content_type, None)
+
+
+def _upload_parts(uploads, bucket_name, filename, file_path, journal, size, part_size, content_type, entry):
+    if entry:
+        upload_id = entry['upload_id']
+        parts = {int(number): etag for number, etag in entry.get('parts', {}).items()}
+        print(f"Resuming upload of {filename} with {len(parts)} parts already sent.")
+    else:
+        upload_id = uploads.create(bucket_name, filename, content_type)
+        parts = {}
+        journal.update(filename, status='partial', upload_id=upload_id, size=size, part_size=part_size, parts={})
+
+    with open(file_path, 'rb') as fh:
+        for part_number in range(1, math.ceil(size / part_size) + 1):
+            if part_number in parts:
+                continue
+            fh.seek((part_number - 1) * part_size)
+            data = fh.read(part_size)
+            etag = uploads.upload_part(bucket_name, filename, upload_id, part_number, data)
+            journal.record_part(filename, part_number, etag)
+            parts[part_number] = etag
+
+    uploads.complete(bucket_name, filename, upload_id, parts)
+    journal.update(filename, status='completed')
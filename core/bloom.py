@@ -0,0 +1,47 @@
+import base64
+import hashlib
+import math
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter over string keys that serializes to a small dict."""
+
+    def __init__(self, capacity=1000, error_rate=0.01, size=None, hash_count=None, bits=None):
+        capacity = max(int(capacity), 1)
+        if size is None:
+            size = max(64, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        if hash_count is None:
+            hash_count = max(1, round(size / capacity * math.log(2)))
+        self.capacity = capacity
+        self.size = size
+        self.hash_count = hash_count
+        self.bits = bytearray(bits) if bits is not None else bytearray((size + 7) // 8)
+
+    def _positions(self, key):
+        # Double hashing: derive every probe position from one 128 bit digest
+        digest = hashlib.blake2b(str(key).encode('utf-8'), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return [(h1 + i * h2) % self.size for i in range(self.hash_count)]
+
+    def add(self, key):
+        for position in self._positions(key):
+            self.bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, key):
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(key))
+
+    def to_dict(self):
+        return {
+            'size': self.size,
+            'hash_count': self.hash_count,
+            'bits': base64.b64encode(bytes(self.bits)).decode('ascii'),
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(
+            size=data['size'],
+            hash_count=data['hash_count'],
+            bits=base64.b64decode(data['bits']),
+        )
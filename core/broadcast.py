@@ -0,0 +1,44 @@
+from django.conf import settings
+
+
+class LocalBroadcast:
+    """In-process stand-in for Redis pub/sub, used when no REDIS_URL is configured."""
+
+    # Messages never reach other processes, so callers cannot rely on it to invalidate their caches
+    shared = False
+
+    def __init__(self, channel):
+        self.channel = channel
+        self._subscribers = []
+
+    def publish(self, message):
+        for callback in list(self._subscribers):
+            callback(message)
+
+    def subscribe(self, callback):
+        self._subscribers.append(callback)
+
+
+class RedisBroadcast:
+    """Redis pub/sub channel used to tell every process about a change."""
+
+    shared = True
+
+    def __init__(self, url, channel):
+        import redis
+        self.client = redis.Redis.from_url(url)
+        self.channel = channel
+
+    def publish(self, message):
+        self.client.publish(self.channel, message)
+
+    def subscribe(self, callback):
+        pubsub = self.client.pubsub(ignore_subscribe_messages=True)
+        pubsub.subscribe(**{self.channel: lambda message: callback(message['data'].decode('utf-8'))})
+        pubsub.run_in_thread(sleep_time=1, daemon=True)
+
+
+def get_broadcast(channel):
+    """Redis pub/sub for the channel when REDIS_URL is set, an in-process stand-in otherwise."""
+    url = settings.REDIS_URL
+    return RedisBroadcast(url, channel) if url else LocalBroadcast(channel)
@@ -0,0 +1,189 @@
+import csv
+import datetime
+import logging
+import zlib
+import orjson
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.db.models import F
+from django.db.models.functions import Coalesce
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from rest_framework import status
+from rest_framework.negotiation import BaseContentNegotiation
+from rest_framework.response import Response
+from rest_framework.views import APIView
+from core.renderers import ORJSONRenderer
+from core.ResponseStatus import ResponseStatus
+from pujo.catalogue import accepted_encodings
+from pujo.models import Pujo
+from reviews.models import Review
+from user.authentication import ClaimsJWTAuthentication
+from user.permission import IsSuperOrAdminUser
+
+logger = logging.getLogger("export")
+
+# Per dataset: the rows, the exported (key, column) pairs and the expression filtered by ?updated_since/until
+EXPORTS = {
+    'pujos': {
+        'queryset': lambda: Pujo.objects.all(),
+        'columns': (
+            ('id', 'id'), ('name', 'display_name'), ('address', 'display_address'), ('city', 'display_city'),
+            ('zone', 'display_zone'), ('lat', 'lat'), ('lon', 'lon'), ('search_score', 'search_score'),
+            ('created_at', 'created_at'), ('updated_at', 'updated_at'),
+        ),
+        # Pujos that were never edited have no updated_at
+        'updated': Coalesce(F('updated_at'), F('created_at')),
+    },
+    'reviews': {
+        'queryset': lambda: Review.objects.all(),
+        'columns': (
+            ('id', 'id'), ('pujo_id', 'pujo_id'), ('user_id', 'user_id'), ('review', 'review'),
+            ('is_edited', 'is_edited'), ('created_at', 'created_at'), ('edited_at', 'edited_at'),
+        ),
+        'updated': Coalesce(F('edited_at'), F('created_at')),
+    },
+}
+CONTENT_TYPES = {
+    'csv': 'text/csv; charset=utf-8',
+    'ndjson': 'application/x-ndjson',
+}
+
+
+class _Echo:
+    """File-like object whose write() hands the line back instead of buffering it, for csv.writer."""
+
+    def write(self, value):
+        return value
+
+
+def _csv_value(value):
+    if value is None:
+        return ''
+    if isinstance(value, (datetime.date, datetime.datetime)):
+        return value.isoformat()
+    return value
+
+
+def csv_lines(keys, rows):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(keys).encode('utf-8')
+    for row in rows:
+        yield writer.writerow([_csv_value(value) for value in row]).encode('utf-8')
+
+
+def ndjson_lines(keys, rows):
+    for row in rows:
+        yield orjson.dumps(dict(zip(keys, row))) + b'\n'
+
+
+def batched(lines, size):
+    """Join lines into blocks of about `size` bytes so the server is not written to once per row."""
+    block, length = [], 0
+    for line in lines:
+        block.append(line)
+        length += len(line)
+        if length >= size:
+            yield b''.join(block)
+            block, length = [], 0
+    if block:
+        yield b''.join(block)
+
+
+def gzipped(blocks):
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+    for block in blocks:
+        compressed = compressor.compress(block)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+
+async def async_blocks(blocks):
+    """
+    Async iterator over the blocks of a sync generator, for ASGI servers: Django reads a
+    sync iterator in full before sending it. Every block is produced on the thread that
+    owns the request's database connection, which the server-side cursor lives on.
+    """
+    step = sync_to_async(next, thread_sensitive=True)
+    try:
+        while (block := await step(blocks, None)) is not None:
+            yield block
+    finally:
+        await sync_to_async(blocks.close, thread_sensitive=True)()
+
+
+class URLFormatNegotiation(BaseContentNegotiation):
+    """
+    The export format comes from the URL, so any Accept header (text/csv,
+    application/x-ndjson, ...) is served; error responses are always JSON.
+    """
+
+    def select_parser(self, request, parsers):
+        return parsers[0] if parsers else None
+
+    def select_renderer(self, request, renderers, format_suffix=None):
+        return renderers[0], renderers[0].media_type
+
+
+def _parse_moment(value, name):
+    moment = parse_datetime(value)
+    if moment is None:
+        day = parse_date(value)
+        if day is None:
+            raise ValueError(f"{name} must be an ISO 8601 date or datetime")
+        moment = datetime.datetime.combine(day, datetime.time.min)
+    if timezone.is_naive(moment):
+        moment = timezone.make_aware(moment)
+    return moment
+
+
+class ExportView(APIView):
+    """
+    Stream every pujo or review as CSV or NDJSON, e.g. for nightly partner dumps.
+
+    Rows are read through a server-side cursor and written as they arrive, so memory stays
+    flat and the first bytes go out right away, under WSGI and ASGI. ?updated_since and ?updated_until (ISO 8601)
+    limit the rows to those created or edited in that range. The body is gzipped when the
+    client accepts it.
+    """
+    permission_classes = [IsSuperOrAdminUser]
+    authentication_classes = [ClaimsJWTAuthentication]
+    renderer_classes = [ORJSONRenderer]
+    content_negotiation_class = URLFormatNegotiation
+
+    def get(self, request, dataset, file_format):
+        export = EXPORTS[dataset]
+        queryset = export['queryset']()
+        try:
+            for param, lookup in (('updated_since', 'gte'), ('updated_until', 'lt')):
+                if request.query_params.get(param):
+                    moment = _parse_moment(request.query_params[param], param)
+                    queryset = queryset.alias(export_updated=export['updated']).filter(**{f'export_updated__{lookup}': moment})
+        except ValueError as e:
+            response_data = {
+                'error': str(e),
+                'status': ResponseStatus.FAIL.value
+            }
+            logger.error(f"Error: {response_data['error']}", extra={'user_id': request.user.id})
+            return Response(response_data, status=status.HTTP_400_BAD_REQUEST)
+
+        keys = [key for key, _ in export['columns']]
+        rows = queryset.order_by('pk').values_list(*[column for _, column in export['columns']]).iterator(chunk_size=settings.EXPORT_CHUNK_SIZE)
+        lines = csv_lines(keys, rows) if file_format == 'csv' else ndjson_lines(keys, rows)
+        body = batched(lines, settings.EXPORT_BLOCK_SIZE)
+
+        compress = accepted_encodings(request.headers.get('Accept-Encoding', '')).get('gzip', 0.0) > 0
+        body = gzipped(body) if compress else body
+        if isinstance(request._request, ASGIRequest):
+            body = async_blocks(body)
+        response = StreamingHttpResponse(body, content_type=CONTENT_TYPES[file_format])
+        if compress:
+            response['Content-Encoding'] = 'gzip'
+        response['Content-Disposition'] = f'attachment; filename="{dataset}.{file_format}"'
+        response['Vary'] = 'Accept-Encoding'
+        response['Cache-Control'] = 'no-store'
+        logger.info(f"Streaming {dataset}.{file_format} export", extra={'user_id': request.user.id})
+        return response
@@ -0,0 +1,93 @@
+import base64
+import json
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+
+
+def encode_cursor(values):
+    return base64.urlsafe_b64encode(json.dumps(values, default=str).encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor):
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+    except (ValueError, TypeError):
+        raise ValueError("Invalid cursor")
+    if not isinstance(values, list):
+        raise ValueError("Invalid cursor")
+    return values
+
+
+def requested_fields(params, allowed):
+    """Response keys asked for with ?fields=a,b in the order of `allowed`, or None when the param is absent."""
+    value = params.get('fields')
+    if not value:
+        return None
+    requested = {name.strip() for name in value.split(',') if name.strip()}
+    unknown = requested - set(allowed)
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(sorted(unknown))}")
+    return [name for name in allowed if name in requested]
+
+
+class KeysetPaginator:
+    """
+    Cursor pagination that seeks past the last row of the previous page instead of using OFFSET.
+
+    `ordering` must end in a unique field and none of its fields may be NULL. The cursor is
+    an opaque encoding of the ordering values of the last row returned.
+    """
+
+    def __init__(self, ordering=('id',), page_size=50, max_page_size=200):
+        self.ordering = tuple(ordering)
+        self.fields = [field.lstrip('-') for field in self.ordering]
+        self.page_size = page_size
+        self.max_page_size = max_page_size
+
+    def requested(self, params):
+        """Pagination is opt-in: only requests with a cursor or limit get pages."""
+        return 'cursor' in params or 'limit' in params
+
+    def get_page_size(self, params):
+        try:
+            size = int(params.get('limit', self.page_size))
+        except (TypeError, ValueError):
+            raise ValueError("limit must be an integer")
+        return max(1, min(size, self.max_page_size))
+
+    def _after(self, values):
+        if len(values) != len(self.ordering):
+            raise ValueError("Invalid cursor")
+        # (a, b) > (x, y) is a > x OR (a = x AND b > y); descending fields flip the comparison
+        condition = Q()
+        for index, field in enumerate(self.ordering):
+            lookup = 'lt' if field.startswith('-') else 'gt'
+            clause = Q(**{f'{self.fields[index]}__{lookup}': values[index]})
+            for name, value in zip(self.fields[:index], values[:index]):
+                clause &= Q(**{name: value})
+            condition |= clause
+        return condition
+
+    def _values(self, row):
+        if isinstance(row, dict):
+            return [row[field] for field in self.fields]
+        return [getattr(row, field) for field in self.fields]
+
+    def paginate(self, queryset, params, key=None):
+        """
+        Return the rows of the page selected by the `cursor` and `limit` params and the cursor of the next page.
+
+        `key` extracts the ordering values from a row when rows are neither dicts nor model instances.
+        """
+        size = self.get_page_size(params)
+        queryset = queryset.order_by(*self.ordering)
+        cursor = params.get('cursor')
+        if cursor:
+            try:
+                queryset = queryset.filter(self._after(decode_cursor(cursor)))
+            except (ValidationError, TypeError, ValueError):
+                raise ValueError("Invalid cursor")
+
+        rows = list(queryset[:size + 1])
+        next_cursor = encode_cursor((key or self._values)(rows[size - 1])) if len(rows) > size else None
+        return rows[:size], next_cursor
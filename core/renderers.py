@@ -0,0 +1,62 @@
+import msgpack
+import orjson
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+# Converts what orjson and msgpack do not handle natively (Decimal, lazy strings, querysets...) the way DRF does
+_encoder = JSONEncoder()
+
+
+class ORJSONRenderer(JSONRenderer):
+    """JSONRenderer backed by orjson, which encodes UUIDs and datetimes natively."""
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        renderer_context = renderer_context or {}
+        option = orjson.OPT_NON_STR_KEYS
+        if self.get_indent(accepted_media_type, renderer_context):
+            option |= orjson.OPT_INDENT_2
+        return orjson.dumps(data, default=_encoder.default, option=option)
+
+
+class ColumnarJSONRenderer(ORJSONRenderer):
+    """
+    JSON with list results laid out as one array per field instead of one object per row.
+
+    `result` becomes {"count": n, "columns": {"field": [...]}}; keys repeated on every
+    row are sent once. Results that are not lists of objects are left as they are.
+    """
+
+    media_type = 'application/vnd.pujoatlas.columnar+json'
+    format = 'columnar'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if isinstance(data, dict) and isinstance(data.get('result'), list):
+            data = dict(data, result=columnar(data['result']))
+        return super().render(data, accepted_media_type, renderer_context)
+
+
+def columnar(rows):
+    if not all(isinstance(row, dict) for row in rows):
+        return rows
+    # Union of the keys in first-seen order; rows of one endpoint normally share them all
+    fields = {}
+    for row in rows:
+        fields.update(dict.fromkeys(row))
+    return {
+        'count': len(rows),
+        'columns': {field: [row.get(field) for row in rows] for field in fields},
+    }
+
+
+class MessagePackRenderer(BaseRenderer):
+    media_type = 'application/msgpack'
+    format = 'msgpack'
+    charset = None
+    render_style = 'binary'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        return msgpack.packb(data, default=_encoder.default, use_bin_type=True)
@@ -25,6 +25,14 @@ BASE_DIR = Path(__file__).resolve().parent.parent
 
 STATIC_URL = '/static/'  # Add a leading slash and trailing slash
 STATIC_ROOT = BASE_DIR / 'staticfiles'
+# Static files are gzipped and brotli-compressed by collectstatic and served by whitenoise
+STORAGES = {
+    'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+    'staticfiles': {'BACKEND': 'whitenoise.storage.CompressedStaticFilesStorage'},
+}
+
+# Local working directory for log backups before they are shipped to MinIO
+MEDIA_ROOT = config('MEDIA_ROOT', default=str(BASE_DIR / 'media'))
 
 # Quick-start development settings - unsuitable for production
 # See https://docs.djangoproject.com/en/5.1/howto/deployment/checklist/
@@ -47,19 +55,89 @@ INSTALLED_APPS = [
     'pandal',
     'pujo',
     'user',
-    'reviews'
+    'reviews',
+    'jobs',
 ]
 
 AUTH_USER_MODEL = 'user.User'
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'user.authentication.ClaimsJWTAuthentication',
+    ),
+    # Picked from the Accept header (or ?format=); the first one answers clients that accept anything
+    'DEFAULT_RENDERER_CLASSES': (
+        'core.renderers.ORJSONRenderer',
+        'core.renderers.ColumnarJSONRenderer',
+        'core.renderers.MessagePackRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
     ),
     'DEFAULT_SCHEMA_CLASS': 'drf_spectacular.openapi.AutoSchema',
     'EXCEPTION_HANDLER': 'core.exceptions.custom_exception_handler',
 }
 
+# Optional Redis, used to broadcast token blacklist and user changes between processes;
+# without it every token is checked against the blacklist table and every user is read from the database
+REDIS_URL = config('REDIS_URL', default='')
+
+# Shared cache when Redis is available, otherwise a per-process one
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
+# Serialized pujos are cached per id for this many seconds and dropped when a pujo changes
+PUJO_CACHE_TTL = config('PUJO_CACHE_TTL', default=300, cast=int)
+# Pre-rendered /pujo/list snapshots are kept this long; clients may reuse a response for PUJO_CATALOGUE_MAX_AGE seconds
+PUJO_CATALOGUE_TTL = config('PUJO_CATALOGUE_TTL', default=24 * 60 * 60, cast=int)
+PUJO_CATALOGUE_MAX_AGE = config('PUJO_CATALOGUE_MAX_AGE', default=60, cast=int)
+# Without Redis every process re-reads the catalogue version from the database this often
+PUJO_CATALOGUE_VERSION_TTL = config('PUJO_CATALOGUE_VERSION_TTL', default=5, cast=int)
+# Deleted pujos are reported by /pujo/changes for this many days; older clients get a full resync
+PUJO_TOMBSTONE_RETENTION_DAYS = config('PUJO_TOMBSTONE_RETENTION_DAYS', default=30, cast=int)
+# Deltas larger than this are answered with a full resync instead
+PUJO_CHANGES_MAX_ROWS = config('PUJO_CHANGES_MAX_ROWS', default=500, cast=int)
+# Largest number of ids accepted by /pujo/batch
+PUJO_BATCH_MAX_IDS = config('PUJO_BATCH_MAX_IDS', default=200, cast=int)
+# Rows sent to Postgres per COPY by the bulk pujo import
+PUJO_IMPORT_CHUNK_SIZE = config('PUJO_IMPORT_CHUNK_SIZE', default=5000, cast=int)
+
+# Rows read or written per chunk by admin import/export jobs, and how long their download links stay valid
+DATA_JOB_CHUNK_SIZE = config('DATA_JOB_CHUNK_SIZE', default=2000, cast=int)
+DATA_JOB_LINK_TTL = config('DATA_JOB_LINK_TTL', default=60 * 60, cast=int)
+
+# Rows fetched per server-side cursor round trip by /export, and bytes written to the client at a time
+EXPORT_CHUNK_SIZE = config('EXPORT_CHUNK_SIZE', default=2000, cast=int)
+EXPORT_BLOCK_SIZE = config('EXPORT_BLOCK_SIZE', default=64 * 1024, cast=int)
+
+# In-process Bloom filter and LRU in front of the BlacklistedToken table
+TOKEN_BLACKLIST_CAPACITY = config('TOKEN_BLACKLIST_CAPACITY', default=100000, cast=int)
+TOKEN_BLACKLIST_ERROR_RATE = config('TOKEN_BLACKLIST_ERROR_RATE', default=0.001, cast=float)
+TOKEN_BLACKLIST_CACHE_SIZE = config('TOKEN_BLACKLIST_CACHE_SIZE', default=10000, cast=int)
+TOKEN_BLACKLIST_NEGATIVE_TTL = config('TOKEN_BLACKLIST_NEGATIVE_TTL', default=30, cast=int)
+TOKEN_BLACKLIST_REBUILD_SECONDS = config('TOKEN_BLACKLIST_REBUILD_SECONDS', default=15 * 60, cast=int)
+
+# Build request.user from token claims instead of loading the users row on every request
+JWT_CLAIMS_USER = config('JWT_CLAIMS_USER', default=True, cast=bool)
+# Seconds a user state read from the database is reused before it is read again
+USER_STATE_CACHE_TTL = config('USER_STATE_CACHE_TTL', default=60, cast=int)
+
+# Password hashing for logins runs on this many threads; logins beyond the threads plus the queue get a 503
+LOGIN_HASH_WORKERS = config('LOGIN_HASH_WORKERS', default=os.cpu_count() or 2, cast=int)
+LOGIN_QUEUE_SIZE = config('LOGIN_QUEUE_SIZE', default=32, cast=int)
+
+# Largest number of queued collection operations accepted by /user/collections/batch
+COLLECTION_BATCH_MAX_OPERATIONS = config('COLLECTION_BATCH_MAX_OPERATIONS', default=500, cast=int)
+
 SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(hours=6),
     'REFRESH_TOKEN_LIFETIME': timedelta(days=1),
@@ -76,6 +154,8 @@ SIMPLE_JWT = {
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    # Serves STATIC_ROOT (after collectstatic) itself, so uvicorn needs no separate static file server
+    'whitenoise.middleware.WhiteNoiseMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     "corsheaders.middleware.CorsMiddleware",
     "core.MiddleWares.middleware.LoggingMiddleware",
@@ -149,6 +229,9 @@ MINIO_URL = config('MINIO_URL')
 MINIO_ACCESS_KEY = config('MINIO_ACCESS_KEY')
 MINIO_SECRET_KEY = config('MINIO_SECRET_KEY')
 MINIO_BUCKET_NAME = config('MINIO_BUCKET_NAME')
+# Parallel uploads of leftover log backups and multipart part size (at least 5 MiB)
+LOG_BACKUP_UPLOAD_WORKERS = config('LOG_BACKUP_UPLOAD_WORKERS', default=4, cast=int)
+LOG_BACKUP_PART_SIZE = config('LOG_BACKUP_PART_SIZE', default=8 * 1024 * 1024, cast=int)
 
 # SECURITY WARNING: keep the secret key used in production secret!
 SECRET_KEY = get_random_secret_key()
@@ -187,6 +270,16 @@ AUTH_PASSWORD_VALIDATORS = [
 
 # logger
 
+# Fraction of the per-request INFO lines of the django, pujo and request loggers kept (1 keeps everything)
+LOG_INFO_SAMPLE_RATE = config('LOG_INFO_SAMPLE_RATE', default=0.01, cast=float)
+# Identical warnings/errors let through per minute before they are summarised
+LOG_ERROR_RATE_LIMIT = config('LOG_ERROR_RATE_LIMIT', default=10, cast=int)
+# Log file rotation: size and age of the live file, and the disk budget for it and its gzipped segments
+LOG_DIR = config('LOG_DIR', default=str(BASE_DIR / 'logs'))
+LOG_FILE_MAX_BYTES = config('LOG_FILE_MAX_BYTES', default=20 * 1024 * 1024, cast=int)
+LOG_FILE_ROTATE_SECONDS = config('LOG_FILE_ROTATE_SECONDS', default=6 * 60 * 60, cast=int)
+LOG_DIR_MAX_BYTES = config('LOG_DIR_MAX_BYTES', default=500 * 1024 * 1024, cast=int)
+
 LOGGING = {
     'version': 1,
     'disable_existing_loggers': False,
@@ -200,19 +293,42 @@ LOGGING = {
             'style': '{',
         },
     },
+    'filters': {
+        # Keep a fraction of the per-request INFO lines; Success:/Error: audit lines are never sampled
+        'sample_info': {
+            '()': 'Log.filters.SamplingFilter',
+            'rates': {'INFO': LOG_INFO_SAMPLE_RATE},
+            'patterns': [r'^(?!Success:|Error:)'],
+            'loggers': ['django', 'pujo', 'core.MiddleWares'],
+        },
+        # At most N identical warnings/errors per minute, then a suppressed-count summary
+        'rate_limit_errors': {
+            '()': 'Log.filters.RateLimitFilter',
+            'limit': LOG_ERROR_RATE_LIMIT,
+            'period': 60,
+            'levels': ['WARNING', 'ERROR', 'CRITICAL'],
+        },
+    },
     'handlers': {
         'console': {
             'class': 'logging.StreamHandler',
             'formatter': 'verbose',
+            'filters': ['sample_info', 'rate_limit_errors'],
         },
+        # Every process writes its own logs/django_debug.<pid>.log, the disk cap covers all of them
         'file': {
-            'class': 'logging.FileHandler',
-            'filename': 'django_debug.log',
+            'class': 'Log.handlers.AsyncFileLogHandler',
+            'filename': os.path.join(LOG_DIR, 'django_debug.log'),
+            'max_bytes': LOG_FILE_MAX_BYTES,
+            'interval': LOG_FILE_ROTATE_SECONDS,
+            'max_total_bytes': LOG_DIR_MAX_BYTES,
             'formatter': 'verbose',
+            'filters': ['sample_info', 'rate_limit_errors'],
         },
          'database': {
             'class': 'Log.handlers.DatabaseLogHandler',
             'formatter': 'verbose',
+            'filters': ['sample_info', 'rate_limit_errors'],
         },
     },
     'loggers': {
@@ -235,6 +351,23 @@ LOGGING = {
             'level': 'INFO',
             'propagate': False,
         },
+        # Access lines of runserver, sampled instead of printed in full by Django's own handler
+        'django.server': {
+            'handlers': ['console', 'file'],
+            'level': 'INFO',
+            'propagate': False,
+        },
+        # One INFO line per request, sampled and kept out of the database
+        'core.MiddleWares': {
+            'handlers': ['console', 'file'],
+            'level': 'INFO',
+            'propagate': False,
+        },
+        'export': {
+            'handlers': ['console', 'file' , 'database'],
+            'level': 'INFO',
+            'propagate': False,
+        },
     },
 }
 
@@ -251,6 +384,14 @@ CELERY_BEAT_SCHEDULE = {
         'task': 'core.task.backup_logs_to_minio',
         'schedule': crontab(hour='4', minute='30'),  # Every day at 4:30 AM
     },
+    'compact-pujo-tombstones': {
+        'task': 'core.task.compact_pujo_tombstones',
+        'schedule': crontab(hour='3', minute='45'),  # Every day at 3:45 AM
+    },
+    'purge-blacklisted-tokens': {
+        'task': 'core.task.purge_expired_blacklisted_tokens',
+        'schedule': crontab(minute='15'),  # Every hour at quarter past
+    },
 }
 
 
@@ -0,0 +1,33 @@
+import csv
+import io
+import os
+
+SPREADSHEET_FORMATS = ('csv', 'xlsx')
+
+
+def file_format(path):
+    extension = os.path.splitext(path)[1].lower().lstrip('.')
+    if extension not in SPREADSHEET_FORMATS:
+        raise ValueError(f"Unsupported file type: {extension or path}")
+    return extension
+
+
+def read_csv(fileobj):
+    reader = csv.reader(io.TextIOWrapper(fileobj, encoding='utf-8-sig', newline=''))
+    yield from reader
+
+
+def read_xlsx(fileobj):
+    # openpyxl comes with tablib's xlsx support; read-only mode streams the sheet instead of loading it
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(fileobj, read_only=True, data_only=True)
+    try:
+        yield from workbook.active.iter_rows(values_only=True)
+    finally:
+        workbook.close()
+
+
+def read_rows(fileobj, path):
+    """Rows of a .csv or .xlsx file (header first), one at a time."""
+    return read_xlsx(fileobj) if file_format(path) == 'xlsx' else read_csv(fileobj)
@@ -1,14 +1,25 @@
 from celery import shared_task
 from django.utils import timezone
-from pujo.models import Pujo, LastScoreModel
+from pujo.models import Pujo, LastScoreModel, PujoTombstone, TombstoneCompaction
+from pujo.catalogue import current_version, get_snapshot
 from datetime import datetime, timedelta
 import csv
 import os
 from datetime import datetime
 from django.conf import settings
+from django.db import transaction
+from django.db.models import Max
 from minio import Minio
+from minio.error import S3Error
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from Log.models import Log
+from jobs.runner import run_job
+from user.models import BlacklistedToken
+from Log.archive import build_manifest, manifest_name
+from Log.uploads import UploadJournal, file_etag, upload_file_resumable
 from decouple import config
+import io
+import json
 
 
 @shared_task
@@ -31,7 +42,7 @@ def update_pujo_scores():
 
         # Update the pujo's score and make sure it does not go belowe zero
         pujo.search_score = max(pujo.search_score - score_sum, 0)
-        pujo.save()
+        pujo.save(update_fields=['search_score'])
 
         # Remove all previous last scores
         last_scores.delete()
@@ -39,6 +50,36 @@ def update_pujo_scores():
         # Log the score summation - the new score
         LastScoreModel.objects.create(pujo=pujo, value=-score_sum)
 
+@shared_task
+def build_pujo_catalogue():
+    # Builds nothing if a request (or an earlier task) already rendered the current version
+    snapshot = get_snapshot(current_version())
+    print(f"Pujo catalogue version {snapshot['version']} is ready")
+
+@shared_task
+def compact_pujo_tombstones():
+    # Clients that synced before the newest removed tombstone can no longer be sent a delta
+    cutoff = timezone.now() - timedelta(days=settings.PUJO_TOMBSTONE_RETENTION_DAYS)
+    horizon = PujoTombstone.objects.filter(deleted_at__lt=cutoff).aggregate(Max('version'))['version__max']
+    if horizon is None:
+        return
+    with transaction.atomic():
+        deleted, _ = PujoTombstone.objects.filter(version__lte=horizon).delete()
+        TombstoneCompaction.objects.create(version=horizon)
+    print(f"Compacted {deleted} pujo tombstones up to version {horizon}")
+
+@shared_task
+def run_data_job(job_id):
+    # Admin imports and exports; progress and errors are kept on the DataJob row
+    job = run_job(job_id)
+    print(f"{job} finished with {job.rows_processed} rows")
+
+@shared_task
+def purge_expired_blacklisted_tokens():
+    # Expired tokens are rejected by signature validation anyway, so their rows can go
+    deleted, _ = BlacklistedToken.objects.filter(expires_at__lte=timezone.now()).delete()
+    print(f"Purged {deleted} expired blacklisted tokens")
+
 # MinIO configuration
 # Load environment variables from the .env file
 
@@ -51,12 +92,20 @@ def backup_logs_to_minio():
 
     # Directory to save CSV files
     local_backup_dir = settings.MEDIA_ROOT
+    os.makedirs(local_backup_dir, exist_ok=True)
+
+    # Make sure the bucket exists once instead of before every upload
+    if not minio_client.bucket_exists(settings.MINIO_BUCKET_NAME):
+        minio_client.make_bucket(settings.MINIO_BUCKET_NAME)
+
+    # Shared journal of finished and partial uploads so an interrupted run can resume
+    journal = UploadJournal(local_backup_dir)
 
     # Step 1: Upload any existing local CSV files
-    upload_existing_csv_files(minio_client, local_backup_dir)
+    upload_existing_csv_files(minio_client, local_backup_dir, journal)
 
     # Step 2: Create a new CSV file with logs older than 20 minutes and upload it
-    create_and_upload_log_backup(minio_client, local_backup_dir)
+    create_and_upload_log_backup(minio_client, local_backup_dir, journal)
 
 def initialize_minio_client():
     """Initialize and return a MinIO client."""
@@ -67,20 +116,33 @@ def initialize_minio_client():
         secure=True  # This is set to True because of the https URL
     )
 
-def upload_existing_csv_files(minio_client, local_backup_dir):
-    """Check and upload any existing CSV files in the backup directory to MinIO."""
-    for file in os.listdir(local_backup_dir):
-        if file.endswith("_logs.csv"):
-            file_path = os.path.join(local_backup_dir, file)
+def upload_existing_csv_files(minio_client, local_backup_dir, journal):
+    """Upload any existing CSV files in the backup directory to MinIO through a bounded thread pool."""
+    files = [file for file in os.listdir(local_backup_dir) if file.endswith("_logs.csv")]
+    if not files:
+        return
+
+    with ThreadPoolExecutor(max_workers=settings.LOG_BACKUP_UPLOAD_WORKERS) as executor:
+        futures = {
+            executor.submit(backup_existing_csv_file, minio_client, file, os.path.join(local_backup_dir, file), journal): file
+            for file in files
+        }
+        for future in as_completed(futures):
+            file = futures[future]
             try:
-                print(f"Found an existing CSV file to backup: {file}")
-                upload_file_to_minio(minio_client, file, file_path)
-                verify_and_delete_local_file(minio_client, file, file_path)
+                future.result()
             except Exception as e:
                 print(f"Failed to upload file {file} to MinIO: {str(e)}")
                 # Keep the local file in case of failure
 
-def create_and_upload_log_backup(minio_client, local_backup_dir):
+def backup_existing_csv_file(minio_client, file, file_path, journal):
+    """Upload one leftover CSV file with its manifest and remove it once verified."""
+    print(f"Found an existing CSV file to backup: {file}")
+    upload_file_to_minio(minio_client, file, file_path, journal)
+    upload_manifest_to_minio(minio_client, file, file_path)
+    verify_and_delete_local_file(minio_client, file, file_path, journal)
+
+def create_and_upload_log_backup(minio_client, local_backup_dir, journal):
     """Create a new CSV file with logs older than 20 minutes and upload it to MinIO."""
     # Filename with the current date and time
     filename = datetime.now().strftime('%Y_%m_%d_%H_%M_%S') + "_logs.csv"
@@ -89,20 +151,22 @@ def create_and_upload_log_backup(minio_client, local_backup_dir):
     # Calculate the time buffer (20 minutes)
     buffer_time = timezone.now() - timedelta(minutes=20)
 
-    # Fetch logs that were created more than 20 minutes ago
-    logs = Log.objects.filter(created_at__lt=buffer_time)
+    # Fetch logs that were created more than 20 minutes ago, oldest first so the
+    # manifest row groups cover tight, non-overlapping time ranges
+    logs = Log.objects.filter(created_at__lt=buffer_time).order_by('created_at')
 
     # Create a CSV file and write log data
     with open(file_path, 'w', newline='') as csvfile:
         writer = csv.writer(csvfile)
         writer.writerow(['id', 'level', 'message', 'module', 'user_id', 'created_at'])  # Write headers
-        for log in logs:  # Write data rows
+        for log in logs.iterator(chunk_size=2000):  # Write data rows
             writer.writerow([log.id, log.level, log.message, log.module, log.user_id, log.created_at])
 
     # Upload the newly created CSV file to MinIO
     try:
-        upload_file_to_minio(minio_client, filename, file_path)
-        verify_and_delete_local_file(minio_client, filename, file_path)
+        upload_file_to_minio(minio_client, filename, file_path, journal)
+        upload_manifest_to_minio(minio_client, filename, file_path)
+        verify_and_delete_local_file(minio_client, filename, file_path, journal)
         # Delete logs from the database if backup is successful
         logs.delete()
         print(f"Logs older than 20 minutes successfully deleted from the database.")
@@ -110,27 +174,49 @@ def create_and_upload_log_backup(minio_client, local_backup_dir):
         print(f"Failed to upload file {filename} to MinIO: {str(e)}")
         # Keep the local file in case of failure
 
-def upload_file_to_minio(minio_client, filename, file_path):
-    """Upload a file to MinIO bucket."""
-    if not minio_client.bucket_exists(settings.MINIO_BUCKET_NAME):
-        minio_client.make_bucket(settings.MINIO_BUCKET_NAME)
-
-    minio_client.fput_object(
+def upload_file_to_minio(minio_client, filename, file_path, journal):
+    """Upload a file to MinIO bucket, resuming a partial upload recorded in the journal."""
+    upload_file_resumable(
+        minio_client,
         settings.MINIO_BUCKET_NAME,
         filename,
         file_path,
+        journal,
+        settings.LOG_BACKUP_PART_SIZE,
         content_type='application/csv'
     )
     print(f"File {filename} uploaded to MinIO bucket {settings.MINIO_BUCKET_NAME} successfully.")
 
-def verify_and_delete_local_file(minio_client, filename, file_path):
-    """Verify if the file is in MinIO and delete the local copy if successful."""
-    objects = minio_client.list_objects(settings.MINIO_BUCKET_NAME, prefix=filename)
-    file_found = any(obj.object_name == filename for obj in objects)
+def upload_manifest_to_minio(minio_client, filename, file_path):
+    """Build the query manifest of a log backup and upload it next to the backup."""
+    manifest = json.dumps(build_manifest(filename, file_path)).encode('utf-8')
+    minio_client.put_object(
+        settings.MINIO_BUCKET_NAME,
+        manifest_name(filename),
+        io.BytesIO(manifest),
+        length=len(manifest),
+        content_type='application/json'
+    )
+    print(f"Manifest for {filename} uploaded to MinIO bucket {settings.MINIO_BUCKET_NAME} successfully.")
+
+def verify_and_delete_local_file(minio_client, filename, file_path, journal):
+    """Verify the file in MinIO by size and checksum and delete the local copy if they match."""
+    try:
+        stat = minio_client.stat_object(settings.MINIO_BUCKET_NAME, filename)
+    except S3Error:
+        stat = None
 
-    if file_found:
+    expected_etag = file_etag(file_path, settings.LOG_BACKUP_PART_SIZE)
+    if stat is not None and stat.size == os.path.getsize(file_path) and stat.etag.strip('"') == expected_etag:
         print(f"File {filename} verified in MinIO bucket {settings.MINIO_BUCKET_NAME}.")
         os.remove(file_path)
+        journal.discard(filename)
         print(f"Local file {filename} successfully deleted after backup.")
-    else:
+    elif stat is None:
         print(f"Verification failed: File {filename} not found in MinIO bucket {settings.MINIO_BUCKET_NAME}.")
+        # Upload again on the next run
+        journal.discard(filename)
+    else:
+        print(f"Verification failed: File {filename} in MinIO bucket {settings.MINIO_BUCKET_NAME} does not match the local checksum.")
+        # Upload again on the next run
+        journal.discard(filename)
@@ -0,0 +1,34 @@
+import gzip
+from django.test import TestCase
+from django.urls import reverse
+from pujo.models import Pujo
+from user.models import User
+from user.tokens import UserRefreshToken
+
+
+class ExportViewTest(TestCase):
+    def setUp(self):
+        admin = User.objects.create_user(username='exporter', email='exporter@example.com', password='secret', user_type='admin')
+        self.auth = {'HTTP_AUTHORIZATION': f"Bearer {UserRefreshToken.for_user(admin).access_token}"}
+        self.pujos = [
+            Pujo.objects.create(name=f"pujo {index}", lat=22.5, lon=88.3, address=f"{index} lake road", city="kolkata", zone="south")
+            for index in range(3)
+        ]
+        self.url = reverse('export', kwargs={'dataset': 'pujos', 'file_format': 'csv'})
+
+    def test_wsgi_streams_a_sync_iterator(self):
+        response = self.client.get(self.url, HTTP_ACCEPT_ENCODING='gzip', **self.auth)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.is_async)
+        lines = gzip.decompress(b''.join(response.streaming_content)).decode('utf-8').splitlines()
+        self.assertEqual(lines[0].split(',')[:2], ['id', 'name'])
+        self.assertEqual(len(lines), 1 + len(self.pujos))
+
+    async def test_asgi_streams_an_async_iterator(self):
+        response = await self.async_client.get(self.url, headers={'Authorization': self.auth['HTTP_AUTHORIZATION']})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.is_async)
+        body = b''.join([block async for block in response.streaming_content])
+        self.assertEqual(len(body.decode('utf-8').splitlines()), 1 + len(self.pujos))
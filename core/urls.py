@@ -21,6 +21,7 @@ from django.urls import path, re_path, include
 from rest_framework import permissions
 from drf_spectacular.views import SpectacularAPIView, SpectacularSwaggerView
 from user.views import LoginView, LogoutView, CustomTokenRefreshView  # Import the login and logout views
+from core.exports import ExportView
 from django.conf import settings
 from django.conf.urls.static import static
 
@@ -46,6 +47,7 @@ urlpatterns = [
     path('login', LoginView.as_view(), name='login'),  # Direct login path
     path('logout', LogoutView.as_view(), name='logout'),  # Direct logout path
     path('api/token/refresh', CustomTokenRefreshView.as_view(), name='token_refresh'),
+    re_path(r'^export/(?P<dataset>pujos|reviews)\.(?P<file_format>csv|ndjson)$', ExportView.as_view(), name='export'),
     path('api/schema/', SpectacularAPIView.as_view(), name='schema'),  # OpenAPI schema
     path('swagger/', SpectacularSwaggerView.as_view(url_name='schema'), name='swagger-ui')
     # path('swagger/', schema_view.with_ui('swagger', cache_timeout=0), name='schema-swagger-ui'),
@@ -0,0 +1,144 @@
+import uuid
+from datetime import timedelta
+from django import forms
+from django.conf import settings
+from django.contrib import admin, messages
+from django.core.exceptions import PermissionDenied
+from django.shortcuts import get_object_or_404, redirect
+from django.template.response import TemplateResponse
+from django.urls import path, reverse
+from django.utils.html import format_html
+from core.spreadsheets import file_format
+from .models import DataJob
+
+
+class SpreadsheetUploadForm(forms.Form):
+    file = forms.FileField(help_text='A .csv or .xlsx file with a header row.')
+
+    def clean_file(self):
+        file = self.cleaned_data['file']
+        try:
+            file_format(file.name)
+        except ValueError as e:
+            raise forms.ValidationError(str(e))
+        return file
+
+
+class BackgroundImportExportMixin:
+    """
+    Admin import and export of `resource_class` as DataJob Celery jobs instead of inside the request.
+
+    Exports are streamed to a CSV file in MinIO and downloaded from the job; imports are
+    uploaded to MinIO and read back by the worker in chunks.
+    """
+    change_list_template = 'admin/jobs/change_list.html'
+
+    def get_urls(self):
+        info = (self.model._meta.app_label, self.model._meta.model_name)
+        urls = [
+            path('background-import/', self.admin_site.admin_view(self.background_import_view), name='%s_%s_background_import' % info),
+            path('background-export/', self.admin_site.admin_view(self.background_export_view), name='%s_%s_background_export' % info),
+        ]
+        return urls + super().get_urls()
+
+    def resource_path(self):
+        return f"{self.resource_class.__module__}.{self.resource_class.__name__}"
+
+    def background_import_view(self, request):
+        if not (self.has_add_permission(request) and self.has_change_permission(request)):
+            raise PermissionDenied
+
+        form = SpreadsheetUploadForm(request.POST or None, request.FILES or None)
+        if request.method == 'POST' and form.is_valid():
+            from core.task import initialize_minio_client
+
+            file = form.cleaned_data['file']
+            job_id = uuid.uuid4()
+            object_name = f"jobs/{job_id}-input.{file_format(file.name)}"
+            try:
+                minio_client = initialize_minio_client()
+                if not minio_client.bucket_exists(settings.MINIO_BUCKET_NAME):
+                    minio_client.make_bucket(settings.MINIO_BUCKET_NAME)
+                minio_client.put_object(settings.MINIO_BUCKET_NAME, object_name, file, length=file.size)
+            except Exception as e:
+                messages.error(request, f"Could not upload {file.name}: {str(e)}")
+            else:
+                return self.start_job(request, id=job_id, kind=DataJob.IMPORT, file_name=file.name, object_name=object_name)
+
+        return self.job_form(request, 'Import in background', form, 'Import',
+                             'The file is imported by a worker in chunks; each chunk is committed on its own.')
+
+    def background_export_view(self, request):
+        if not self.has_view_permission(request):
+            raise PermissionDenied
+
+        if request.method == 'POST':
+            return self.start_job(request, kind=DataJob.EXPORT, file_name=f"{self.model._meta.model_name}_export.csv")
+
+        return self.job_form(request, 'Export in background', None, 'Export',
+                             f"Every {self.model._meta.verbose_name} is written to a CSV file by a worker; it can be downloaded from the job when it is done.")
+
+    def start_job(self, request, **fields):
+        from core.task import run_data_job
+
+        job = DataJob.objects.create(resource=self.resource_path(), created_by=request.user, **fields)
+        try:
+            run_data_job.delay(str(job.pk))
+        except Exception as e:
+            DataJob.objects.filter(pk=job.pk).update(status=DataJob.FAILED, error=f"Could not queue the job: {str(e)}")
+            messages.error(request, f"Could not queue the job: {str(e)}")
+        else:
+            messages.success(request, f"{job} queued.")
+        return redirect('admin:jobs_datajob_change', job.pk)
+
+    def job_form(self, request, title, form, submit, description):
+        context = {
+            **self.admin_site.each_context(request),
+            'opts': self.model._meta,
+            'title': title,
+            'form': form,
+            'submit': submit,
+            'description': description,
+        }
+        return TemplateResponse(request, 'admin/jobs/job_form.html', context)
+
+
+class DataJobAdmin(admin.ModelAdmin):
+    list_display = ['__str__', 'status', 'rows_processed', 'rows_total', 'created_by', 'created_at', 'finished_at', 'download']
+    list_filter = ['kind', 'status', 'resource']
+    readonly_fields = [field.name for field in DataJob._meta.fields] + ['download']
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def get_urls(self):
+        urls = [
+            path('<uuid:job_id>/download/', self.admin_site.admin_view(self.download_view), name='jobs_datajob_download'),
+        ]
+        return urls + super().get_urls()
+
+    @admin.display(description='File')
+    def download(self, job):
+        if job.kind != DataJob.EXPORT or job.status != DataJob.DONE:
+            return '-'
+        return format_html('<a href="{}">Download</a>', reverse('admin:jobs_datajob_download', args=[job.pk]))
+
+    def download_view(self, request, job_id):
+        """Redirect to a short-lived MinIO link so the file never passes through this process."""
+        from core.task import initialize_minio_client
+
+        job = get_object_or_404(DataJob, pk=job_id, kind=DataJob.EXPORT, status=DataJob.DONE)
+        if not self.has_view_permission(request, job):
+            raise PermissionDenied
+        url = initialize_minio_client().presigned_get_object(
+            settings.MINIO_BUCKET_NAME,
+            job.object_name,
+            expires=timedelta(seconds=settings.DATA_JOB_LINK_TTL),
+            response_headers={'response-content-disposition': f'attachment; filename="{job.file_name}"'},
+        )
+        return redirect(url)
+
+admin.site.register(DataJob, DataJobAdmin)
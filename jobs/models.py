@@ -0,0 +1,47 @@
+from django.conf import settings
+from django.db import models
+import uuid
+
+
+class DataJob(models.Model):
+    """An admin import or export of an import-export resource, run by a Celery worker."""
+    IMPORT = 'import'
+    EXPORT = 'export'
+    KIND_CHOICES = (
+        (IMPORT, 'Import'),
+        (EXPORT, 'Export'),
+    )
+    PENDING = 'pending'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUS_CHOICES = (
+        (PENDING, 'Pending'),
+        (RUNNING, 'Running'),
+        (DONE, 'Done'),
+        (FAILED, 'Failed'),
+    )
+
+    id = models.UUIDField(default=uuid.uuid4, editable=False, unique=True, primary_key=True)
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    # Dotted path of the resource class, e.g. pujo.resource.PujoResource
+    resource = models.CharField(max_length=200)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=PENDING)
+    # Uploaded file for imports, produced file for exports
+    file_name = models.CharField(max_length=255, blank=True)
+    object_name = models.CharField(max_length=255, blank=True)
+    rows_total = models.IntegerField(null=True, blank=True)
+    rows_processed = models.IntegerField(default=0)
+    # Import totals per row type (new, update, skip, error, invalid...) and the first row errors
+    result = models.JSONField(default=dict, blank=True)
+    error = models.TextField(blank=True)
+    created_by = models.ForeignKey(settings.AUTH_USER_MODEL, null=True, blank=True, on_delete=models.SET_NULL, related_name='data_jobs')
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"{self.get_kind_display()} of {self.resource.rsplit('.', 1)[-1]} ({self.status})"
@@ -0,0 +1,143 @@
+import csv
+import os
+import tempfile
+from contextlib import contextmanager
+from itertools import islice
+import tablib
+from django.conf import settings
+from django.db import connections
+from django.utils import timezone
+from django.utils.module_loading import import_string
+from core.spreadsheets import file_format, read_rows
+from .models import DataJob
+
+# Row errors kept on a job; the totals still count every one
+MAX_REPORTED_ERRORS = 50
+
+
+def _chunks(rows, size):
+    rows = iter(rows)
+    while True:
+        chunk = list(islice(rows, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def _update(job, **fields):
+    # Field-level update so progress writes never overwrite each other
+    for name, value in fields.items():
+        setattr(job, name, value)
+    DataJob.objects.filter(pk=job.pk).update(**fields)
+
+
+@contextmanager
+def _committed_progress(job):
+    """
+    Progress callback that writes rows_processed on a connection of its own, for work that
+    runs in one transaction (a bulk import): written through that transaction, progress
+    would only show once the import is over.
+    """
+    connection = connections.create_connection(DataJob.objects.db)
+    quote = connection.ops.quote_name
+    sql = "UPDATE {table} SET {column} = %s WHERE {pk} = %s".format(
+        table=quote(DataJob._meta.db_table),
+        column=quote(DataJob._meta.get_field('rows_processed').column),
+        pk=quote(DataJob._meta.pk.column),
+    )
+
+    def progress(processed):
+        job.rows_processed = processed
+        with connection.cursor() as cursor:
+            cursor.execute(sql, [processed, job.pk])
+
+    try:
+        yield progress
+    finally:
+        connection.close()
+
+
+def run_job(job_id):
+    """Run a pending job to completion and return it; a failed job keeps its error."""
+    from core.task import initialize_minio_client
+
+    job = DataJob.objects.get(pk=job_id)
+    _update(job, status=DataJob.RUNNING, started_at=timezone.now(), error='')
+    minio_client = initialize_minio_client()
+    try:
+        if job.kind == DataJob.EXPORT:
+            run_export(job, minio_client)
+        else:
+            run_import(job, minio_client)
+    except Exception as e:
+        _update(job, status=DataJob.FAILED, error=str(e), finished_at=timezone.now())
+        raise
+    _update(job, status=DataJob.DONE, finished_at=timezone.now())
+    return job
+
+
+def run_export(job, minio_client):
+    """Write the resource's rows to a CSV file one chunk at a time and upload it."""
+    resource = import_string(job.resource)()
+    queryset = resource.get_queryset().order_by('pk')
+    _update(job, rows_total=queryset.count())
+
+    os.makedirs(settings.MEDIA_ROOT, exist_ok=True)
+    with tempfile.NamedTemporaryFile('w', suffix='.csv', dir=settings.MEDIA_ROOT, newline='', encoding='utf-8') as output:
+        writer = csv.writer(output)
+        processed = 0
+        # Only one chunk of model instances and rendered rows is in memory at a time
+        for chunk in _chunks(queryset.iterator(chunk_size=settings.DATA_JOB_CHUNK_SIZE), settings.DATA_JOB_CHUNK_SIZE):
+            dataset = resource.export(queryset=chunk)
+            if not processed:
+                writer.writerow(dataset.headers)
+            writer.writerows(dataset)
+            processed += len(chunk)
+            _update(job, rows_processed=processed)
+        if not processed:
+            writer.writerow(resource.export(queryset=[]).headers)
+        output.flush()
+
+        object_name = f"jobs/{job.pk}.csv"
+        minio_client.fput_object(settings.MINIO_BUCKET_NAME, object_name, output.name, content_type='text/csv')
+    _update(job, object_name=object_name)
+
+
+def run_import(job, minio_client):
+    """Download the uploaded file and import it chunk by chunk, each chunk in its own transaction."""
+    resource = import_string(job.resource)()
+    with tempfile.TemporaryDirectory() as directory:
+        file_path = os.path.join(directory, f"input.{file_format(job.file_name)}")
+        minio_client.fget_object(settings.MINIO_BUCKET_NAME, job.object_name, file_path)
+        with open(file_path, 'rb') as fileobj:
+            rows = read_rows(fileobj, file_path)
+            if hasattr(resource, 'bulk_import'):
+                # Resources with a set-based import handle the whole file themselves, in one transaction
+                with _committed_progress(job) as progress:
+                    totals = resource.bulk_import(rows, progress=progress)
+                _update(job, result={'totals': totals, 'errors': []})
+            else:
+                _import_chunks(job, resource, rows)
+    # Kept on failure so the import can be retried
+    minio_client.remove_object(settings.MINIO_BUCKET_NAME, job.object_name)
+
+
+def _import_chunks(job, resource, rows):
+    rows = iter(rows)
+    headers = [str(name).strip() if name is not None else '' for name in next(rows, [])]
+    totals, errors, processed = {}, [], 0
+
+    for chunk in _chunks(rows, settings.DATA_JOB_CHUNK_SIZE):
+        # xlsx rows can be shorter or longer than the header
+        dataset = tablib.Dataset(*[(tuple(row) + (None,) * len(headers))[:len(headers)] for row in chunk], headers=headers)
+        result = resource.import_data(dataset, dry_run=False, raise_errors=False, use_transactions=True)
+
+        for name, count in result.totals.items():
+            totals[name] = totals.get(name, 0) + count
+        messages = [str(error.error) for error in result.base_errors]
+        messages += [f"Row {processed + number}: {error.error}" for number, row_errors in result.row_errors() for error in row_errors]
+        messages += [f"Row {processed + row.number}: {row.error_dict}" for row in result.invalid_rows]
+        errors.extend(messages[:MAX_REPORTED_ERRORS - len(errors)])
+
+        processed += len(chunk)
+        _update(job, rows_processed=processed, result={'totals': totals, 'errors': errors})
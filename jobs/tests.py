@@ -0,0 +1,35 @@
+from django.db import connections
+from django.test import TransactionTestCase
+from pujo.resource import PujoResource
+from .models import DataJob
+from .runner import _committed_progress
+
+
+class CommittedProgressTest(TransactionTestCase):
+    def rows_processed_seen_elsewhere(self, job):
+        connection = connections.create_connection('default')
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT rows_processed FROM jobs_datajob WHERE id = %s", [job.pk])
+                return cursor.fetchone()[0]
+        finally:
+            connection.close()
+
+    def test_bulk_import_progress_is_visible_before_commit(self):
+        job = DataJob.objects.create(kind=DataJob.IMPORT, resource='pujo.resource.PujoResource', status=DataJob.RUNNING)
+        rows = [['name', 'address', 'city', 'zone']] + [[f"pujo {index}", f"{index} lake road", 'kolkata', 'south'] for index in range(5)]
+        seen = []
+
+        with _committed_progress(job) as progress:
+            def observed(processed):
+                progress(processed)
+                self.assertTrue(connections['default'].in_atomic_block)
+                seen.append(self.rows_processed_seen_elsewhere(job))
+
+            with self.settings(PUJO_IMPORT_CHUNK_SIZE=2):
+                totals = PujoResource().bulk_import(rows, progress=observed)
+
+        self.assertEqual(seen, [2, 4, 5])
+        self.assertEqual(totals['new'], 5)
+        job.refresh_from_db()
+        self.assertEqual(job.rows_processed, 5)
@@ -1,9 +1,9 @@
-from import_export.admin import ImportExportModelAdmin
 from django.contrib import admin 
+from jobs.admin import BackgroundImportExportMixin
 from . import resource as pandal_resource  
 from . import models as pandal_models
 
-class PandalAdmin(ImportExportModelAdmin):
+class PandalAdmin(BackgroundImportExportMixin, admin.ModelAdmin):
     resource_class = pandal_resource.PandalResource
     list_display = ['name', 'zone']
 
@@ -1,10 +1,10 @@
-from import_export.admin import ImportExportModelAdmin
 from django.contrib import admin 
+from jobs.admin import BackgroundImportExportMixin
 from . import resource as pujo_resource  
 from . import models as pujo_models
 
-class PujoAdmin(ImportExportModelAdmin):
+class PujoAdmin(BackgroundImportExportMixin, admin.ModelAdmin):
     resource_class = pujo_resource.PujoResource
     list_display = [field.name for field in pujo_models.Pujo._meta.fields]
 
-admin.site.register(pujo_models.Pujo, PujoAdmin)
\ No newline at end of file
+admin.site.register(pujo_models.Pujo, PujoAdmin)
@@ -0,0 +1,216 @@
+import csv
+import io
+import itertools
+import uuid
+from collections import namedtuple
+from django.conf import settings
+from django.db import connection, transaction
+from core.spreadsheets import read_rows
+from .cache import invalidate_pujos
+from .models import Pujo, stamp_catalogue_version
+
+# Spreadsheet columns read by the import; others (e.g. from an admin export) are ignored
+IMPORT_COLUMNS = ('id', 'name', 'lat', 'lon', 'address', 'city', 'zone')
+REQUIRED_COLUMNS = ('name', 'address', 'city', 'zone')
+# Left as they are on existing pujos when the file has no such column
+OPTIONAL_COLUMNS = ('lat', 'lon')
+TEXT_COLUMNS = ('name', 'address', 'city', 'zone', *Pujo.DISPLAY_FIELDS.values())
+# Column order of the staging table; `keyed` tells whether the id came from the file
+STAGING_COLUMNS = ('line', 'id', 'keyed', 'name', 'lat', 'lon', 'address', 'city', 'zone', *Pujo.DISPLAY_FIELDS.values())
+STAGING_TABLE = 'pujo_import_staging'
+
+ImportResult = namedtuple('ImportResult', ['rows', 'inserted', 'updated', 'unchanged'])
+
+
+def _text(value):
+    if value is None:
+        return ''
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    return str(value).strip()
+
+
+def _coordinate(value, name, line):
+    value = _text(value)
+    if not value:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        raise ValueError(f"Line {line}: {name} is not a number: {value}")
+
+
+def _header(row):
+    return [_text(name).lower() for name in row]
+
+
+def staging_rows(rows):
+    """
+    Turn spreadsheet rows (header first) into staging rows, normalized like Pujo.save().
+
+    Rows with every column empty are skipped; a row with a bad value stops the import.
+    """
+    rows = iter(rows)
+    header = _header(next(rows, []))
+    missing = [name for name in REQUIRED_COLUMNS if name not in header]
+    if missing:
+        raise ValueError(f"Missing columns: {', '.join(missing)}")
+    positions = {name: header.index(name) for name in IMPORT_COLUMNS if name in header}
+    max_lengths = {name: Pujo._meta.get_field(name).max_length for name in REQUIRED_COLUMNS}
+
+    for line, row in enumerate(rows, start=2):
+        values = {name: row[position] if position < len(row) else None for name, position in positions.items()}
+        if not any(_text(value) for value in values.values()):
+            continue
+
+        pujo = Pujo(**{name: _text(values[name]) for name in REQUIRED_COLUMNS})
+        pujo.normalize()
+        for name, max_length in max_lengths.items():
+            if max_length and len(getattr(pujo, name)) > max_length:
+                raise ValueError(f"Line {line}: {name} is longer than {max_length} characters")
+
+        given_id = _text(values.get('id'))
+        try:
+            # Rows without an id get one here and may still be matched to an existing pujo by name and address
+            pujo_id = uuid.UUID(given_id) if given_id else uuid.uuid4()
+        except ValueError:
+            raise ValueError(f"Line {line}: id is not a UUID: {given_id}")
+
+        yield (
+            line, pujo_id, bool(given_id), pujo.name,
+            _coordinate(values.get('lat'), 'lat', line), _coordinate(values.get('lon'), 'lon', line),
+            pujo.address, pujo.city, pujo.zone,
+            *(getattr(pujo, field) for field in Pujo.DISPLAY_FIELDS.values()),
+        )
+
+
+def _copy_chunks(cursor, rows, chunk_size, progress):
+    quote = connection.ops.quote_name
+    # Empty text columns are '' rather than NULL
+    copy_sql = "COPY {table} ({columns}) FROM STDIN WITH (FORMAT csv, FORCE_NOT_NULL ({text}))".format(
+        table=STAGING_TABLE,
+        columns=', '.join(quote(column) for column in STAGING_COLUMNS),
+        text=', '.join(quote(column) for column in TEXT_COLUMNS),
+    )
+    copied = 0
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    pending = 0
+    for row in rows:
+        writer.writerow(row)
+        pending += 1
+        if pending == chunk_size:
+            buffer.seek(0)
+            cursor.copy_expert(copy_sql, buffer)
+            copied += pending
+            progress(copied)
+            buffer.seek(0)
+            buffer.truncate()
+            pending = 0
+    if pending:
+        buffer.seek(0)
+        cursor.copy_expert(copy_sql, buffer)
+        copied += pending
+        progress(copied)
+    return copied
+
+
+def import_pujos(rows, chunk_size=None, progress=None):
+    """
+    Upsert pujos from spreadsheet rows (header first) in one transaction.
+
+    Rows are streamed into a temporary staging table with COPY and merged with a single
+    INSERT ... ON CONFLICT. Rows without an id update the pujo with the same name and
+    address if there is one; otherwise they are inserted once per name and address.
+    Existing pujos keep their coordinates when the file has no lat/lon column. Rows
+    whose values match the database are left untouched, so they keep their catalogue
+    version. `progress` is called with the number of rows copied so far after every
+    chunk.
+    """
+    from .catalogue import catalogue_changed
+
+    chunk_size = chunk_size or settings.PUJO_IMPORT_CHUNK_SIZE
+    progress = progress or (lambda copied: None)
+    quote = connection.ops.quote_name
+    names = {
+        'staging': STAGING_TABLE,
+        'pujos': quote(Pujo._meta.db_table),
+    }
+    rows = iter(rows)
+    header = next(rows, [])
+    absent = [column for column in OPTIONAL_COLUMNS if column not in _header(header)]
+    rows = itertools.chain([header], rows)
+    imported = ('name', 'lat', 'lon', 'address', 'city', 'zone', *Pujo.DISPLAY_FIELDS.values())
+    columns = ', '.join(quote(column) for column in imported)
+    # Columns an update writes and compares; new pujos still get every column
+    updated = [column for column in imported if column not in absent]
+    # Pujo defaults are Django-side, so a plain INSERT has to supply them
+    defaults = {
+        'search_score': Pujo._meta.get_field('search_score').default,
+        **{field: Pujo._meta.get_field(field).default for field in (*Pujo.COUNTER_FIELDS, 'review_count')},
+    }
+
+    with transaction.atomic():
+        with connection.cursor() as cursor:
+            cursor.execute("""
+                CREATE TEMPORARY TABLE {staging} (
+                    line integer, id uuid, keyed boolean, name text, lat double precision, lon double precision,
+                    address text, city text, zone text,
+                    display_name text, display_address text, display_city text, display_zone text
+                ) ON COMMIT DROP
+            """.format(**names))
+            copied = _copy_chunks(cursor, staging_rows(rows), chunk_size, progress)
+
+            cursor.execute("""
+                UPDATE {staging} s SET id = p.id
+                FROM {pujos} p
+                WHERE NOT s.keyed AND p.name = s.name AND p.address = s.address
+            """.format(**names))
+            # Unmatched rows repeating a name and address are one new pujo, not several
+            cursor.execute("""
+                UPDATE {staging} s SET id = first.id
+                FROM (
+                    SELECT DISTINCT ON (name, address) name, address, id
+                    FROM {staging} WHERE NOT keyed ORDER BY name, address, line
+                ) first
+                WHERE NOT s.keyed AND s.name = first.name AND s.address = first.address AND s.id <> first.id
+            """.format(**names))
+
+            # The last row wins when the file has the same pujo twice
+            cursor.execute("""
+                WITH upserted AS (
+                    INSERT INTO {pujos} AS p (id, {columns}, {default_columns}, created_at, version)
+                    SELECT DISTINCT ON (id) id, {columns}, {default_values}, now(), %(version)s
+                    FROM {staging} ORDER BY id, line DESC
+                    ON CONFLICT (id) DO UPDATE SET {assignments}, updated_at = now(), version = EXCLUDED.version
+                    WHERE ({current}) IS DISTINCT FROM ({incoming})
+                    RETURNING p.id, (xmax = 0) AS inserted
+                )
+                SELECT count(*) FILTER (WHERE inserted),
+                       ARRAY(SELECT id::text FROM upserted WHERE NOT inserted),
+                       (SELECT count(DISTINCT id) FROM {staging})
+                FROM upserted
+            """.format(
+                columns=columns,
+                default_columns=', '.join(quote(Pujo._meta.get_field(field).column) for field in defaults),
+                default_values=', '.join(f"%({field})s" for field in defaults),
+                assignments=', '.join(f"{quote(column)} = EXCLUDED.{quote(column)}" for column in updated),
+                current=', '.join(f"p.{quote(column)}" for column in updated),
+                incoming=', '.join(f"EXCLUDED.{quote(column)}" for column in updated),
+                **names,
+            ), {'version': stamp_catalogue_version(), **defaults})
+            inserted, updated_ids, distinct = cursor.fetchone()
+
+        if inserted or updated_ids:
+            # Bulk writes skip the post_save signal, so the caches are dropped here
+            invalidate_pujos(updated_ids)
+            transaction.on_commit(lambda: invalidate_pujos(updated_ids))
+            transaction.on_commit(catalogue_changed)
+
+    return ImportResult(copied, inserted, len(updated_ids), distinct - inserted - len(updated_ids))
+
+
+def import_pujo_file(path, chunk_size=None, progress=None):
+    """Import a .csv or .xlsx file of pujos; see import_pujos."""
+    with open(path, 'rb') as fileobj:
+        return import_pujos(read_rows(fileobj, path), chunk_size=chunk_size, progress=progress)
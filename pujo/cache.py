@@ -0,0 +1,28 @@
+from django.conf import settings
+from django.core.cache import cache
+
+KEY_PREFIX = 'pujo:v1:'
+
+
+def cache_key(pujo_id):
+    return f"{KEY_PREFIX}{pujo_id}"
+
+
+def get_cached_pujos(pujo_ids):
+    """Serialized pujos found in the cache, keyed by id string."""
+    found = cache.get_many([cache_key(pujo_id) for pujo_id in pujo_ids])
+    return {key[len(KEY_PREFIX):]: value for key, value in found.items()}
+
+
+def cache_pujos(serialized):
+    """Store serialized pujos (dicts with an 'id') for PUJO_CACHE_TTL seconds."""
+    if serialized:
+        cache.set_many({cache_key(data['id']): data for data in serialized}, timeout=settings.PUJO_CACHE_TTL)
+
+
+def invalidate_pujo(pujo_id):
+    cache.delete(cache_key(pujo_id))
+
+
+def invalidate_pujos(pujo_ids):
+    cache.delete_many([cache_key(pujo_id) for pujo_id in pujo_ids])
@@ -0,0 +1,145 @@
+import gzip
+import logging
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+from core.renderers import ORJSONRenderer
+from core.ResponseStatus import ResponseStatus
+from .models import CATALOGUE_VERSION_SEQUENCE, Pujo, next_catalogue_version
+from .serializers import pujo_rows
+
+try:
+    import brotli
+except ImportError:  # brotli is optional, gzip is always offered
+    brotli = None
+
+logger = logging.getLogger("pujo")
+
+VERSION_KEY = 'pujo:catalogue:version'
+# Columns that appear in the catalogue; saves touching none of them keep the current version
+CATALOGUE_COLUMNS = Pujo.SERVED_FIELDS
+
+
+def snapshot_key(version, format='json'):
+    return f"pujo:catalogue:{version}" if format == 'json' else f"pujo:catalogue:{version}:{format}"
+
+
+def catalogue_etag(version, format='json'):
+    return f'"pujo-catalogue-{version}"' if format == 'json' else f'"pujo-catalogue-{version}-{format}"'
+
+
+def _version_timeout():
+    # A per-process cache never hears about bumps made by other processes, so it re-reads the sequence now and then
+    return None if settings.REDIS_URL else settings.PUJO_CATALOGUE_VERSION_TTL
+
+
+def current_version():
+    """Catalogue version from the cache, falling back to the database sequence."""
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        with connection.cursor() as cursor:
+            cursor.execute(f"SELECT last_value, is_called FROM {CATALOGUE_VERSION_SEQUENCE}")
+            last_value, is_called = cursor.fetchone()
+        version = last_value if is_called else 0
+        cache.add(VERSION_KEY, version, timeout=_version_timeout())
+    return version
+
+
+def catalogue_watermark():
+    """
+    Highest version at or below which every pujo row and tombstone is committed.
+
+    Writers in flight hold an advisory lock keyed below their version (see
+    stamp_catalogue_version), so the watermark stays under them until they commit.
+    Other advisory locks in the database can only lower it, which resends some rows.
+    """
+    with connection.cursor() as cursor:
+        # The sequence is read first: a writer whose lock is not taken yet draws a version above this value
+        cursor.execute(f"SELECT last_value, is_called FROM {CATALOGUE_VERSION_SEQUENCE}")
+        last_value, is_called = cursor.fetchone()
+        cursor.execute("""
+            SELECT min((classid::bigint << 32) | objid::bigint) FROM pg_locks
+            WHERE locktype = 'advisory' AND objsubid = 1
+              AND database = (SELECT oid FROM pg_database WHERE datname = current_database())
+        """)
+        in_flight = cursor.fetchone()[0]
+    watermark = last_value if is_called else 0
+    return watermark if in_flight is None else min(watermark, in_flight)
+
+
+def bump_version():
+    """Start a new catalogue version; called once a change to the pujos is committed."""
+    version = next_catalogue_version()
+    cache.set(VERSION_KEY, version, timeout=_version_timeout())
+    return version
+
+
+def build_snapshot(version, renderer=None):
+    """Render the /pujo/list response once per format, in every encoding it is served in."""
+    renderer = renderer or ORJSONRenderer()
+    # Read before the rows, so every change up to it is in the body; it is the client's starting point for /pujo/changes
+    watermark = catalogue_watermark()
+    body = renderer.render({
+        'result': pujo_rows.data(Pujo.objects.all()),
+        'message': 'Pujo list successfully fetched',
+        'status': ResponseStatus.SUCCESS.value,
+    })
+    snapshot = {
+        'version': version,
+        'watermark': watermark,
+        'etag': catalogue_etag(version, renderer.format),
+        'identity': body,
+        'gzip': gzip.compress(body, compresslevel=9),
+    }
+    if brotli is not None:
+        snapshot['br'] = brotli.compress(body, quality=11)
+    cache.set(snapshot_key(version, renderer.format), snapshot, timeout=settings.PUJO_CATALOGUE_TTL)
+    return snapshot
+
+
+def get_snapshot(version, renderer=None):
+    """Snapshot of the version in the renderer's format; JSON is pre-rendered, other formats on first use."""
+    snapshot = cache.get(snapshot_key(version, renderer.format if renderer else 'json'))
+    # Snapshots cached before they carried a watermark are built again
+    if snapshot is None or 'watermark' not in snapshot:
+        snapshot = build_snapshot(version, renderer)
+    return snapshot
+
+
+def catalogue_changed():
+    """Bump the version and pre-render the new snapshot in the background."""
+    from core.task import build_pujo_catalogue
+
+    bump_version()
+    try:
+        build_pujo_catalogue.delay()
+    except Exception as e:
+        # The snapshot is then built by the first request that needs it
+        logger.error(f"Error: Could not queue catalogue build: {str(e)}")
+
+
+def accepted_encodings(accept_encoding):
+    """Quality of each encoding named in an Accept-Encoding header."""
+    accepted = {}
+    for part in accept_encoding.split(','):
+        name, _, params = part.strip().partition(';')
+        quality = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        if name:
+            accepted[name.strip().lower()] = quality
+    return accepted
+
+
+def choose_encoding(snapshot, accept_encoding):
+    """Best encoding of the snapshot the client accepts: br, then gzip, then none."""
+    accepted = accepted_encodings(accept_encoding)
+    for encoding in ('br', 'gzip'):
+        quality = accepted.get(encoding, accepted.get('*', 0.0))
+        if encoding in snapshot and quality > 0:
+            return encoding
+    return 'identity'
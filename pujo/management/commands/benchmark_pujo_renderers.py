@@ -0,0 +1,63 @@
+import gzip
+import json
+import time
+import msgpack
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.renderers import JSONRenderer
+from core.renderers import ColumnarJSONRenderer, MessagePackRenderer, ORJSONRenderer, columnar
+from core.ResponseStatus import ResponseStatus
+from pujo.serializers import pujo_rows
+from pujo.management.commands.benchmark_pujo_serializers import sample_pujos
+
+
+class Command(BaseCommand):
+    help = 'Compare encode time and payload size of the /pujo/list response in every renderer, without touching the database'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=10000, help='Number of pujos in the payload')
+        parser.add_argument('--repeat', type=int, default=5, help='Best of this many runs is reported')
+
+    def handle(self, *args, **options):
+        pujos = sample_pujos(options['rows'])
+        rows = [tuple(getattr(pujo, column) for column in pujo_rows.columns) for pujo in pujos]
+        # Same payload the catalogue snapshot renders
+        payload = {
+            'result': pujo_rows.to_representation(rows),
+            'message': 'Pujo list successfully fetched',
+            'status': ResponseStatus.SUCCESS.value,
+        }
+
+        baseline = None
+        outputs = {}
+        for label, renderer in (
+            ('DRF JSONRenderer', JSONRenderer()),
+            ('orjson', ORJSONRenderer()),
+            ('Columnar JSON', ColumnarJSONRenderer()),
+            ('MessagePack', MessagePackRenderer()),
+        ):
+            elapsed, body = self.measure(options['repeat'], lambda: renderer.render(payload))
+            outputs[label] = body
+            baseline = baseline or elapsed
+            self.stdout.write(
+                f"{label:<17} {elapsed * 1000:8.1f} ms  {baseline / elapsed:5.1f}x  "
+                f"{len(body) / 1024:8.1f} KiB  gzip {len(gzip.compress(body)) / 1024:7.1f} KiB"
+            )
+
+        # Every format has to decode to the same data as the stdlib output
+        expected = json.loads(outputs['DRF JSONRenderer'])
+        if json.loads(outputs['orjson']) != expected:
+            raise CommandError('orjson output differs from JSONRenderer')
+        if json.loads(outputs['Columnar JSON'])['result'] != columnar(expected['result']):
+            raise CommandError('Columnar output differs from JSONRenderer')
+        if msgpack.unpackb(outputs['MessagePack']) != expected:
+            raise CommandError('MessagePack output differs from JSONRenderer')
+        self.stdout.write(self.style.SUCCESS(f"All renderers decode to the same data for {len(pujos)} rows"))
+
+    def measure(self, repeat, render):
+        best, output = None, None
+        for _ in range(max(1, repeat)):
+            start = time.perf_counter()
+            output = render()
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        return best, output
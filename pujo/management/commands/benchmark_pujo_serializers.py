@@ -0,0 +1,62 @@
+import random
+import time
+import uuid
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+from pujo.models import Pujo
+from pujo.serializers import PujoSerializer, pujo_rows
+
+
+def sample_pujos(count):
+    """Unsaved pujos shaped like the real catalogue, shared by the benchmark commands."""
+    pujos = []
+    for index in range(count):
+        pujo = Pujo(
+            id=uuid.uuid4(),
+            name=f"sarbojanin durgotsab {index}",
+            lat=22.5 + random.random() / 10,
+            lon=88.3 + random.random() / 10,
+            address=f"{index} lake road, ballygunge",
+            city="kolkata",
+            zone="south",
+            created_at=timezone.now(),
+        )
+        pujo.display_name = pujo.formatted_name()
+        pujo.display_address = pujo.formatted_address()
+        pujo.display_city = pujo.formatted_city()
+        pujo.display_zone = pujo.formatted_zone()
+        pujos.append(pujo)
+    return pujos
+
+
+class Command(BaseCommand):
+    help = 'Compare PujoSerializer with the values_list() fast path on generated rows, without touching the database'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=10000, help='Number of pujos to serialize')
+        parser.add_argument('--repeat', type=int, default=5, help='Best of this many runs is reported')
+
+    def handle(self, *args, **options):
+        pujos = sample_pujos(options['rows'])
+        rows = [tuple(getattr(pujo, column) for column in pujo_rows.columns) for pujo in pujos]
+
+        renderer = JSONRenderer()
+        drf_time, drf_json = self.measure(options['repeat'], lambda: renderer.render(PujoSerializer(pujos, many=True).data))
+        fast_time, fast_json = self.measure(options['repeat'], lambda: renderer.render(pujo_rows.to_representation(rows)))
+
+        if drf_json != fast_json:
+            raise CommandError('Fast path output differs from PujoSerializer')
+
+        self.stdout.write(f"PujoSerializer: {drf_time * 1000:.1f} ms")
+        self.stdout.write(f"Fast path:      {fast_time * 1000:.1f} ms")
+        self.stdout.write(self.style.SUCCESS(f"{drf_time / fast_time:.1f}x faster, byte-identical JSON for {len(pujos)} rows"))
+
+    def measure(self, repeat, render):
+        best, output = None, None
+        for _ in range(max(1, repeat)):
+            start = time.perf_counter()
+            output = render()
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        return best, output
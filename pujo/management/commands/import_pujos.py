@@ -0,0 +1,28 @@
+import time
+from django.core.management.base import BaseCommand, CommandError
+from pujo.bulk_import import import_pujo_file
+
+
+class Command(BaseCommand):
+    help = 'Upsert pujos from a .csv or .xlsx file through a COPY into a staging table'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Spreadsheet with name, address, city and zone columns; id, lat and lon are optional')
+        parser.add_argument('--chunk-size', type=int, default=None, help='Rows per COPY (default PUJO_IMPORT_CHUNK_SIZE)')
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        try:
+            result = import_pujo_file(
+                options['path'],
+                chunk_size=options['chunk_size'],
+                progress=lambda copied: self.stdout.write(f"Copied {copied} rows"),
+            )
+        except (OSError, ValueError) as e:
+            raise CommandError(str(e))
+
+        elapsed = time.perf_counter() - start
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {result.rows} rows in {elapsed:.1f}s: "
+            f"{result.inserted} added, {result.updated} updated, {result.unchanged} unchanged"
+        ))
@@ -0,0 +1,33 @@
+# Generated by Django 5.0 on 2026-10-19 12:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pujo', '0011_alter_pujo_search_score'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='pujo',
+            name='favorites_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='pujo',
+            name='wishlists_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='pujo',
+            name='saves_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='pujo',
+            name='visits_count',
+            field=models.IntegerField(default=0),
+        ),
+    ]
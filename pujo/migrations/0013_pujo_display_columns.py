@@ -0,0 +1,50 @@
+# Generated by Django 5.0 on 2026-10-19 13:00
+
+from django.db import migrations, models
+
+
+def fill_display_columns(apps, schema_editor):
+    Pujo = apps.get_model('pujo', 'Pujo')
+    batch = []
+    for pujo in Pujo.objects.only('id', 'name', 'address', 'city', 'zone').iterator(chunk_size=2000):
+        # Same casing as Pujo.formatted_*(), done in Python so the output matches exactly
+        pujo.display_name = pujo.name.title()
+        pujo.display_address = pujo.address.title()
+        pujo.display_city = pujo.city.title()
+        pujo.display_zone = pujo.zone.upper()
+        batch.append(pujo)
+        if len(batch) >= 2000:
+            Pujo.objects.bulk_update(batch, ['display_name', 'display_address', 'display_city', 'display_zone'])
+            batch = []
+    Pujo.objects.bulk_update(batch, ['display_name', 'display_address', 'display_city', 'display_zone'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pujo', '0012_pujo_collection_counters'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='pujo',
+            name='display_name',
+            field=models.TextField(default='', editable=False),
+        ),
+        migrations.AddField(
+            model_name='pujo',
+            name='display_address',
+            field=models.TextField(default='', editable=False),
+        ),
+        migrations.AddField(
+            model_name='pujo',
+            name='display_city',
+            field=models.TextField(default='', editable=False),
+        ),
+        migrations.AddField(
+            model_name='pujo',
+            name='display_zone',
+            field=models.TextField(default='', editable=False),
+        ),
+        migrations.RunPython(fill_display_columns, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.0 on 2026-10-19 14:00
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pujo', '0013_pujo_display_columns'),
+    ]
+
+    operations = [
+        # Version of the pre-rendered /pujo/list snapshot, bumped whenever a pujo changes
+        migrations.RunSQL(
+            "CREATE SEQUENCE IF NOT EXISTS pujo_catalogue_version_seq",
+            "DROP SEQUENCE IF EXISTS pujo_catalogue_version_seq",
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.0 on 2026-10-19 15:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pujo', '0014_catalogue_version_sequence'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='pujo',
+            name='version',
+            field=models.BigIntegerField(db_index=True, default=0, editable=False),
+        ),
+        migrations.CreateModel(
+            name='PujoTombstone',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('pujo_id', models.UUIDField(db_index=True)),
+                ('version', models.BigIntegerField(db_index=True)),
+                ('deleted_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='TombstoneCompaction',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('version', models.BigIntegerField()),
+                ('compacted_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.0 on 2026-10-19 17:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pujo', '0015_pujo_version_tombstones'),
+        ('reviews', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='pujo',
+            name='review_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='pujo',
+            name='last_reviewed_at',
+            field=models.DateField(null=True),
+        ),
+        # From here on the signals in reviews keep them up to date
+        migrations.RunSQL(
+            """
+            UPDATE pujo_pujo p SET review_count = r.reviews, last_reviewed_at = r.latest
+            FROM (
+                SELECT pujo_id, count(*) AS reviews, max(created_at) AS latest
+                FROM reviews_review GROUP BY pujo_id
+            ) r
+            WHERE r.pujo_id = p.id
+            """,
+            migrations.RunSQL.noop,
+        ),
+    ]
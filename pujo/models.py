@@ -1,7 +1,33 @@
-from django.db import models
+from django.db import connection, models, transaction
 import uuid
 from django.contrib.postgres.fields import ArrayField
 
+# Shared by the catalogue snapshot and the per-row change versions
+CATALOGUE_VERSION_SEQUENCE = 'pujo_catalogue_version_seq'
+
+
+def next_catalogue_version():
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT nextval(%s)", [CATALOGUE_VERSION_SEQUENCE])
+        return cursor.fetchone()[0]
+
+
+def stamp_catalogue_version():
+    """
+    Version for pujo rows or tombstones written in the current transaction.
+
+    Before drawing it, the transaction takes a shared advisory lock keyed below the
+    version and holds it until commit, which keeps catalogue_watermark() under every
+    version that is not committed yet.
+    """
+    if not connection.in_atomic_block:
+        raise RuntimeError('Catalogue versions must be stamped inside a transaction')
+    with connection.cursor() as cursor:
+        cursor.execute(f"SELECT pg_advisory_xact_lock_shared(last_value - 1) FROM {CATALOGUE_VERSION_SEQUENCE}")
+        cursor.execute("SELECT nextval(%s)", [CATALOGUE_VERSION_SEQUENCE])
+        return cursor.fetchone()[0]
+
+
 class LastScoreModel(models.Model):
     pujo = models.ForeignKey('Pujo', related_name='last_scores', on_delete=models.CASCADE)
     value = models.IntegerField()
@@ -19,15 +45,65 @@ class Pujo(models.Model):
     city = models.TextField()
     zone = models.CharField(max_length=100)
     search_score=models.IntegerField(default=100)
+    # Maintained by user.user_collections as collection items are added and removed
+    favorites_count = models.IntegerField(default=0)
+    wishlists_count = models.IntegerField(default=0)
+    saves_count = models.IntegerField(default=0)
+    visits_count = models.IntegerField(default=0)
+    # Maintained by reviews.signals as reviews are written and deleted
+    review_count = models.IntegerField(default=0)
+    last_reviewed_at = models.DateField(null=True)
     created_at = models.DateTimeField(auto_now_add=True, editable=False)
     updated_at = models.DateTimeField(null = True)
+    # Display-cased copies of name, address, city and zone, kept in step by save()
+    display_name = models.TextField(default='', editable=False)
+    display_address = models.TextField(default='', editable=False)
+    display_city = models.TextField(default='', editable=False)
+    display_zone = models.TextField(default='', editable=False)
+    # Catalogue version of the last served change to this row, used by /pujo/changes
+    version = models.BigIntegerField(default=0, db_index=True, editable=False)
 
-    def save(self, *args, **kwargs):
+    COUNTER_FIELDS = ('favorites_count', 'wishlists_count', 'saves_count', 'visits_count')
+    REVIEW_FIELDS = ('review_count', 'last_reviewed_at')
+    DISPLAY_FIELDS = {'name': 'display_name', 'address': 'display_address', 'city': 'display_city', 'zone': 'display_zone'}
+    # Columns clients receive; a save touching any of them gives the row a new version
+    SERVED_FIELDS = frozenset(['lat', 'lon', *DISPLAY_FIELDS, *DISPLAY_FIELDS.values()])
+
+    def normalize(self):
+        """Lowercase the source columns and derive their display copies; done by every save and by bulk imports."""
         self.name = self.name.lower()
         self.address = self.address.lower()
         self.city = self.city.lower()
         self.zone = self.zone.lower()
-        super(Pujo, self).save(*args, **kwargs)
+        self.display_name = self.formatted_name()
+        self.display_address = self.formatted_address()
+        self.display_city = self.formatted_city()
+        self.display_zone = self.formatted_zone()
+
+    def save(self, *args, **kwargs):
+        self.normalize()
+        update_fields = kwargs.get('update_fields')
+        stamp = update_fields is None
+        if update_fields is not None:
+            # A partial save of a source column also writes its display copy
+            extra = [self.DISPLAY_FIELDS[name] for name in update_fields if name in self.DISPLAY_FIELDS]
+            if self.SERVED_FIELDS.intersection(update_fields):
+                stamp = True
+                extra.append('version')
+            kwargs['update_fields'] = list(dict.fromkeys([*update_fields, *extra]))
+        if update_fields is None and not args and not self._state.adding:
+            # Counters and review aggregates only change through queryset updates, a stale copy loaded with the row must not overwrite them
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in (*self.COUNTER_FIELDS, *self.REVIEW_FIELDS)
+            ]
+        if not stamp:
+            super(Pujo, self).save(*args, **kwargs)
+            return
+        # The version stays reserved until the row is committed
+        with transaction.atomic(using=kwargs.get('using')):
+            self.version = stamp_catalogue_version()
+            super(Pujo, self).save(*args, **kwargs)
 
     def formatted_name(self):
         return self.name.title()
@@ -43,3 +119,22 @@ class Pujo(models.Model):
 
     def __str__(self):
         return self.formatted_name()
+
+
+class PujoTombstone(models.Model):
+    """Marks a deleted pujo so clients syncing through /pujo/changes drop it too."""
+    pujo_id = models.UUIDField(db_index=True)
+    version = models.BigIntegerField(db_index=True)
+    deleted_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.pujo_id} deleted at version {self.version}"
+
+
+class TombstoneCompaction(models.Model):
+    """Tombstones up to `version` were removed; clients behind it have to resync the full catalogue."""
+    version = models.BigIntegerField()
+    compacted_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"Compacted up to version {self.version} at {self.compacted_at}"
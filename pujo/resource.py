@@ -1,6 +1,12 @@
 from import_export import resources
 from . import models as pujo_models
+from .bulk_import import import_pujos
 
 class PujoResource(resources.ModelResource):
     class Meta:
-        model = pujo_models.Pujo
\ No newline at end of file
+        model = pujo_models.Pujo
+
+    def bulk_import(self, rows, progress):
+        """Used by background import jobs instead of saving row by row; see pujo.bulk_import."""
+        result = import_pujos(rows, progress=progress)
+        return {'new': result.inserted, 'update': result.updated, 'skip': result.unchanged}
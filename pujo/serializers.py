@@ -1,13 +1,20 @@
 from rest_framework import serializers
 from django.utils import timezone
+from django.conf import settings
 from .models import Pujo
 from django.db import models
 
+# Response key -> Pujo column, in the order PujoSerializer renders them
+PUJO_ROW_FIELDS = [
+    ('id', 'id'), ('lat', 'lat'), ('lon', 'lon'), ('zone', 'display_zone'), ('city', 'display_city'),
+    ('name', 'display_name'), ('address', 'display_address'), ('created_at', 'created_at'),
+]
+
 class PujoSerializer(serializers.ModelSerializer):
-    name = serializers.SerializerMethodField()
-    address = serializers.SerializerMethodField()
-    city = serializers.SerializerMethodField()
-    zone = serializers.SerializerMethodField()
+    name = serializers.CharField(source='display_name', read_only=True)
+    address = serializers.CharField(source='display_address', read_only=True)
+    city = serializers.CharField(source='display_city', read_only=True)
+    zone = serializers.CharField(source='display_zone', read_only=True)
     class Meta:
         model = Pujo
         fields = ['id', 'lat','lon','zone', 'city', 'name', 'address', 'created_at']
@@ -29,39 +36,15 @@ class PujoSerializer(serializers.ModelSerializer):
         instance.updated_at = timezone.now()
         instance.save()  
         return instance
-    
-    def get_name(self, obj):
-        return obj.formatted_name()
-
-    def get_address(self, obj):
-        return obj.formatted_address()
-
-    def get_city(self, obj):
-        return obj.formatted_city()
-
-    def get_zone(self, obj):
-        return obj.formatted_zone()
 
 class TrendingPujoSerializer(serializers.ModelSerializer):
-    name = serializers.SerializerMethodField()
-    address = serializers.SerializerMethodField()
-    city = serializers.SerializerMethodField()
-    zone = serializers.SerializerMethodField()
+    name = serializers.CharField(source='display_name', read_only=True)
+    address = serializers.CharField(source='display_address', read_only=True)
+    city = serializers.CharField(source='display_city', read_only=True)
+    zone = serializers.CharField(source='display_zone', read_only=True)
     class Meta:
         model = Pujo
-        fields = ['id', 'lat','lon','zone', 'city', 'name', 'address', 'search_score', 'created_at']
-
-    def get_name(self, obj):
-        return obj.formatted_name()
-
-    def get_address(self, obj):
-        return obj.formatted_address()
-
-    def get_city(self, obj):
-        return obj.formatted_city()
-
-    def get_zone(self, obj):
-        return obj.formatted_zone()
+        fields = ['id', 'lat','lon','zone', 'city', 'name', 'address', 'search_score', 'review_count', 'last_reviewed_at', 'created_at']
 
 class SearchedPujoSerializer(serializers.ModelSerializer):
     ids = serializers.ListField(
@@ -83,4 +66,60 @@ class searchPujoSerializer(serializers.ModelSerializer):
         model = Pujo
         fields = ["term"]
 
-    
\ No newline at end of file
+    
+class PujoBatchSerializer(serializers.Serializer):
+    ids = serializers.ListField(
+        child=serializers.UUIDField(format='hex_verbose'),
+        allow_empty=False,
+        max_length=settings.PUJO_BATCH_MAX_IDS
+    )
+
+class PujoRowSerializer:
+    """
+    Read-only fast path producing the same output as a PujoSerializer(many=True).
+
+    Response dicts are built straight from values_list() tuples of the display columns,
+    with one converter per column, instead of going through DRF fields for every row.
+    """
+
+    def __init__(self, fields):
+        self.keys = [key for key, _ in fields]
+        self.columns = [column for _, column in fields]
+        created_at = serializers.DateTimeField()
+        converters = {
+            models.UUIDField: str,
+            models.FloatField: float,
+            models.IntegerField: int,
+            models.DateTimeField: created_at.to_representation,
+        }
+        self.converters = [
+            next((convert for field_type, convert in converters.items() if isinstance(Pujo._meta.get_field(column), field_type)), str)
+            for column in self.columns
+        ]
+
+    def to_representation(self, rows):
+        keys, converters = self.keys, self.converters
+        return [
+            dict(zip(keys, [None if value is None else convert(value) for convert, value in zip(converters, row)]))
+            for row in rows
+        ]
+
+    def data(self, queryset):
+        return self.to_representation(queryset.values_list(*self.columns))
+
+    def project(self, keys):
+        """Serializer for a subset of the response keys; only their columns are selected."""
+        return PujoRowSerializer([(key, column) for key, column in zip(self.keys, self.columns) if key in keys])
+
+    def page(self, queryset, params, paginator):
+        """One page of response dicts and the next cursor; ordering columns are selected even if not returned."""
+        columns = self.columns + [field for field in paginator.fields if field not in self.columns]
+        positions = [columns.index(field) for field in paginator.fields]
+        rows, next_cursor = paginator.paginate(
+            queryset.values_list(*columns), params, key=lambda row: [row[position] for position in positions]
+        )
+        width = len(self.columns)
+        return self.to_representation(row[:width] for row in rows), next_cursor
+
+
+pujo_rows = PujoRowSerializer(PUJO_ROW_FIELDS)
@@ -0,0 +1,25 @@
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from .cache import invalidate_pujo
+from .catalogue import CATALOGUE_COLUMNS, catalogue_changed
+from .models import Pujo, PujoTombstone, stamp_catalogue_version
+
+
+@receiver(post_save, sender=Pujo)
+@receiver(post_delete, sender=Pujo)
+def pujo_changed(sender, instance, update_fields=None, **kwargs):
+    # Score bumps and counter updates don't change anything that is served
+    if update_fields is not None and not set(update_fields) & CATALOGUE_COLUMNS:
+        return
+    pujo_id = instance.id
+    # Dropped now and again after commit, so a read racing the write cannot re-cache the old row
+    invalidate_pujo(pujo_id)
+    transaction.on_commit(lambda: invalidate_pujo(pujo_id))
+    transaction.on_commit(catalogue_changed)
+
+
+@receiver(post_delete, sender=Pujo)
+def pujo_deleted(sender, instance, **kwargs):
+    # Written in the deleting transaction so the tombstone exists exactly when the row is gone
+    PujoTombstone.objects.create(pujo_id=instance.id, version=stamp_catalogue_version())
@@ -0,0 +1,167 @@
+import threading
+import uuid
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.test import TestCase, TransactionTestCase
+from django.urls import reverse
+from pujo.bulk_import import import_pujos
+from pujo.models import Pujo, stamp_catalogue_version
+
+
+def create_pujo(name, **fields):
+    return Pujo.objects.create(name=name, lat=22.5, lon=88.3, address=f"{name} road", city='kolkata', zone='south', **fields)
+
+
+class OpenWriterTest(TransactionTestCase):
+    """A writer that drew its version but has not committed yet must not be skipped by clients that sync from the list."""
+
+    def setUp(self):
+        cache.clear()
+
+    def test_list_version_stays_below_an_open_writer(self):
+        stamped, release = threading.Event(), threading.Event()
+        writer_version, writer_id = [], []
+
+        def write():
+            try:
+                with transaction.atomic():
+                    writer_version.append(stamp_catalogue_version())
+                    pujo = Pujo(name='slow writer', lat=22.5, lon=88.3, address='slow road', city='kolkata', zone='south')
+                    pujo.normalize()
+                    pujo.version = writer_version[0]
+                    Pujo.objects.bulk_create([pujo])
+                    writer_id.append(str(pujo.id))
+                    stamped.set()
+                    release.wait(timeout=30)
+            finally:
+                connection.close()
+
+        writer = threading.Thread(target=write)
+        writer.start()
+        try:
+            self.assertTrue(stamped.wait(timeout=30))
+            later = create_pujo('later commit')
+            self.assertGreater(later.version, writer_version[0])
+
+            response = self.client.get(reverse('pujo-list'))
+            since = int(response['X-Catalogue-Version'])
+            self.assertLess(since, writer_version[0])
+        finally:
+            release.set()
+            writer.join()
+
+        changes = self.client.get(reverse('pujo-changes'), {'since': since}).json()['result']
+        self.assertIn(writer_id[0], [row['id'] for row in changes['updated']])
+
+
+class PujoChangesTest(TransactionTestCase):
+    # Writers hold their advisory lock until commit, so every change has to commit for the watermark to pass it
+
+    def setUp(self):
+        cache.clear()
+
+    def changes(self, since):
+        response = self.client.get(reverse('pujo-changes'), {'since': since})
+        self.assertEqual(response.status_code, 200)
+        return response.json()['result']
+
+    def test_updates_and_deletes_since_a_version(self):
+        kept = create_pujo('kept')
+        removed = create_pujo('removed')
+        since = self.changes(0)['version']
+
+        kept.zone = 'north'
+        kept.save()
+        removed_id = str(removed.id)
+        removed.delete()
+        result = self.changes(since)
+
+        self.assertFalse(result['full_resync'])
+        self.assertEqual([row['id'] for row in result['updated']], [str(kept.id)])
+        self.assertEqual(result['deleted'], [removed_id])
+        self.assertGreater(result['version'], since)
+        self.assertEqual(self.changes(result['version'])['updated'], [])
+
+    def test_too_many_changes_ask_for_a_full_resync(self):
+        with self.settings(PUJO_CHANGES_MAX_ROWS=1):
+            create_pujo('first')
+            create_pujo('second')
+            result = self.changes(0)
+
+        self.assertTrue(result['full_resync'])
+        self.assertEqual(result['updated'], [])
+
+    def test_since_must_be_a_number(self):
+        response = self.client.get(reverse('pujo-changes'), {'since': 'yesterday'})
+        self.assertEqual(response.status_code, 400)
+
+
+class PujoBatchTest(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_requested_order_and_missing_ids(self):
+        first, second = create_pujo('first'), create_pujo('second')
+        unknown = str(uuid.uuid4())
+
+        response = self.client.post(reverse('pujo-batch'), {'ids': [str(second.id), unknown, str(first.id), str(second.id)]}, content_type='application/json')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([row['id'] for row in response.json()['result']], [str(second.id), str(first.id)])
+        self.assertEqual(response.json()['missing'], [unknown])
+
+
+class ImportPujosTest(TestCase):
+    header = ['id', 'name', 'lat', 'lon', 'address', 'city', 'zone']
+
+    def setUp(self):
+        cache.clear()
+
+    def test_inserts_updates_and_leaves_unchanged_rows_alone(self):
+        edited, same = create_pujo('edited'), create_pujo('same')
+        same.refresh_from_db()
+        rows = [
+            self.header,
+            [str(edited.id), 'Edited', 23.0, 88.3, 'edited road', 'kolkata', 'north'],
+            [str(same.id), 'same', 22.5, 88.3, 'same road', 'kolkata', 'south'],
+            ['', 'New Pujo', 22.6, 88.4, 'new road', 'Kolkata', 'East'],
+            [None, None, None, None, None, None, None],
+        ]
+
+        result = import_pujos(rows, chunk_size=2)
+
+        self.assertEqual(tuple(result), (3, 1, 1, 1))
+        edited.refresh_from_db()
+        self.assertEqual((edited.zone, edited.lat, edited.display_name), ('north', 23.0, 'Edited'))
+        self.assertEqual(Pujo.objects.get(id=same.id).version, same.version)
+        new = Pujo.objects.get(name='new pujo')
+        self.assertEqual((new.city, new.display_zone, new.favorites_count), ('kolkata', 'EAST', 0))
+
+    def test_rows_without_an_id_match_by_name_and_address(self):
+        existing = create_pujo('lake')
+        rows = [
+            ['name', 'address', 'city', 'zone'],
+            ['Lake', 'lake road', 'kolkata', 'west'],
+            ['Park', 'park road', 'kolkata', 'south'],
+            ['park', 'PARK ROAD', 'kolkata', 'north'],
+        ]
+
+        result = import_pujos(rows)
+
+        self.assertEqual((result.inserted, result.updated), (1, 1))
+        existing.refresh_from_db()
+        self.assertEqual(existing.zone, 'west')
+        # The file has no lat/lon column, so the coordinates are kept
+        self.assertEqual((existing.lat, existing.lon), (22.5, 88.3))
+        # Repeated new rows are one pujo and the last one wins
+        self.assertEqual(list(Pujo.objects.filter(name='park').values_list('zone', flat=True)), ['north'])
+
+    def test_bad_rows_stop_the_import(self):
+        for rows, message in [
+            ([['name', 'address', 'city']], 'Missing columns: zone'),
+            ([self.header, ['', 'x', 'north', '88', 'x road', 'kolkata', 'south']], 'Line 2: lat is not a number'),
+            ([self.header, ['nope', 'x', '', '', 'x road', 'kolkata', 'south']], 'Line 2: id is not a UUID'),
+        ]:
+            with self.assertRaisesMessage(ValueError, message):
+                import_pujos(rows)
+        self.assertFalse(Pujo.objects.exists())
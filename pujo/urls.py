@@ -1,5 +1,5 @@
 from django.urls import path
-from .views import PujoViewSet, PujoTrendingIncreaseViewSet, PujoSearchViewSet
+from .views import PujoViewSet, PujoTrendingIncreaseViewSet, PujoSearchViewSet, PujoBatchView, PujoChangesView
 
 # Define custom views for list and detail actions
 pujo_list = PujoViewSet.as_view({
@@ -20,6 +20,8 @@ urlpatterns = [
     path('list', pujo_list, name='pujo-list'),  # URL for listing Pujos
     path('add', pujo_create, name='pujo-create'),  # URL for creating a new Pujo
     path('<uuid:uuid>', pujo_detail, name='pujo-detail'),  # URL for detail, update, and delete
+    path('batch', PujoBatchView.as_view(), name='pujo-batch'),  # URL for fetching many Pujos by id
+    path('changes', PujoChangesView.as_view(), name='pujo-changes'),  # URL for syncing changes since a version
     path('list/trending', PujoViewSet.as_view({'get': 'trending'}), name='pujo-trending'),
     path('searched', PujoTrendingIncreaseViewSet.as_view({'post':'increase_search_score'}), name='pujo-searched'),
     path('search', PujoSearchViewSet.as_view({'post':'search_pujo'}), name="search-pujo")
@@ -2,20 +2,38 @@ from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from django.db.models import Q, F, Value, DateTimeField
-from .models import Pujo, LastScoreModel
-from .serializers import PujoSerializer, TrendingPujoSerializer, SearchedPujoSerializer, searchPujoSerializer
+from .models import Pujo, LastScoreModel, PujoTombstone, TombstoneCompaction
+from .serializers import PujoSerializer, TrendingPujoSerializer, SearchedPujoSerializer, searchPujoSerializer, PujoBatchSerializer, pujo_rows
+from .cache import get_cached_pujos, cache_pujos
+from .catalogue import current_version, catalogue_etag, catalogue_watermark, get_snapshot, choose_encoding
 from core.ResponseStatus import ResponseStatus
 import logging
 from user.permission import IsSuperOrAdminUser
-from rest_framework_simplejwt.authentication import JWTAuthentication
+from user.authentication import ClaimsJWTAuthentication
 from rest_framework import permissions
 import re
 from django.utils import timezone
 from django.db.models.functions import Coalesce, Cast
 from datetime import datetime
+from rest_framework.views import APIView
+from django.http import HttpResponse, HttpResponseNotModified
+from django.conf import settings
+from core.pagination import KeysetPaginator, requested_fields
+from core.renderers import ORJSONRenderer
 
 logger = logging.getLogger("pujo")
 
+pujo_paginator = KeysetPaginator(ordering=('id',))
+
+
+def pujo_rows_page(queryset, params):
+    """Rows for the list and search endpoints, honouring the opt-in `fields`, `cursor` and `limit` params."""
+    fields = requested_fields(params, pujo_rows.keys)
+    rows = pujo_rows.project(fields) if fields else pujo_rows
+    if pujo_paginator.requested(params):
+        return rows.page(queryset, params, pujo_paginator)
+    return rows.data(queryset), None
+
 def generate_regex_combinations(word):
     patterns = []
     length = len(word)
@@ -49,7 +67,7 @@ class PujoViewSet(viewsets.ModelViewSet):
     serializer_class = PujoSerializer
     lookup_field = 'id'
     permission_classes=[IsSuperOrAdminUser]
-    authentication_classes = [JWTAuthentication]
+    authentication_classes = [ClaimsJWTAuthentication]
 
     def get_permissions(self):
         if self.action in ['list', 'trending', 'increase_search_score']:
@@ -58,17 +76,36 @@ class PujoViewSet(viewsets.ModelViewSet):
         return super().get_permissions()
 
     def list(self, request, *args, **kwargs):
+        params = request.query_params
+        if 'fields' in params or pujo_paginator.requested(params):
+            return self.list_rows(request)
+
         try:
-            queryset = self.get_queryset()
-            # Check if query parameters are provided
-            # If no parameters are provided, return all records
-            serializer = self.get_serializer(queryset, many=True)
-            response_data = {
-                    'result': serializer.data,
-                    'message':'Pujo list successfully fetched',
-                    'status': ResponseStatus.SUCCESS.value
-            }
-            return Response(response_data, status=status.HTTP_200_OK)
+            # The whole catalogue is pre-rendered per version; a matching ETag needs neither the DB nor a render
+            version = current_version()
+            # Served in the format negotiated from the Accept header; the browsable API gets JSON
+            renderer = request.accepted_renderer
+            if renderer.format == 'api':
+                renderer = ORJSONRenderer()
+            etag = catalogue_etag(version, renderer.format)
+            if_none_match = request.headers.get('If-None-Match', '')
+            if etag in [tag.strip().removeprefix('W/') for tag in if_none_match.split(',')] or if_none_match.strip() == '*':
+                # The client keeps the X-Catalogue-Version it got with the body
+                response = HttpResponseNotModified()
+            else:
+                snapshot = get_snapshot(version, renderer)
+                encoding = choose_encoding(snapshot, request.headers.get('Accept-Encoding', ''))
+                response = HttpResponse(snapshot[encoding], content_type=renderer.media_type)
+                if encoding != 'identity':
+                    response['Content-Encoding'] = encoding
+                # Starting point for /pujo/changes: the watermark read before the snapshot's rows, which stays
+                # below writes that were still in flight, not the version the snapshot is cached under
+                response['X-Catalogue-Version'] = str(snapshot['watermark'])
+
+            response['ETag'] = etag
+            response['Cache-Control'] = f'public, max-age={settings.PUJO_CATALOGUE_MAX_AGE}'
+            response['Vary'] = 'Accept, Accept-Encoding'
+            return response
         except Exception as e:
             response_data = {
                 'error': str(e),
@@ -77,6 +114,26 @@ class PujoViewSet(viewsets.ModelViewSet):
             logger.error(f"Error: {response_data['error']}")
             return Response(response_data, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
     
+    def list_rows(self, request):
+        try:
+            result, next_cursor = pujo_rows_page(self.get_queryset(), request.query_params)
+        except ValueError as e:
+            response_data = {
+                'error': str(e),
+                'status': ResponseStatus.FAIL.value
+            }
+            logger.error(f"Error: {response_data['error']}")
+            return Response(response_data, status=status.HTTP_400_BAD_REQUEST)
+
+        response_data = {
+                'result': result,
+                'message':'Pujo list successfully fetched',
+                'status': ResponseStatus.SUCCESS.value
+        }
+        if pujo_paginator.requested(request.query_params):
+            response_data['next_cursor'] = next_cursor
+        return Response(response_data, status=status.HTTP_200_OK)
+
     @action(detail=False, methods=['get'], url_path='trending')
     def trending(self, request, *args, **kwargs):
         try:
@@ -105,7 +162,6 @@ class PujoViewSet(viewsets.ModelViewSet):
                     # Create a new LastScoreModel entry
                     most_recent_pujo.search_score = most_recent_pujo.search_score + 1
                     most_recent_pujo.save(update_fields=['search_score'])
-                    most_recent_pujo.save()
                     LastScoreModel.objects.create(pujo=most_recent_pujo, value=1)
 
             serializer = TrendingPujoSerializer(trending_pujos, many=True)
@@ -295,7 +351,7 @@ class PujoTrendingIncreaseViewSet(viewsets.ModelViewSet):
                             pujo.search_score = pujo.search_score - 1
 
                         pujo.updated_at = timezone.now()
-                        pujo.save()
+                        pujo.save(update_fields=['search_score', 'updated_at'])
                         log.append({"id":str(pujo_id),  'result': 'Score decremented by 1'})
                     # Prepare the response with updated information
                     response_data = {
@@ -316,7 +372,7 @@ class PujoTrendingIncreaseViewSet(viewsets.ModelViewSet):
                         # Increment clicked Pujo's score by 2
                         pujo.search_score += 2
                         pujo.updated_at = timezone.now()
-                        pujo.save()
+                        pujo.save(update_fields=['search_score', 'updated_at'])
                         log.append({"id":str(pujo_id),  'result': 'Score incremented by 2'})
 
                     # Prepare the response with updated information
@@ -337,7 +393,7 @@ class PujoTrendingIncreaseViewSet(viewsets.ModelViewSet):
                         # Increment clicked Pujo's score by 2
                         pujo.search_score += 3
                         pujo.updated_at = timezone.now()
-                        pujo.save()
+                        pujo.save(update_fields=['search_score', 'updated_at'])
                         log.append({"id":str(pujo_id),  'result': 'Score incremented by 3'})
                 
                     # Prepare the response with updated information
@@ -388,11 +444,13 @@ class PujoSearchViewSet(viewsets.ModelViewSet):
                 filtered_results = results.distinct("id")
 
                 # Serialize the filtered queryset
-                serializer = PujoSerializer(filtered_results, many=True)
+                result, next_cursor = pujo_rows_page(filtered_results, request.query_params)
                 response_data = {
-                    'result': serializer.data,
+                    'result': result,
                     'status': ResponseStatus.SUCCESS.value
                 }
+                if pujo_paginator.requested(request.query_params):
+                    response_data['next_cursor'] = next_cursor
                 return Response(response_data, status=status.HTTP_200_OK)
             else:
                 logger.error(f"Error: {str(serializer.errors)}")
@@ -401,6 +459,60 @@ class PujoSearchViewSet(viewsets.ModelViewSet):
                     'status': ResponseStatus.FAIL.value
                 }, status=status.HTTP_400_BAD_REQUEST)
 
+        except ValueError as e:
+            response_data = {
+                'error': str(e),
+                'status': ResponseStatus.FAIL.value
+            }
+            logger.error(f"Error: {response_data['error']}")
+            return Response(response_data, status=status.HTTP_400_BAD_REQUEST)
+        except Exception as e:
+            response_data = {
+                'error': str(e),
+                'status': ResponseStatus.FAIL.value
+            }
+            logger.error(f"Error: {response_data['error']}")
+            return Response(response_data, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+                
+
+
+class PujoBatchView(APIView):
+    """Fetch many pujos by id in one call, e.g. to hydrate a whole screen of saved pujos."""
+    permission_classes = [permissions.AllowAny]
+    authentication_classes = [ClaimsJWTAuthentication]
+
+    def get(self, request):
+        ids = [pujo_id for pujo_id in request.query_params.get('ids', '').split(',') if pujo_id]
+        return self.fetch(request, {'ids': ids})
+
+    def post(self, request):
+        return self.fetch(request, request.data)
+
+    def fetch(self, request, data):
+        serializer = PujoBatchSerializer(data=data)
+        if not serializer.is_valid():
+            logger.error(f"Error: {str(serializer.errors)}")
+            return Response({
+                'error': serializer.errors,
+                'status': ResponseStatus.FAIL.value
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            # Requested order, without duplicates
+            ids = list(dict.fromkeys(str(pujo_id) for pujo_id in serializer.validated_data['ids']))
+
+            found = get_cached_pujos(ids)
+            uncached = [pujo_id for pujo_id in ids if pujo_id not in found]
+            if uncached:
+                # One query and one serialization pass for everything the cache did not have
+                loaded = PujoSerializer(Pujo.objects.filter(id__in=uncached), many=True).data
+                cache_pujos(loaded)
+                found.update((data['id'], data) for data in loaded)
+
+            missing = [pujo_id for pujo_id in ids if pujo_id not in found]
+            if missing:
+                logger.error(f"Error: {len(missing)} of {len(ids)} requested pujos do not exist")
         except Exception as e:
             response_data = {
                 'error': str(e),
@@ -409,4 +521,69 @@ class PujoSearchViewSet(viewsets.ModelViewSet):
             logger.error(f"Error: {response_data['error']}")
             return Response(response_data, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
-                
\ No newline at end of file
+        response_data = {
+            'result': [found[pujo_id] for pujo_id in ids if pujo_id in found],
+            'missing': missing,
+            'message': 'Pujos fetched',
+            'status': ResponseStatus.SUCCESS.value
+        }
+        return Response(response_data, status=status.HTTP_200_OK)
+
+
+class PujoChangesView(APIView):
+    """Pujos created, updated or deleted since a catalogue version, so clients can sync a delta."""
+    permission_classes = [permissions.AllowAny]
+    authentication_classes = [ClaimsJWTAuthentication]
+
+    def get(self, request):
+        try:
+            since = int(request.query_params.get('since', ''))
+        except ValueError:
+            response_data = {
+                'error': 'since must be a catalogue version',
+                'status': ResponseStatus.FAIL.value
+            }
+            logger.error(f"Error: {response_data['error']}")
+            return Response(response_data, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            # Read before the rows: every change up to it is committed and visible to the queries below,
+            # and anything still in flight has a higher version and is sent next time
+            version = catalogue_watermark()
+            horizon = TombstoneCompaction.objects.order_by('-version').values_list('version', flat=True).first() or 0
+            limit = settings.PUJO_CHANGES_MAX_ROWS
+
+            full_resync = since < horizon
+            updated, deleted = [], []
+            if not full_resync:
+                updated = pujo_rows.data(Pujo.objects.filter(version__gt=since).order_by('version')[:limit + 1])
+                updated_ids = {data['id'] for data in updated}
+                deleted = [
+                    pujo_id for pujo_id in dict.fromkeys(
+                        str(pujo_id) for pujo_id in PujoTombstone.objects.filter(version__gt=since)
+                        .order_by('version').values_list('pujo_id', flat=True)[:limit + 1]
+                    ) if pujo_id not in updated_ids
+                ]
+                full_resync = len(updated) + len(deleted) > limit
+
+            if full_resync:
+                updated, deleted = [], []
+
+            response_data = {
+                'result': {
+                    'version': version,
+                    'full_resync': full_resync,
+                    'updated': updated,
+                    'deleted': deleted,
+                },
+                'message': 'Full resync required' if full_resync else 'Pujo changes fetched',
+                'status': ResponseStatus.SUCCESS.value
+            }
+            return Response(response_data, status=status.HTTP_200_OK)
+        except Exception as e:
+            response_data = {
+                'error': str(e),
+                'status': ResponseStatus.FAIL.value
+            }
+            logger.error(f"Error: {response_data['error']}")
+            return Response(response_data, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
@@ -1,10 +1,10 @@
 from django.contrib import admin
-from import_export.admin import ImportExportModelAdmin
+from jobs.admin import BackgroundImportExportMixin
 from . import models as review_models
 from . import resource as review_resource
 # Register your models here.
-class ReviewAdmin(ImportExportModelAdmin):
+class ReviewAdmin(BackgroundImportExportMixin, admin.ModelAdmin):
     resource_class = review_resource.ReviewResource
-    list_display = [field.name for field in review_models.Review._meta.fields]
+    list_display = [field.name for field in review_models.Review._meta.fields if field.name != 'search_vector']
 
 admin.site.register(review_models.Review, ReviewAdmin)
\ No newline at end of file
@@ -0,0 +1,78 @@
+import time
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from reviews.models import SEARCH_CONFIG
+
+# Words reviewers actually use, drowned in filler so each one matches a realistic share of reviews
+REVIEW_WORDS = [
+    'crowd', 'food', 'queue', 'lighting', 'idol', 'theme', 'pandal', 'dhak', 'bhog', 'music',
+    'parking', 'metro', 'crowded', 'beautiful', 'artistic', 'traditional', 'wait', 'security', 'clean', 'stalls',
+]
+FILLER_WORDS = 5000
+BENCH_TABLE = 'review_search_benchmark'
+
+
+class Command(BaseCommand):
+    help = 'Compare icontains with the review search vector on generated reviews in a temporary table'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=1000000, help='Number of reviews to generate')
+        parser.add_argument('--term', default='crowd', help='Word to search for')
+        parser.add_argument('--limit', type=int, default=20, help='Page size of the first page')
+        parser.add_argument('--repeat', type=int, default=5, help='Best of this many runs is reported')
+
+    def handle(self, *args, **options):
+        words = REVIEW_WORDS + [f"word{index}" for index in range(FILLER_WORDS)]
+        # Everything happens in one rolled back transaction, the temporary table never outlives the command
+        with transaction.atomic(), connection.cursor() as cursor:
+            start = time.perf_counter()
+            cursor.execute(f"""
+                CREATE TEMPORARY TABLE {BENCH_TABLE} (
+                    id bigserial PRIMARY KEY,
+                    review text NOT NULL,
+                    search_vector tsvector GENERATED ALWAYS AS (to_tsvector(%s::regconfig, review)) STORED
+                ) ON COMMIT DROP
+            """, [SEARCH_CONFIG])
+            # The reference to g makes the subquery run per row instead of once
+            cursor.execute(f"""
+                INSERT INTO {BENCH_TABLE} (review)
+                SELECT (SELECT string_agg((%s::text[])[1 + floor(random() * %s)::int], ' ') FROM generate_series(1, 12 + g %% 8))
+                FROM generate_series(1, %s) g
+            """, [words, len(words), options['rows']])
+            cursor.execute(f"CREATE INDEX ON {BENCH_TABLE} USING gin (search_vector)")
+            cursor.execute(f"ANALYZE {BENCH_TABLE}")
+            self.stdout.write(f"Generated {options['rows']} reviews in {time.perf_counter() - start:.1f}s")
+
+            # The same SQL Django emits for review__icontains and for /review/search
+            pattern = f"%{options['term']}%"
+            contains_filter = "UPPER(review::text) LIKE UPPER(%s)"
+            search_from = f"{BENCH_TABLE}, websearch_to_tsquery(%s::regconfig, %s) query"
+            queries = [
+                ('icontains page', f"SELECT id FROM {BENCH_TABLE} WHERE {contains_filter} ORDER BY id DESC LIMIT %s", [pattern, options['limit']]),
+                ('icontains count', f"SELECT count(*) FROM {BENCH_TABLE} WHERE {contains_filter}", [pattern]),
+                ('search page', f"SELECT id, ts_rank(search_vector, query) AS rank FROM {search_from} WHERE search_vector @@ query ORDER BY rank DESC, id DESC LIMIT %s",
+                 [SEARCH_CONFIG, options['term'], options['limit']]),
+                ('search count', f"SELECT count(*) FROM {search_from} WHERE search_vector @@ query", [SEARCH_CONFIG, options['term']]),
+            ]
+            timings = {}
+            for label, sql, params in queries:
+                timings[label], rows = self.measure(options['repeat'], cursor, sql, params)
+                result = rows[0][0] if label.endswith('count') else f"{len(rows)} rows"
+                self.stdout.write(f"{label:<16} {timings[label] * 1000:9.1f} ms  ({result})")
+
+            transaction.set_rollback(True)
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Search is {timings['icontains page'] / timings['search page']:.1f}x faster for the first page and "
+            f"{timings['icontains count'] / timings['search count']:.1f}x for the count of '{options['term']}'"
+        ))
+
+    def measure(self, repeat, cursor, sql, params):
+        best, rows = None, None
+        for _ in range(max(1, repeat)):
+            start = time.perf_counter()
+            cursor.execute(sql, params)
+            rows = cursor.fetchall()
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        return best, rows
@@ -1,8 +1,13 @@
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVector, SearchVectorField
 from django.db import models
 from pujo.models import Pujo
 from user.models import User
 import uuid
 
+# Text search configuration of the review search vector; queries have to use the same one
+SEARCH_CONFIG = 'english'
+
 # Create your models here.
 class Review(models.Model):
     id = models.UUIDField(default=uuid.uuid5, editable=False, unique=True, primary_key=True)
@@ -12,6 +17,21 @@ class Review(models.Model):
     created_at = models.DateField(auto_now_add=True, editable=False)
     is_edited = models.BooleanField(default=False)
     edited_at = models.DateField(null=True)
+    # Kept in step with `review` by Postgres itself; searched through the GIN index below
+    search_vector = models.GeneratedField(
+        expression=SearchVector('review', config=SEARCH_CONFIG),
+        output_field=SearchVectorField(),
+        db_persist=True,
+    )
+
+    class Meta:
+        # Newest-first keyset pages over all reviews, one pujo's or one user's, and full-text search
+        indexes = [
+            models.Index(fields=['-created_at', '-id'], name='review_created_idx'),
+            models.Index(fields=['pujo', '-created_at', '-id'], name='review_pujo_created_idx'),
+            models.Index(fields=['user', '-created_at', '-id'], name='review_user_created_idx'),
+            GinIndex(fields=['search_vector'], name='review_search_idx'),
+        ]
 
     def __str__(self) -> str:
         return self.id
\ No newline at end of file
@@ -4,4 +4,6 @@ from . import models as review_models
 # Create your tests here.
 class ReviewResource(resources.ModelResource):
     class Meta:
-        model = review_models.Review
\ No newline at end of file
+        model = review_models.Review
+        # Generated by Postgres, never imported or exported
+        exclude = ('search_vector',)
\ No newline at end of file
@@ -2,12 +2,34 @@ from rest_framework import serializers
 from .models import Review
 
 class ReviewDetailsSerializer(serializers.ModelSerializer):
+    # Display fields of the author, loaded with select_related('user')
+    username = serializers.CharField(source='user.username', read_only=True)
+    profile_picture = serializers.CharField(source='user.profile_picture', read_only=True)
+
     class Meta:
         model = Review
-        fields = "__all__"
+        exclude = ["search_vector"]
 
 
 class ReviewSerializer(serializers.ModelSerializer):
+    username = serializers.CharField(source='user.username', read_only=True)
+    profile_picture = serializers.CharField(source='user.profile_picture', read_only=True)
+
     class Meta:
         model = Review
-        fields = ["pujo_id", "user_id", "review", "created_at"]
\ No newline at end of file
+        fields = ["pujo_id", "user_id", "username", "profile_picture", "review", "created_at"]
+
+    def __init__(self, *args, fields=None, **kwargs):
+        # Optional subset of Meta.fields to render
+        super().__init__(*args, **kwargs)
+        if fields is not None:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+
+
+
+class ReviewSearchSerializer(ReviewSerializer):
+    rank = serializers.FloatField(read_only=True)
+
+    class Meta(ReviewSerializer.Meta):
+        fields = ["id", *ReviewSerializer.Meta.fields, "rank"]
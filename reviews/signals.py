@@ -0,0 +1,27 @@
+from django.db.models import F, OuterRef, Subquery, Value
+from django.db.models.functions import Greatest
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from pujo.models import Pujo
+from .models import Review
+
+
+@receiver(post_save, sender=Review)
+def review_created(sender, instance, created, **kwargs):
+    if not created:
+        return
+    # One UPDATE; GREATEST skips the NULL of a pujo's first review
+    Pujo.objects.filter(pk=instance.pujo_id).update(
+        review_count=F('review_count') + 1,
+        last_reviewed_at=Greatest(F('last_reviewed_at'), Value(instance.created_at)),
+    )
+
+
+@receiver(post_delete, sender=Review)
+def review_deleted(sender, instance, **kwargs):
+    # The latest remaining review is one index probe on (pujo, -created_at); NULL when none is left
+    latest = Review.objects.filter(pujo_id=OuterRef('pk')).order_by('-created_at').values('created_at')[:1]
+    Pujo.objects.filter(pk=instance.pujo_id).update(
+        review_count=F('review_count') - 1,
+        last_reviewed_at=Subquery(latest),
+    )
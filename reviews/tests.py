@@ -0,0 +1,92 @@
+import uuid
+from django.test import TestCase
+from django.urls import reverse
+from pujo.models import Pujo
+from user.models import User
+from user.tokens import UserRefreshToken
+from .models import Review
+
+
+class ReviewListTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='reviewer', email='reviewer@example.com', password='secret')
+        self.client.defaults['HTTP_AUTHORIZATION'] = f"Bearer {UserRefreshToken.for_user(self.user).access_token}"
+        self.pujo = Pujo.objects.create(name='lake pujo', lat=22.5, lon=88.3, address='lake road', city='kolkata', zone='south')
+        self.reviews = [
+            Review.objects.create(id=uuid.uuid4(), pujo=self.pujo, user=self.user, review=f"review {index}")
+            for index in range(3)
+        ]
+
+    def test_lists_are_complete_without_pagination_params(self):
+        for url in (reverse('reviews-user', args=[self.user.id]), reverse('reviews-pujo', args=[self.pujo.id])):
+            with self.assertNumQueries(2):  # the user's state and the reviews
+                body = self.client.get(url).json()
+            self.assertEqual(len(body['result']), 3)
+            self.assertNotIn('next_cursor', body)
+
+    def test_lists_are_paged_on_request(self):
+        for url in (reverse('reviews-user', args=[self.user.id]), reverse('reviews-pujo', args=[self.pujo.id])):
+            first = self.client.get(url, {'limit': 2}).json()
+            second = self.client.get(url, {'limit': 2, 'cursor': first['next_cursor']}).json()
+
+            self.assertEqual(len(first['result']), 2)
+            self.assertEqual(len(second['result']), 1)
+            self.assertIsNone(second['next_cursor'])
+            self.assertEqual(
+                {review['id'] for review in first['result'] + second['result']},
+                {str(review.id) for review in self.reviews},
+            )
+
+    def test_no_reviews_is_not_found(self):
+        other = Pujo.objects.create(name='quiet pujo', lat=22.5, lon=88.3, address='quiet road', city='kolkata', zone='north')
+        response = self.client.get(reverse('reviews-pujo', args=[other.id]))
+        self.assertEqual(response.status_code, 404)
+
+
+class ReviewSearchTest(TestCase):
+    def setUp(self):
+        user = User.objects.create_user(username='reviewer', email='reviewer@example.com', password='secret')
+        self.lake = Pujo.objects.create(name='lake pujo', lat=22.5, lon=88.3, address='lake road', city='kolkata', zone='south')
+        self.park = Pujo.objects.create(name='park pujo', lat=22.5, lon=88.3, address='park road', city='kolkata', zone='north')
+        texts = [
+            (self.lake, 'Beautiful lighting, the lighting alone is worth the queue'),
+            (self.lake, 'Lighting was fine but the queue was long'),
+            (self.park, 'Lovely idol and good lighting'),
+            (self.park, 'Crowded, skip it'),
+        ]
+        self.reviews = [Review.objects.create(id=uuid.uuid4(), pujo=pujo, user=user, review=text) for pujo, text in texts]
+
+    def search(self, **params):
+        response = self.client.get(reverse('review-search'), params)
+        return response.status_code, response.json()
+
+    def test_matches_best_first(self):
+        status, body = self.search(q='lighting')
+
+        self.assertEqual(status, 200)
+        ids = [review['id'] for review in body['result']]
+        self.assertEqual(set(ids), {str(review.id) for review in self.reviews[:3]})
+        self.assertEqual(ids[0], str(self.reviews[0].id))
+        ranks = [review['rank'] for review in body['result']]
+        self.assertEqual(ranks, sorted(ranks, reverse=True))
+
+    def test_websearch_syntax_and_pujo_filter(self):
+        _, body = self.search(q='lighting -queue')
+        self.assertEqual([review['id'] for review in body['result']], [str(self.reviews[2].id)])
+
+        _, body = self.search(q='lighting', pujo_id=str(self.park.id))
+        self.assertEqual([review['id'] for review in body['result']], [str(self.reviews[2].id)])
+
+    def test_pages_follow_the_rank_without_repeats(self):
+        _, first = self.search(q='lighting', limit=2)
+        _, second = self.search(q='lighting', limit=2, cursor=first['next_cursor'])
+
+        self.assertEqual(len(first['result']), 2)
+        self.assertEqual(len(second['result']), 1)
+        self.assertIsNone(second['next_cursor'])
+        ids = [review['id'] for review in first['result'] + second['result']]
+        self.assertEqual(len(set(ids)), 3)
+
+    def test_bad_input(self):
+        self.assertEqual(self.search()[0], 400)
+        self.assertEqual(self.search(q='lighting', pujo_id='lake')[0], 400)
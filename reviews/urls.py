@@ -13,6 +13,8 @@ review_details = ReviewViewSet.as_view({
 
 urlpatterns = [
     path('list', ReviewViewSet.as_view({'get':"get_all_reviews"}), name='all_reviews'),
+    # Routed by hand, so the action's own permission_classes (AllowAny) are passed along
+    path('search', ReviewViewSet.as_view({'get':"search"}, **ReviewViewSet.search.kwargs), name='review-search'),
     path('create', review_create, name="review-create"),
     path('<uuid:uuid>', review_details, name="review_details"),
     path('user_reviews/<uuid:user_id>', ReviewViewSet.as_view({'get':"get_reviews_user_id"}), name="reviews-user"),
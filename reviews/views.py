@@ -1,43 +1,143 @@
 from rest_framework import viewsets, status
 from rest_framework.response import Response
-from .models import Review
-from .serializers import ReviewDetailsSerializer, ReviewSerializer
+from .models import SEARCH_CONFIG, Review
+from .serializers import ReviewDetailsSerializer, ReviewSearchSerializer, ReviewSerializer
 from core.ResponseStatus import ResponseStatus
 from django.utils import timezone
 from user.permission import IsAuthenticatedUser
-from rest_framework_simplejwt.authentication import JWTAuthentication
+from user.authentication import ClaimsJWTAuthentication
 from rest_framework import permissions
 import logging
 from rest_framework.decorators import action
 from rest_framework.permissions import AllowAny
+from core.pagination import KeysetPaginator, requested_fields
+from django.contrib.postgres.search import SearchQuery, SearchRank
+from django.db.models import F, FloatField
+from django.db.models.functions import Cast
+import uuid
 
 
 logger = logging.getLogger("review")
+
+# Newest first; the id breaks ties between reviews from the same day
+review_paginator = KeysetPaginator(ordering=('-created_at', '-id'))
+# Columns each response key reads, so a page loads only what is rendered
+REVIEW_COLUMNS = {
+    'id': ['id'], 'pujo': ['pujo'], 'pujo_id': ['pujo'], 'user': ['user'], 'user_id': ['user'],
+    'review': ['review'], 'created_at': ['created_at'], 'is_edited': ['is_edited'], 'edited_at': ['edited_at'],
+    'username': ['user', 'user__username'], 'profile_picture': ['user', 'user__profile_picture'],
+    # Annotated by the search, not a column
+    'rank': [],
+}
+# Best match first; the id breaks ties between equally ranked reviews
+review_search_paginator = KeysetPaginator(ordering=('-rank', '-id'), page_size=20, max_page_size=100)
+
+
+def review_rows(queryset, keys, ordering=()):
+    """Reviews loading only the columns behind `keys` (and `ordering`), authors joined in the same query."""
+    columns = {column for key in keys for column in REVIEW_COLUMNS[key]}
+    if any(column.startswith('user__') for column in columns):
+        queryset = queryset.select_related('user')
+    ordering = [field for field in ordering if field not in queryset.query.annotations]
+    return queryset.only(*columns, *ordering)
+
+
+def review_page(queryset, params, keys, paginator=review_paginator):
+    """One page of reviews and the cursor of the next, authors included, in a single query."""
+    return paginator.paginate(review_rows(queryset, keys, paginator.fields), params)
+
 # Create your views here.
 class ReviewViewSet(viewsets.ModelViewSet):
     serializer_class = ReviewDetailsSerializer
     permission_classes=[IsAuthenticatedUser]
-    authentication_classes=[JWTAuthentication]
+    authentication_classes=[ClaimsJWTAuthentication]
     lookup_field = 'id'
 
     def get_queryset(self):
-        return Review.objects.all()
+        # The search vector is only ever read by Postgres
+        return Review.objects.defer('search_vector')
     
     @action(detail=False, methods=['get'], permission_classes=[AllowAny])
     def get_all_reviews(self, request, *args, **kwargs):
-        reviews = self.get_queryset()
-        serializer = ReviewSerializer(reviews, many=True)
-        return Response({
+        params = request.query_params
+        paginated = review_paginator.requested(params)
+        try:
+            # Opt-in sparse fieldsets (?fields=) and keyset pagination (?cursor=&limit=);
+            # without cursor/limit every review is returned, as before
+            fields = requested_fields(params, ReviewSerializer.Meta.fields)
+            keys = fields or ReviewSerializer.Meta.fields
+            if paginated:
+                reviews, next_cursor = review_page(self.get_queryset(), params, keys)
+            else:
+                reviews = review_rows(self.get_queryset(), keys)
+        except ValueError as e:
+            response_data = {
+                'error': str(e),
+                'status': ResponseStatus.FAIL.value
+            }
+            user_id = request.user.id if request.user.is_authenticated else None
+            logger.error(f"Error: {response_data['error']}", extra={'user_id': user_id})
+            return Response(response_data, status=status.HTTP_400_BAD_REQUEST)
+
+        serializer = ReviewSerializer(reviews, many=True, fields=fields)
+        response_data = {
             'result': serializer.data,
             'status': ResponseStatus.SUCCESS.value
-        }, status=status.HTTP_200_OK)
+        }
+        if paginated:
+            response_data['next_cursor'] = next_cursor
+        return Response(response_data, status=status.HTTP_200_OK)
+
+    @action(detail=False, methods=['get'], permission_classes=[AllowAny])
+    def search(self, request, *args, **kwargs):
+        params = request.query_params
+        try:
+            term = params.get('q', '').strip()
+            if not term:
+                raise ValueError("q is required")
+            # websearch syntax: "quoted phrases", or, -excluded words
+            query = SearchQuery(term, search_type='websearch', config=SEARCH_CONFIG)
+            # ts_rank returns real; as double precision the rank in the cursor compares equal to the stored one
+            reviews = self.get_queryset().filter(search_vector=query).annotate(
+                rank=Cast(SearchRank(F('search_vector'), query), output_field=FloatField())
+            )
+            if params.get('pujo_id'):
+                try:
+                    reviews = reviews.filter(pujo_id=uuid.UUID(params['pujo_id']))
+                except ValueError:
+                    raise ValueError("pujo_id must be a UUID")
+            reviews, next_cursor = review_page(reviews, params, ReviewSearchSerializer.Meta.fields, paginator=review_search_paginator)
+        except ValueError as e:
+            response_data = {
+                'error': str(e),
+                'status': ResponseStatus.FAIL.value
+            }
+            user_id = request.user.id if request.user.is_authenticated else None
+            logger.error(f"Error: {response_data['error']}", extra={'user_id': user_id})
+            return Response(response_data, status=status.HTTP_400_BAD_REQUEST)
+
+        serializer = ReviewSearchSerializer(reviews, many=True)
+        response_data = {
+            'result': serializer.data,
+            'next_cursor': next_cursor,
+            'status': ResponseStatus.SUCCESS.value
+        }
+        return Response(response_data, status=status.HTTP_200_OK)
 
     @action(detail=False, methods=['get'], url_path='user_reviews/(?P<user_id>[^/.]+)', permission_classes=[IsAuthenticatedUser])
     def get_reviews_user_id(self, request, user_id, *args, **kwargs):
         try:
+            params = request.query_params
+            # Keyset pages only when ?cursor or ?limit ask for them; otherwise every review, as before
+            paginated = review_paginator.requested(params)
             reviews = self.get_queryset().filter(user_id=user_id)
+            if paginated:
+                reviews, next_cursor = review_page(reviews, params, self.get_serializer().fields)
+            else:
+                reviews = list(review_rows(reviews, self.get_serializer().fields))
 
-            if not reviews.exists():
+            # Only an empty first page means there are none; later pages run out at the end
+            if not reviews and not params.get('cursor'):
                 response_data = {
                     'error': "No reviews found by this user",
                     'status': ResponseStatus.FAIL.value
@@ -52,10 +152,20 @@ class ReviewViewSet(viewsets.ModelViewSet):
                 'message':'review fetched successfully',
                 'status': ResponseStatus.SUCCESS.value
             }
+            if paginated:
+                response_data['next_cursor'] = next_cursor
             user_id = request.user.id if request.user.is_authenticated else None
             logger.error(f"Success: {response_data['message']}", extra={'user_id': user_id})
             return Response(response_data, status=status.HTTP_200_OK)
 
+        except ValueError as e:
+            response_data = {
+                'error': str(e),
+                'status': ResponseStatus.FAIL.value
+            }
+            user_id = request.user.id if request.user.is_authenticated else None
+            logger.error(f"Error: {response_data['error']}", extra={'user_id': user_id})
+            return Response(response_data, status=status.HTTP_400_BAD_REQUEST)
         except Exception as e:
             response_data = {
                 'error': str(e),
@@ -69,9 +179,17 @@ class ReviewViewSet(viewsets.ModelViewSet):
     def get_reviews_pujo_id(self, request, pujo_id, *args, **kwargs):
 
         try:
+            params = request.query_params
+            # Keyset pages only when ?cursor or ?limit ask for them; otherwise every review, as before
+            paginated = review_paginator.requested(params)
             reviews = self.get_queryset().filter(pujo_id=pujo_id)
+            if paginated:
+                reviews, next_cursor = review_page(reviews, params, self.get_serializer().fields)
+            else:
+                reviews = list(review_rows(reviews, self.get_serializer().fields))
 
-            if not reviews.exists():
+            # Only an empty first page means there are none; later pages run out at the end
+            if not reviews and not params.get('cursor'):
                 response_data = {
                     'error': "No reviews found for this pujo",
                     'status': ResponseStatus.FAIL.value
@@ -86,10 +204,20 @@ class ReviewViewSet(viewsets.ModelViewSet):
                 'message':'Review fetched successfully',
                 'status': ResponseStatus.SUCCESS.value
             }
+            if paginated:
+                response_data['next_cursor'] = next_cursor
             user_id = request.user.id if request.user.is_authenticated else None
             logger.info(f"Success: {response_data['message']}", extra={'user_id': user_id})
             return Response(response_data, status=status.HTTP_200_OK)
 
+        except ValueError as e:
+            response_data = {
+                'error': str(e),
+                'status': ResponseStatus.FAIL.value
+            }
+            user_id = request.user.id if request.user.is_authenticated else None
+            logger.error(f"Error: {response_data['error']}", extra={'user_id': user_id})
+            return Response(response_data, status=status.HTTP_400_BAD_REQUEST)
         except Exception as e:
             response_data = {
                 'error': str(e),
@@ -1,9 +1,9 @@
-from import_export.admin import ImportExportModelAdmin
 from django.contrib import admin 
+from jobs.admin import BackgroundImportExportMixin
 from . import resource as user_resource  
 from . import models as user_models
 
-class UserAdmin(ImportExportModelAdmin):
+class UserAdmin(BackgroundImportExportMixin, admin.ModelAdmin):
     resource_class = user_resource.UserResource
     list_display =  [field.name for field in user_models.User._meta.fields]
 
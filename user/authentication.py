@@ -0,0 +1,113 @@
+import uuid
+from django.conf import settings
+from django.utils.functional import cached_property
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from .blacklist import token_blacklist
+from .user_cache import user_state_cache
+
+
+class TokenContext:
+    """Bearer token of the current request, decoded and verified once during authentication."""
+
+    def __init__(self, raw_token, validated_token):
+        self.raw_token = raw_token
+        self.token = validated_token
+        self.claims = validated_token.payload
+
+    @property
+    def user_id(self):
+        return self.claims.get(api_settings.USER_ID_CLAIM)
+
+    @cached_property
+    def is_blacklisted(self):
+        return token_blacklist.is_blacklisted(self.raw_token)
+
+
+class TokenContextAuthentication(JWTAuthentication):
+    """
+    JWTAuthentication that leaves the validated token on the request as `token_context`,
+    so permissions and views don't parse the header or verify the signature again.
+    """
+
+    def authenticate(self, request):
+        header = self.get_header(request)
+        if header is None:
+            return None
+
+        raw_token = self.get_raw_token(header)
+        if raw_token is None:
+            return None
+
+        validated_token = self.get_validated_token(raw_token)
+        request.token_context = TokenContext(raw_token.decode('utf-8'), validated_token)
+        return self.get_user(validated_token), validated_token
+
+
+class ClaimsUser:
+    """
+    Lightweight user built from token claims, exposing what permissions and views check.
+    `profile` loads the full User row for the few places that need it.
+    """
+
+    is_authenticated = True
+    is_anonymous = False
+
+    def __init__(self, id, username, user_type, is_verified, is_active=True):
+        self.id = uuid.UUID(str(id))
+        self.username = username
+        self.user_type = user_type
+        self.is_verified = is_verified
+        self.is_active = is_active
+
+    @property
+    def pk(self):
+        return self.id
+
+    @property
+    def is_staff(self):
+        return self.user_type in ['superadmin', 'admin']
+
+    @property
+    def is_superuser(self):
+        return self.user_type == 'superadmin'
+
+    @cached_property
+    def profile(self):
+        from .models import User
+        return User.objects.get(id=self.id)
+
+    def __eq__(self, other):
+        return getattr(other, 'id', None) == self.id
+
+    def __hash__(self):
+        return hash(self.id)
+
+    def __str__(self):
+        return str(self.id)
+
+
+class ClaimsJWTAuthentication(TokenContextAuthentication):
+    """
+    TokenContextAuthentication that resolves the user from signed claims through the
+    per-process user state cache instead of loading the full row on every request.
+    """
+
+    def get_user(self, validated_token):
+        if not settings.JWT_CLAIMS_USER:
+            return super().get_user(validated_token)
+
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken('Token contained no recognizable user identification')
+
+        state = user_state_cache.get(user_id, validated_token.payload)
+        if state is None:
+            raise AuthenticationFailed('User not found', code='user_not_found')
+        if not state['is_active']:
+            raise AuthenticationFailed('User is inactive', code='user_inactive')
+
+        return ClaimsUser(**state)
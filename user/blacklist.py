@@ -0,0 +1,146 @@
+import hashlib
+import logging
+import threading
+import time
+from collections import OrderedDict, deque
+from django.conf import settings
+from core.bloom import BloomFilter
+from core.broadcast import get_broadcast
+
+logger = logging.getLogger("user")
+
+CHANNEL = 'token-blacklist'
+
+
+def token_digest(token):
+    return hashlib.sha256(token.encode('utf-8')).hexdigest()
+
+
+class TokenBlacklist:
+    """
+    Membership layer in front of the BlacklistedToken table.
+
+    A Bloom filter built from the table answers most lookups without touching the
+    database; only Bloom positives are confirmed with a query. Confirmed answers are
+    kept in an LRU (negatives only for a short TTL). New entries are broadcast so
+    every process adds them to its filter, and the filter is rebuilt periodically.
+
+    Without a broadcaster that reaches other processes (no REDIS_URL), a token revoked
+    elsewhere would not be in this filter, so every lookup that is not a cached
+    positive goes to the table.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._rebuild_lock = threading.Lock()
+        self._bloom = None
+        self._built_at = 0
+        self._cache = OrderedDict()
+        self._recent = deque(maxlen=10000)
+        self._broadcast = None
+
+    def _get_broadcast(self):
+        if self._broadcast is None:
+            self._broadcast = get_broadcast(CHANNEL)
+            try:
+                self._broadcast.subscribe(self._on_added)
+            except Exception as e:
+                logger.error(f"Error: Token blacklist subscription failed: {str(e)}")
+        return self._broadcast
+
+    def rebuild(self):
+        from .models import BlacklistedToken
+        self._get_broadcast()
+
+        count = BlacklistedToken.objects.count()
+        bloom = BloomFilter(max(settings.TOKEN_BLACKLIST_CAPACITY, count * 2), settings.TOKEN_BLACKLIST_ERROR_RATE)
+        for digest in BlacklistedToken.objects.values_list('token_digest', flat=True).iterator(chunk_size=5000):
+            bloom.add(digest)
+
+        with self._lock:
+            # Entries that arrived while the table was being scanned
+            for digest in self._recent:
+                bloom.add(digest)
+            self._bloom = bloom
+            self._built_at = time.monotonic()
+
+    def _stale(self):
+        return self._bloom is None or time.monotonic() - self._built_at > settings.TOKEN_BLACKLIST_REBUILD_SECONDS
+
+    def _ensure_built(self):
+        if not self._stale():
+            return
+        if self._bloom is None:
+            # Nothing to answer from yet, so wait for whichever request is building it
+            with self._rebuild_lock:
+                if self._stale():
+                    self.rebuild()
+        elif self._rebuild_lock.acquire(blocking=False):
+            # One request reloads the table; the others keep using the old filter meanwhile
+            try:
+                if self._stale():
+                    self.rebuild()
+            finally:
+                self._rebuild_lock.release()
+
+    def _cache_get(self, digest):
+        with self._lock:
+            entry = self._cache.get(digest)
+            if entry is None:
+                return None
+            blacklisted, expires_at = entry
+            if expires_at is not None and expires_at < time.monotonic():
+                del self._cache[digest]
+                return None
+            self._cache.move_to_end(digest)
+            return blacklisted
+
+    def _cache_set(self, digest, blacklisted):
+        expires_at = None if blacklisted else time.monotonic() + settings.TOKEN_BLACKLIST_NEGATIVE_TTL
+        with self._lock:
+            self._cache[digest] = (blacklisted, expires_at)
+            self._cache.move_to_end(digest)
+            while len(self._cache) > settings.TOKEN_BLACKLIST_CACHE_SIZE:
+                self._cache.popitem(last=False)
+
+    def _on_added(self, digest):
+        with self._lock:
+            self._recent.append(digest)
+            if self._bloom is not None:
+                self._bloom.add(digest)
+            self._cache_set(digest, True)
+
+    def is_blacklisted(self, token):
+        from .models import BlacklistedToken
+        digest = token_digest(token)
+
+        cached = self._cache_get(digest)
+        if cached:
+            return True
+
+        if not self._get_broadcast().shared:
+            blacklisted = BlacklistedToken.objects.filter(token_digest=digest).exists()
+            if blacklisted:
+                self._cache_set(digest, True)
+            return blacklisted
+
+        if cached is not None:
+            return cached
+        self._ensure_built()
+        if digest not in self._bloom:
+            return False
+
+        blacklisted = BlacklistedToken.objects.filter(token_digest=digest).exists()
+        self._cache_set(digest, blacklisted)
+        return blacklisted
+
+    def added(self, digest):
+        """Record a token digest that was just written to the table, here and in every other process."""
+        self._on_added(digest)
+        try:
+            self._get_broadcast().publish(digest)
+        except Exception as e:
+            logger.error(f"Error: Token blacklist broadcast failed: {str(e)}")
+
+
+token_blacklist = TokenBlacklist()
@@ -0,0 +1,33 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from django.db import close_old_connections
+
+
+class BoundedExecutor:
+    """
+    Thread pool with a hard cap on running plus queued jobs.
+
+    try_submit returns None instead of queueing once the cap is reached, so callers
+    can answer 503 straight away rather than piling up behind a login burst.
+    """
+
+    def __init__(self, workers, queue_size, name='login'):
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix=name)
+        self._slots = threading.BoundedSemaphore(workers + queue_size)
+
+    def try_submit(self, fn, *args, **kwargs):
+        if not self._slots.acquire(blocking=False):
+            return None
+        try:
+            return self._executor.submit(self._run, fn, args, kwargs)
+        except Exception:
+            self._slots.release()
+            raise
+
+    def _run(self, fn, args, kwargs):
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            # Worker threads live outside the request cycle, so release their DB connections here
+            close_old_connections()
+            self._slots.release()
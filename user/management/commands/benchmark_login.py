@@ -0,0 +1,98 @@
+import json
+import statistics
+import threading
+import time
+import urllib.error
+import urllib.request
+from collections import Counter
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = (
+        'Measure login throughput and /pujo/list latency during a login burst against a running server. '
+        'The login pool only frees workers when the server runs under ASGI (see README)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--base-url', default='http://127.0.0.1:8000', help='Server to benchmark')
+        parser.add_argument('--username', required=True, help='Existing account used for every login')
+        parser.add_argument('--password', required=True)
+        parser.add_argument('--logins', type=int, default=50, help='Concurrent clients logging in during the burst')
+        parser.add_argument('--readers', type=int, default=4, help='Concurrent clients fetching /pujo/list throughout')
+        parser.add_argument('--duration', type=float, default=10, help='Seconds per phase')
+
+    def handle(self, *args, **options):
+        base_url = options['base_url'].rstrip('/')
+        login_body = json.dumps({'username': options['username'], 'password': options['password']}).encode('utf-8')
+
+        def fetch_list():
+            return self.request(f"{base_url}/pujo/list")
+
+        def login():
+            return self.request(f"{base_url}/login", data=login_body, headers={'Content-Type': 'application/json'})
+
+        if fetch_list()[0] != 200:
+            raise CommandError(f"{base_url}/pujo/list is not answering 200")
+
+        quiet = self.run_clients({'list': (fetch_list, options['readers'])}, options['duration'])
+        burst = self.run_clients({'list': (fetch_list, options['readers']), 'login': (login, options['logins'])}, options['duration'])
+
+        self.report('/pujo/list alone', quiet['list'], options['duration'])
+        self.report('/pujo/list during burst', burst['list'], options['duration'])
+        self.report('/login during burst', burst['login'], options['duration'])
+
+        quiet_p95, burst_p95 = self.percentile(quiet['list'], 95), self.percentile(burst['list'], 95)
+        logins = sum(1 for status, _ in burst['login'] if status == 200)
+        self.stdout.write(self.style.SUCCESS(
+            f"{logins / options['duration']:.1f} logins/s; /pujo/list p95 went from {quiet_p95 * 1000:.0f} ms to {burst_p95 * 1000:.0f} ms"
+        ))
+
+    def request(self, url, data=None, headers=None):
+        start = time.perf_counter()
+        try:
+            with urllib.request.urlopen(urllib.request.Request(url, data=data, headers=headers or {}), timeout=60) as response:
+                response.read()
+                status = response.status
+        except urllib.error.HTTPError as e:
+            status = e.code
+        except (urllib.error.URLError, TimeoutError):
+            status = None
+        return status, time.perf_counter() - start
+
+    def run_clients(self, clients, duration):
+        """Run every client in its own thread as fast as it can for `duration` seconds; (status, seconds) per call."""
+        results = {name: [] for name in clients}
+        lock = threading.Lock()
+        deadline = time.monotonic() + duration
+
+        def loop(name, call):
+            while time.monotonic() < deadline:
+                outcome = call()
+                with lock:
+                    results[name].append(outcome)
+
+        threads = [
+            threading.Thread(target=loop, args=(name, call), daemon=True)
+            for name, (call, count) in clients.items() for _ in range(count)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return results
+
+    def percentile(self, results, percent):
+        latencies = sorted(seconds for status, seconds in results if status == 200)
+        if not latencies:
+            return float('nan')
+        return latencies[min(len(latencies) - 1, int(len(latencies) * percent / 100))]
+
+    def report(self, label, results, duration):
+        statuses = Counter('failed' if status is None else status for status, _ in results)
+        latencies = [seconds for status, seconds in results if status == 200]
+        median = statistics.median(latencies) * 1000 if latencies else float('nan')
+        self.stdout.write(
+            f"{label:<24} {len(results) / duration:7.1f} req/s  p50 {median:6.0f} ms  "
+            f"p95 {self.percentile(results, 95) * 1000:6.0f} ms  {dict(statuses)}"
+        )
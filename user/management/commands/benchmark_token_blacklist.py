@@ -0,0 +1,87 @@
+import random
+import time
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from user.blacklist import token_digest
+
+OLD_TABLE = 'token_blacklist_benchmark_old'
+NEW_TABLE = 'token_blacklist_benchmark_new'
+
+
+class Command(BaseCommand):
+    help = 'Compare blacklist lookups and index size of whole stored tokens with expiring digests, in temporary tables'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=500000, help='Number of logouts to generate')
+        parser.add_argument('--active', type=float, default=0.05, help='Share of the tokens that have not expired yet')
+        parser.add_argument('--lookups', type=int, default=5000, help='Lookups timed per table, half of them hits')
+        parser.add_argument('--token-length', type=int, default=300, help='Length of a generated encoded token')
+
+    def handle(self, *args, **options):
+        # Everything happens in one rolled back transaction, the temporary tables never outlive the command
+        with transaction.atomic(), connection.cursor() as cursor:
+            start = time.perf_counter()
+            # The schema before the digest migration: the whole token, unique
+            cursor.execute(f"CREATE TEMPORARY TABLE {OLD_TABLE} (id bigserial PRIMARY KEY, token varchar(512) UNIQUE NOT NULL) ON COMMIT DROP")
+            # The schema of BlacklistedToken now
+            cursor.execute(f"""
+                CREATE TEMPORARY TABLE {NEW_TABLE} (
+                    id bigserial PRIMARY KEY,
+                    token_digest varchar(64) UNIQUE NOT NULL,
+                    expires_at timestamptz NOT NULL,
+                    blacklisted_at timestamptz NOT NULL
+                ) ON COMMIT DROP
+            """)
+            cursor.execute(f"CREATE INDEX ON {NEW_TABLE} (expires_at)")
+            # Stand-ins for encoded JWTs: long, random and unique
+            cursor.execute(f"""
+                INSERT INTO {OLD_TABLE} (token)
+                SELECT left(string_agg(md5(g::text || '-' || part::text), '' ORDER BY part), %s)
+                FROM generate_series(1, %s) g, generate_series(1, ceil(%s / 32.0)::int) part
+                GROUP BY g
+            """, [options['token_length'], options['rows'], options['token_length']])
+            cursor.execute(f"""
+                INSERT INTO {NEW_TABLE} (token_digest, expires_at, blacklisted_at)
+                SELECT encode(sha256(convert_to(token, 'UTF8')), 'hex'),
+                       now() + CASE WHEN random() < %s THEN interval '1 hour' ELSE interval '-1 hour' END, now()
+                FROM {OLD_TABLE}
+            """, [options['active']])
+            cursor.execute(f"ANALYZE {OLD_TABLE}")
+            cursor.execute(f"ANALYZE {NEW_TABLE}")
+            self.stdout.write(f"Generated {options['rows']} logouts in {time.perf_counter() - start:.1f}s")
+
+            old_size = self.index_size(cursor, OLD_TABLE)
+            digest_size = self.index_size(cursor, NEW_TABLE)
+            # What purge_expired_blacklisted_tokens leaves behind, with the index rebuilt as autovacuum eventually would
+            cursor.execute(f"DELETE FROM {NEW_TABLE} WHERE expires_at <= now()")
+            purged = cursor.rowcount
+            cursor.execute(f"REINDEX TABLE {NEW_TABLE}")
+            purged_size = self.index_size(cursor, NEW_TABLE)
+
+            cursor.execute(f"SELECT token FROM {OLD_TABLE} ORDER BY random() LIMIT %s", [options['lookups'] // 2])
+            hits = [row[0] for row in cursor.fetchall()]
+            misses = [f"{token[:-8]}{random.getrandbits(32):08x}" for token in hits]
+            tokens = hits + misses
+            random.shuffle(tokens)
+
+            old_time = self.measure(cursor, f"SELECT EXISTS (SELECT 1 FROM {OLD_TABLE} WHERE token = %s)", tokens)
+            # Digests are hashed in Python like TokenBlacklist does, so that cost is included
+            new_time = self.measure(cursor, f"SELECT EXISTS (SELECT 1 FROM {NEW_TABLE} WHERE token_digest = %s)", tokens, token_digest)
+
+            transaction.set_rollback(True)
+
+        self.stdout.write(f"Whole tokens:     index {old_size / 1024 / 1024:8.1f} MB, {old_time / len(tokens) * 1e6:7.1f} us per lookup")
+        self.stdout.write(f"Digests:          index {digest_size / 1024 / 1024:8.1f} MB")
+        self.stdout.write(f"Digests, purged:  index {purged_size / 1024 / 1024:8.1f} MB, {new_time / len(tokens) * 1e6:7.1f} us per lookup ({purged} expired rows dropped)")
+        self.stdout.write(self.style.SUCCESS(f"Index is {old_size / max(purged_size, 1):.1f}x smaller after purging"))
+
+    def index_size(self, cursor, table):
+        cursor.execute("SELECT pg_indexes_size(%s::regclass)", [table])
+        return cursor.fetchone()[0]
+
+    def measure(self, cursor, sql, tokens, key=lambda token: token):
+        start = time.perf_counter()
+        for token in tokens:
+            cursor.execute(sql, [key(token)])
+            cursor.fetchone()
+        return time.perf_counter() - start
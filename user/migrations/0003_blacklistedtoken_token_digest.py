@@ -0,0 +1,62 @@
+# Generated by Django 5.0 on 2026-10-19 10:00
+
+import hashlib
+from datetime import datetime, timedelta, timezone
+from django.db import migrations, models
+
+
+def hash_existing_tokens(apps, schema_editor):
+    import jwt
+    BlacklistedToken = apps.get_model('user', 'BlacklistedToken')
+    now = datetime.now(tz=timezone.utc)
+
+    for entry in BlacklistedToken.objects.all().iterator(chunk_size=2000):
+        try:
+            exp = jwt.decode(entry.token, options={'verify_signature': False})['exp']
+            expires_at = datetime.fromtimestamp(exp, tz=timezone.utc)
+        except Exception:
+            # Unreadable tokens are kept for the longest token lifetime
+            expires_at = now + timedelta(days=1)
+
+        if expires_at <= now:
+            entry.delete()
+            continue
+
+        entry.token_digest = hashlib.sha256(entry.token.encode('utf-8')).hexdigest()
+        entry.expires_at = expires_at
+        entry.save(update_fields=['token_digest', 'expires_at'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('user', '0002_user_pandal_visits'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='blacklistedtoken',
+            name='token_digest',
+            field=models.CharField(max_length=64, null=True),
+        ),
+        migrations.AddField(
+            model_name='blacklistedtoken',
+            name='expires_at',
+            field=models.DateTimeField(null=True),
+        ),
+        migrations.RunPython(hash_existing_tokens, migrations.RunPython.noop),
+        migrations.RemoveField(
+            model_name='blacklistedtoken',
+            name='token',
+        ),
+        migrations.AlterField(
+            model_name='blacklistedtoken',
+            name='token_digest',
+            field=models.CharField(max_length=64, unique=True),
+        ),
+        migrations.AlterField(
+            model_name='blacklistedtoken',
+            name='expires_at',
+            field=models.DateTimeField(db_index=True),
+        ),
+    ]
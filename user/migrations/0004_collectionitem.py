@@ -0,0 +1,107 @@
+# Generated by Django 5.0 on 2026-10-19 12:00
+
+import uuid
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+# Old array column -> CollectionItem kind -> Pujo counter
+COLLECTIONS = [
+    ('favorites', 'favorite', 'favorites_count'),
+    ('wishlists', 'wishlist', 'wishlists_count'),
+    ('saves', 'save', 'saves_count'),
+    ('pandal_visits', 'visit', 'visits_count'),
+]
+
+
+def copy_arrays_to_items(apps, schema_editor):
+    User = apps.get_model('user', 'User')
+    Pujo = apps.get_model('pujo', 'Pujo')
+    CollectionItem = apps.get_model('user', 'CollectionItem')
+    pujo_ids = {str(pujo_id) for pujo_id in Pujo.objects.values_list('id', flat=True)}
+    now = timezone.now()
+
+    columns = [column for column, _, _ in COLLECTIONS]
+    batch = []
+    for user_id, *arrays in User.objects.values_list('id', *columns).iterator(chunk_size=2000):
+        for (_, kind, _), items in zip(COLLECTIONS, arrays):
+            # Keep the array order through the id sequence; ids of deleted pujos and duplicates are dropped
+            seen = set()
+            for item in items or []:
+                try:
+                    pujo_id = str(uuid.UUID(str(item)))
+                except ValueError:
+                    continue
+                if pujo_id in pujo_ids and pujo_id not in seen:
+                    seen.add(pujo_id)
+                    batch.append(CollectionItem(user_id=user_id, pujo_id=pujo_id, kind=kind, created_at=now))
+        if len(batch) >= 5000:
+            CollectionItem.objects.bulk_create(batch, ignore_conflicts=True)
+            batch = []
+    CollectionItem.objects.bulk_create(batch, ignore_conflicts=True)
+
+    for _, kind, counter in COLLECTIONS:
+        count = (CollectionItem.objects.filter(pujo=OuterRef('pk'), kind=kind)
+                 .order_by().values('pujo').annotate(count=Count('id')).values('count'))
+        Pujo.objects.update(**{counter: Coalesce(Subquery(count), 0)})
+
+
+def copy_items_to_arrays(apps, schema_editor):
+    User = apps.get_model('user', 'User')
+    CollectionItem = apps.get_model('user', 'CollectionItem')
+    columns = {kind: column for column, kind, _ in COLLECTIONS}
+
+    arrays = {}
+    for user_id, kind, pujo_id in CollectionItem.objects.order_by('id').values_list('user_id', 'kind', 'pujo_id').iterator(chunk_size=5000):
+        arrays.setdefault(user_id, {}).setdefault(columns[kind], []).append(str(pujo_id))
+    for user_id, values in arrays.items():
+        User.objects.filter(id=user_id).update(**values)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pujo', '0012_pujo_collection_counters'),
+        ('user', '0003_blacklistedtoken_token_digest'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CollectionItem',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('favorite', 'Favorite'), ('wishlist', 'Wishlist'), ('save', 'Save'), ('visit', 'Pandal visit')], max_length=20)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('pujo', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='collection_items', to='pujo.pujo')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='collection_items', to='user.user')),
+            ],
+            options={
+                'indexes': [
+                    models.Index(fields=['user', 'kind', 'created_at'], name='collection_user_kind_idx'),
+                    models.Index(fields=['pujo', 'kind'], name='collection_pujo_kind_idx'),
+                ],
+                'constraints': [
+                    models.UniqueConstraint(fields=('user', 'pujo', 'kind'), name='unique_collection_item'),
+                ],
+            },
+        ),
+        migrations.RunPython(copy_arrays_to_items, copy_items_to_arrays),
+        migrations.RemoveField(
+            model_name='user',
+            name='favorites',
+        ),
+        migrations.RemoveField(
+            model_name='user',
+            name='wishlists',
+        ),
+        migrations.RemoveField(
+            model_name='user',
+            name='saves',
+        ),
+        migrations.RemoveField(
+            model_name='user',
+            name='pandal_visits',
+        ),
+    ]
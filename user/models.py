@@ -1,10 +1,15 @@
 from django.contrib.auth.models import AbstractUser, BaseUserManager
+import copy
 import uuid
-from django.db import models
+from django.db import IntegrityError, models, transaction
 from django.db.models import Q
 from django.core.exceptions import ValidationError
 from django.utils.translation import gettext_lazy as _
-from django.contrib.postgres.fields import ArrayField
+from django.conf import settings
+from django.utils import timezone
+from datetime import datetime, timezone as dt_timezone
+import jwt
+from .blacklist import token_digest
 
 
 class User(AbstractUser):
@@ -25,24 +30,77 @@ class User(AbstractUser):
     user_type = models.CharField(max_length=20, choices=USER_TYPE_CHOICES, default="user")
     updated_at = models.DateTimeField(null=True, default=None)
     created_at = models.DateTimeField(auto_now=True)
-    favorites = ArrayField(models.CharField(max_length=255), default=list, blank=True)
-    wishlists = ArrayField(models.CharField(max_length=255), default=list, blank=True)
-    saves = ArrayField(models.CharField(max_length=255), default=list, blank=True)
-    pandal_visits = ArrayField(models.CharField(max_length=255), default=list, blank=True)
+
+    # Unique constraints whose violations are reported as field errors
+    UNIQUE_FIELD_ERRORS = {
+        'username': _('A user with this username already exists.'),
+        'email': _('A user with this email already exists.'),
+    }
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_values = instance._current_values()
+        return instance
+
+    def _current_values(self):
+        # Mutable values are copied so in-place changes show up; deferred fields are skipped
+        return {
+            field.name: copy.copy(self.__dict__[field.attname])
+            for field in self._meta.concrete_fields
+            if not field.primary_key and field.attname in self.__dict__
+        }
+
+    def get_dirty_fields(self):
+        """Names of the columns changed since the row was loaded, or None when it was not loaded from the database."""
+        loaded = getattr(self, '_loaded_values', None)
+        if loaded is None or self._state.adding:
+            return None
+        return [name for name, value in self._current_values().items() if name not in loaded or loaded[name] != value]
 
     def clean(self):
-        if User.objects.filter(username=self.username).exclude(pk=self.pk).exists():
-            raise ValidationError({'username': _('A user with this username already exists.')})
-        
-        if User.objects.filter(email=self.email).exclude(pk=self.pk).exists():
-            raise ValidationError({'email': _('A user with this email already exists.')})
-        
+        dirty = self.get_dirty_fields()
+        for field, message in self.UNIQUE_FIELD_ERRORS.items():
+            if dirty is not None and field not in dirty:
+                continue
+            if User.objects.filter(**{field: getattr(self, field)}).exclude(pk=self.pk).exists():
+                raise ValidationError({field: message})
+
         super(User, self).clean()
 
     def save(self, *args, **kwargs):
-        # Perform clean before saving
-        self.clean()
-        super(User, self).save(*args, **kwargs)
+        # Uniqueness is left to the database constraints, only the normalisation from clean() is applied here
+        super(User, self).clean()
+
+        if not args and kwargs.get('update_fields') is None:
+            dirty = self.get_dirty_fields()
+            if dirty is not None:
+                if not dirty:
+                    return
+                auto_now = [field.name for field in self._meta.concrete_fields if getattr(field, 'auto_now', False)]
+                kwargs['update_fields'] = list(dict.fromkeys(dirty + auto_now))
+
+        try:
+            if transaction.get_connection(kwargs.get('using')).in_atomic_block:
+                # A savepoint keeps a constraint violation from breaking the caller's transaction
+                with transaction.atomic(using=kwargs.get('using')):
+                    super(User, self).save(*args, **kwargs)
+            else:
+                super(User, self).save(*args, **kwargs)
+        except IntegrityError as e:
+            violation = self._unique_violation(e)
+            if violation is None:
+                raise
+            raise violation from e
+
+        self._loaded_values = self._current_values()
+
+    def _unique_violation(self, error):
+        constraint = getattr(getattr(error.__cause__, 'diag', None), 'constraint_name', None) or str(error)
+        for field, message in self.UNIQUE_FIELD_ERRORS.items():
+            if field in constraint:
+                return ValidationError({field: message})
+        return None
 
     class Meta:
         constraints = [
@@ -56,8 +114,61 @@ class User(AbstractUser):
 
 
 class BlacklistedToken(models.Model):
-    token = models.CharField(max_length=512, unique=True)
+    # SHA-256 of the encoded token; rows are purged once the token itself has expired
+    token_digest = models.CharField(max_length=64, unique=True)
+    expires_at = models.DateTimeField(db_index=True)
     blacklisted_at = models.DateTimeField(auto_now_add=True)
 
+    @staticmethod
+    def token_expiry(token):
+        # The signature was already checked by the caller, only the exp claim is needed here
+        try:
+            exp = jwt.decode(token, options={'verify_signature': False})['exp']
+            return datetime.fromtimestamp(exp, tz=dt_timezone.utc)
+        except (jwt.PyJWTError, KeyError, TypeError, ValueError, OverflowError):
+            return timezone.now() + settings.SIMPLE_JWT['REFRESH_TOKEN_LIFETIME']
+
+    @classmethod
+    def blacklist(cls, token):
+        return cls.objects.create(token_digest=token_digest(token), expires_at=cls.token_expiry(token))
+
     def __str__(self) -> str:
-        return self.token
\ No newline at end of file
+        return self.token_digest
+
+
+class CollectionItem(models.Model):
+    """A pujo in one of a user's collections (favorites, wishlist, saves or pandal visits)."""
+    FAVORITE = 'favorite'
+    WISHLIST = 'wishlist'
+    SAVE = 'save'
+    VISIT = 'visit'
+    KIND_CHOICES = [
+        (FAVORITE, "Favorite"),
+        (WISHLIST, "Wishlist"),
+        (SAVE, "Save"),
+        (VISIT, "Pandal visit"),
+    ]
+    # Counter column on Pujo kept in step with the rows of each kind
+    COUNTER_FIELDS = {
+        FAVORITE: 'favorites_count',
+        WISHLIST: 'wishlists_count',
+        SAVE: 'saves_count',
+        VISIT: 'visits_count',
+    }
+
+    user = models.ForeignKey(User, related_name='collection_items', on_delete=models.CASCADE)
+    pujo = models.ForeignKey('pujo.Pujo', related_name='collection_items', on_delete=models.CASCADE)
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'pujo', 'kind'], name='unique_collection_item'),
+        ]
+        indexes = [
+            models.Index(fields=['user', 'kind', 'created_at'], name='collection_user_kind_idx'),
+            models.Index(fields=['pujo', 'kind'], name='collection_pujo_kind_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id} {self.kind} {self.pujo_id}"
@@ -1,7 +1,11 @@
 from rest_framework.permissions import BasePermission
-from rest_framework_simplejwt.tokens import AccessToken
 from rest_framework.exceptions import AuthenticationFailed, PermissionDenied
-from .models import BlacklistedToken
+
+
+def get_token_context(request):
+    # Set by TokenContextAuthentication when the request carried a valid bearer token
+    return getattr(request, 'token_context', None)
+
 
 class IsSuperOrAdminUser(BasePermission):
     """
@@ -17,23 +21,15 @@ class IsSuperOrAdminUser(BasePermission):
         if not request.user.is_authenticated:
             return False
         
-        tokenHeader = request.META.get('HTTP_AUTHORIZATION')
-        if tokenHeader is None or not tokenHeader.startswith('Bearer '):
+        token_context = get_token_context(request)
+        if token_context is None:
             raise AuthenticationFailed('Authorization header missing or malformed')
 
-        token = tokenHeader.split()[1]  # Extract the token
-        if token:
-            try:
-                if BlacklistedToken.objects.filter(token=token).exists():
-                    raise PermissionDenied("This token has been blacklisted.")
-                else:
-                    access_token = AccessToken(token)  # Validate the token
-                    user_id_from_token = access_token['user_id']
-            except Exception:
-                raise AuthenticationFailed('Token is invalid or expired')
+        if token_context.is_blacklisted:
+            raise PermissionDenied("This token has been blacklisted.")
 
         # Check if the user_id from the token matches the logged-in user
-        if str(request.user.id) != str(user_id_from_token):
+        if str(request.user.id) != str(token_context.user_id):
             raise AuthenticationFailed('User ID does not match the authenticated user')
         else:
             return True
@@ -48,23 +44,12 @@ class IsAuthenticatedUser(BasePermission):
         if not request.user.is_authenticated:
             return False
         
-        # Verify JWT token and check user ID
-        try:
-            tokenHeader = request.META.get('HTTP_AUTHORIZATION')
-            if tokenHeader is None or not tokenHeader.startswith('Bearer '):
-                raise AuthenticationFailed('Authorization header missing or malformed')
+        token_context = get_token_context(request)
+        if token_context is None:
+            return False
+
+        if token_context.is_blacklisted:
+            raise PermissionDenied("This token has been blacklisted.")
 
-            token = tokenHeader.split()[1]  # Extract the token
-            if token:
-                if BlacklistedToken.objects.filter(token=token).exists():
-                    raise PermissionDenied("This token has been blacklisted.")
-                else:
-                    access_token = AccessToken(token)
-                    user_id_from_token = access_token['user_id']  # Extract user ID from token
-                    
-                    # Compare the user ID from the token with the requested object's user ID
-                    return str(user_id_from_token) == str(obj.id)
-            else:
-                raise PermissionDenied('Token Not found')
-        except (IndexError, KeyError, AuthenticationFailed):
-            return False
\ No newline at end of file
+        # Compare the user ID from the token with the requested object's user ID
+        return str(token_context.user_id) == str(obj.id)
@@ -1,7 +1,15 @@
 from rest_framework import serializers
+from django.conf import settings
 from .models import User
+from .user_collections import COLLECTION_FIELDS, user_collections
 
 class UserSerializer(serializers.ModelSerializer):
+    # Collections live in CollectionItem rows but keep their list-of-ids shape here
+    favorites = serializers.SerializerMethodField()
+    wishlists = serializers.SerializerMethodField()
+    saves = serializers.SerializerMethodField()
+    pandal_visits = serializers.SerializerMethodField()
+
     class Meta:
         model = User
         fields = ["id", "username", "first_name", "last_name", "email", "password",
@@ -16,9 +24,6 @@ class UserSerializer(serializers.ModelSerializer):
 
     def create(self, validated_data):
         user_type = validated_data.get('user_type','user')
-        validated_data.pop("favorites", None)
-        validated_data.pop("wishlists", None)
-        validated_data.pop("saves", None)
         validated_data['user_type'] = user_type
         
         if user_type == 'superadmin':
@@ -39,7 +44,7 @@ class UserSerializer(serializers.ModelSerializer):
     def update(self, instance, validated_data):
         # Prevent user_type and certain fields from being updated
         for field in ['user_type', 'last_login', 'is_superuser', 'is_staff', 'date_joined',
-                      'groups', 'user_permissions', "favorites", "created_at", "wishlists", "saves","pandal_visits"]:
+                      'groups', 'user_permissions', "created_at"]:
             validated_data.pop(field, None)
 
         # Extract and handle password
@@ -60,15 +65,33 @@ class UserSerializer(serializers.ModelSerializer):
         return instance
     
     def validate(self, attrs):
-        # Check for non-deleted users only
-        if User.objects.filter(username=attrs.get('username')).exists():
-            raise serializers.ValidationError({'username': 'A user with this username already exists.'})
-
-        if User.objects.filter(email=attrs.get('email')).exists():
-            raise serializers.ValidationError({'email': 'A user with this email already exists.'})
+        # Only values that change need checking; the unique constraints catch anything racing past this
+        for field in ('username', 'email'):
+            value = attrs.get(field)
+            if value is None or (self.instance is not None and getattr(self.instance, field) == value):
+                continue
+            if User.objects.filter(**{field: value}).exclude(pk=getattr(self.instance, 'pk', None)).exists():
+                raise serializers.ValidationError({field: User.UNIQUE_FIELD_ERRORS[field]})
 
         return attrs
 
+    def _collections(self, obj):
+        if not hasattr(obj, '_collections'):
+            obj._collections = user_collections([obj.pk])[obj.pk]
+        return obj._collections
+
+    def get_favorites(self, obj):
+        return self._collections(obj)['favorites']
+
+    def get_wishlists(self, obj):
+        return self._collections(obj)['wishlists']
+
+    def get_saves(self, obj):
+        return self._collections(obj)['saves']
+
+    def get_pandal_visits(self, obj):
+        return self._collections(obj)['pandal_visits']
+
 class UserDetailsSerializer(serializers.ModelSerializer):
     class Meta:
         model = User
@@ -105,4 +128,13 @@ class CollectionSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = User
-        fields = ['user_id', 'pujo_id']
\ No newline at end of file
+        fields = ['user_id', 'pujo_id']
+class CollectionOperationSerializer(serializers.Serializer):
+    op = serializers.ChoiceField(choices=['add', 'remove'])
+    kind = serializers.ChoiceField(choices=list(COLLECTION_FIELDS))
+    pujo_id = serializers.UUIDField()
+    client_ts = serializers.DateTimeField()
+
+class CollectionBatchSerializer(serializers.Serializer):
+    user_id = serializers.UUIDField(required=True)
+    operations = CollectionOperationSerializer(many=True, allow_empty=False, max_length=settings.COLLECTION_BATCH_MAX_OPERATIONS)
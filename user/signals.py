@@ -0,0 +1,30 @@
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete, pre_delete
+from django.dispatch import receiver
+from .blacklist import token_blacklist
+from .models import BlacklistedToken, User
+from .user_cache import STATE_FIELDS, user_state_cache
+from .user_collections import clear_collections
+
+
+@receiver(post_save, sender=BlacklistedToken)
+def blacklisted_token_saved(sender, instance, created, **kwargs):
+    if created:
+        digest = instance.token_digest
+        transaction.on_commit(lambda: token_blacklist.added(digest))
+
+
+@receiver(pre_delete, sender=User)
+def user_deleting(sender, instance, **kwargs):
+    # Runs in the delete's transaction; the cascade to CollectionItem would leave the pujo counters too high
+    clear_collections(instance.id)
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def user_changed(sender, instance, created=False, update_fields=None, **kwargs):
+    # New users have no older tokens, and saves that leave the claim columns alone don't matter
+    if created or (update_fields is not None and not set(update_fields) & set(STATE_FIELDS)):
+        return
+    user_id = instance.id
+    transaction.on_commit(lambda: user_state_cache.changed(user_id))
@@ -0,0 +1,169 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, TransactionTestCase
+from django.urls import reverse
+from drf_spectacular.generators import SchemaGenerator
+from pujo.models import Pujo
+from .models import CollectionItem, User
+from .tokens import UserRefreshToken
+from .user_cache import UserStateCache
+from .user_collections import add_to_collection, remove_from_collection
+
+
+class CollectionConcurrencyTest(TransactionTestCase):
+    """Concurrent collection changes run on separate connections, so every change is committed on its own."""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='collector', email='collector@example.com', password='secret')
+        self.pujos = [
+            Pujo.objects.create(name=f"pujo {index}", lat=22.5, lon=88.3, address=f"{index} lake road", city="kolkata", zone="south")
+            for index in range(20)
+        ]
+
+    def run_concurrently(self, calls):
+        barrier = threading.Barrier(len(calls))
+
+        def run(call):
+            try:
+                barrier.wait()
+                return call()
+            finally:
+                connection.close()
+
+        with ThreadPoolExecutor(max_workers=len(calls)) as executor:
+            return list(executor.map(run, calls))
+
+    def favorites(self):
+        return set(
+            str(pujo_id) for pujo_id in
+            CollectionItem.objects.filter(user=self.user, kind=CollectionItem.FAVORITE).values_list('pujo_id', flat=True)
+        )
+
+    def test_parallel_adds_and_removes_lose_no_updates(self):
+        kept, removed = self.pujos[:10], self.pujos[10:]
+        for pujo in removed:
+            add_to_collection(self.user.id, 'favorites', pujo.id)
+
+        calls = [lambda pujo=pujo: add_to_collection(self.user.id, 'favorites', pujo.id) for pujo in kept]
+        calls += [lambda pujo=pujo: remove_from_collection(self.user.id, 'favorites', pujo.id) for pujo in removed]
+        results = self.run_concurrently(calls)
+
+        self.assertTrue(all(result.changed for result in results))
+        self.assertEqual(self.favorites(), {str(pujo.id) for pujo in kept})
+        for pujo in self.pujos:
+            pujo.refresh_from_db()
+            self.assertEqual(pujo.favorites_count, 1 if pujo in kept else 0)
+
+    def test_parallel_adds_of_the_same_pujo_count_once(self):
+        pujo = self.pujos[0]
+        results = self.run_concurrently([lambda: add_to_collection(self.user.id, 'favorites', pujo.id) for _ in range(10)])
+
+        self.assertEqual(sum(result.changed for result in results), 1)
+        self.assertEqual(self.favorites(), {str(pujo.id)})
+        pujo.refresh_from_db()
+        self.assertEqual(pujo.favorites_count, 1)
+
+
+class CollectionItemTest(TestCase):
+    def test_deleting_a_user_takes_their_items_off_the_counters(self):
+        leaving = User.objects.create_user(username='leaving', email='leaving@example.com', password='secret')
+        staying = User.objects.create_user(username='staying', email='staying@example.com', password='secret')
+        first, second = [
+            Pujo.objects.create(name=f"pujo {index}", lat=22.5, lon=88.3, address=f"{index} lake road", city="kolkata", zone="south")
+            for index in range(2)
+        ]
+        for field, pujo in [('favorites', first), ('favorites', second), ('pandal_visits', first), ('saves', second)]:
+            add_to_collection(leaving.id, field, pujo.id)
+        add_to_collection(staying.id, 'favorites', first.id)
+
+        leaving.delete()
+
+        first.refresh_from_db()
+        second.refresh_from_db()
+        self.assertEqual((first.favorites_count, first.visits_count), (1, 0))
+        self.assertEqual((second.favorites_count, second.saves_count), (0, 0))
+        self.assertEqual(CollectionItem.objects.count(), 1)
+
+
+class SharedBroadcast:
+    """Broadcast that claims to reach other processes but delivers nothing, like a missed pub/sub message."""
+    shared = True
+
+    def publish(self, message):
+        pass
+
+    def subscribe(self, callback):
+        pass
+
+
+@mock.patch('user.user_cache.get_broadcast', lambda channel: SharedBroadcast())
+class UserStateCacheTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='member', email='member@example.com', password='secret')
+        self.claims = UserRefreshToken.for_user(self.user).access_token.payload
+
+    def started_later(self):
+        """Cache of a process that started after the change and never heard about it."""
+        return UserStateCache()
+
+    def test_claims_are_trusted_without_a_change(self):
+        with self.assertNumQueries(0):
+            state = self.started_later().get(self.user.id, self.claims)
+        self.assertEqual(state['user_type'], 'user')
+
+    def test_change_after_the_token_was_issued_is_read_from_the_row(self):
+        self.user.user_type = 'admin'
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.save()
+
+        state = self.started_later().get(self.user.id, self.claims)
+
+        self.assertEqual(state['user_type'], 'admin')
+
+    def test_deleted_user_is_rejected(self):
+        user_id = self.user.id
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.delete()
+
+        self.assertIsNone(self.started_later().get(user_id, self.claims))
+
+    def test_tokens_issued_after_the_change_are_trusted(self):
+        with mock.patch('user.user_cache.time.time', return_value=self.claims['claims_at'] - 1):
+            with self.captureOnCommitCallbacks(execute=True):
+                self.user.save(update_fields=['is_active'])
+
+        with self.assertNumQueries(0):
+            self.started_later().get(self.user.id, self.claims)
+
+
+class LoginViewTest(TransactionTestCase):
+    # Passwords are checked on the login pool's threads, which only see committed users
+
+    def setUp(self):
+        User.objects.create_user(username='member', email='member@example.com', password='secret')
+
+    def test_login_issues_tokens(self):
+        response = self.client.post(reverse('login'), {'username': 'member', 'password': 'secret'}, content_type='application/json')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('access', response.json()['result'])
+
+    async def test_login_under_asgi(self):
+        response = await self.async_client.post(reverse('login'), {'username': 'member', 'password': 'wrong'}, content_type='application/json')
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()['error'], 'Invalid credentials')
+
+    def test_malformed_body_goes_through_the_drf_exception_handler(self):
+        response = self.client.post(reverse('login'), '{"username":', content_type='application/json')
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('JSON parse error', response.json()['detail'])
+
+    def test_login_is_in_the_schema(self):
+        schema = SchemaGenerator().get_schema(request=None, public=True)
+        self.assertIn('post', schema['paths']['/login'])
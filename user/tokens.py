@@ -0,0 +1,19 @@
+import time
+from rest_framework_simplejwt.tokens import RefreshToken
+
+# Claims copied from the user into every token so requests can be authorized without loading the row
+USER_CLAIMS = ('user_type', 'is_verified', 'username')
+# Unix time the claims were read from the user; access tokens refreshed from the same refresh token keep it
+CLAIMS_AT = 'claims_at'
+
+
+class UserRefreshToken(RefreshToken):
+    """Refresh token that also carries USER_CLAIMS; access tokens derived from it inherit them."""
+
+    @classmethod
+    def for_user(cls, user):
+        token = super().for_user(user)
+        for claim in USER_CLAIMS:
+            token[claim] = getattr(user, claim)
+        token[CLAIMS_AT] = int(time.time())
+        return token
@@ -1,5 +1,5 @@
 from django.urls import path
-from .views import UserViewSet, FavoritesViewSet, WishlistViewSet, SaveViewSet, PandalVisitsViewSet
+from .views import UserViewSet, FavoritesViewSet, WishlistViewSet, SaveViewSet, PandalVisitsViewSet, CollectionBatchView
 
 # Define custom views for list and detail actions
 # app_name = 'user'
@@ -37,5 +37,8 @@ urlpatterns = [
     path('save/add', saved_add, name="saved_add"),
     path('save/remove', saved_remove, name="saved_remove"),
     path('pandal_visits/add', pandal_visits_add, name="pandal_visits_add"),
+    path('pandal_visits/remove', pandal_visits_remove, name="pandal_visits_remove"),
+    path('collections/batch', CollectionBatchView.as_view(), name="collections_batch"),
+    path('<uuid:uuid>/collections', UserViewSet.as_view({'get':'get_collections'}), name='user_collections'),
     path('user_details/<uuid:user_id>', UserViewSet.as_view({'get':'get_user_details'}), name='get_user_details')
 ]
@@ -0,0 +1,114 @@
+import threading
+import time
+from django.conf import settings
+from django.core.cache import cache
+from core.broadcast import get_broadcast
+from .tokens import CLAIMS_AT, USER_CLAIMS
+
+CHANNEL = 'user-changed'
+
+# Columns authorization depends on; loaded instead of the whole row with its ArrayFields
+STATE_FIELDS = ('id', *USER_CLAIMS, 'is_active')
+
+
+def changed_at_key(user_id):
+    return f"user-state-changed:{user_id}"
+
+
+class UserStateCache:
+    """
+    Short-TTL per-process cache of the user columns needed to authorize a request.
+
+    Users are normally built from token claims without a query. Every save or delete
+    of a user's STATE_FIELDS records the time of the change in the shared cache, and
+    claims read before that time (the token's claims_at) are not trusted: the row is
+    read instead. The change time is looked up again every USER_STATE_CACHE_TTL
+    seconds, and the pub/sub message makes running processes notice at once;
+    processes started or reconnected later still find the change time in Redis.
+
+    Without Redis (no REDIS_URL) the change time cannot be shared, so the row is read
+    on every request instead.
+    """
+
+    max_entries = 10000
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._states = {}
+        # user id -> (time of the last change, monotonic time until which it is reused)
+        self._changed = {}
+        self._broadcast = None
+
+    def _get_broadcast(self):
+        if self._broadcast is None:
+            self._broadcast = get_broadcast(CHANNEL)
+            self._broadcast.subscribe(self._forget)
+        return self._broadcast
+
+    def _forget(self, user_id, changed_at=None):
+        changed_at = changed_at or time.time()
+        check_again_at = time.monotonic() + settings.USER_STATE_CACHE_TTL
+        with self._lock:
+            self._states.pop(user_id, None)
+            previous = self._changed.get(user_id)
+            self._changed[user_id] = (max(changed_at, previous[0] if previous else 0), check_again_at)
+
+    def _prune(self, now):
+        if len(self._states) > self.max_entries:
+            for key in [key for key, (_, expires_at) in self._states.items() if expires_at < now]:
+                del self._states[key]
+        if len(self._changed) > self.max_entries:
+            for key in [key for key, (_, check_again_at) in self._changed.items() if check_again_at < now]:
+                del self._changed[key]
+
+    def _changed_at(self, user_id, now):
+        """Unix time of the user's last recorded state change, 0 when there is none."""
+        with self._lock:
+            entry = self._changed.get(user_id)
+            if entry is not None and entry[1] > now:
+                return entry[0]
+
+        changed_at = cache.get(changed_at_key(user_id)) or 0
+        with self._lock:
+            self._prune(now)
+            previous = self._changed.get(user_id)
+            changed_at = max(changed_at, previous[0] if previous else 0)
+            self._changed[user_id] = (changed_at, now + settings.USER_STATE_CACHE_TTL)
+        return changed_at
+
+    def get(self, user_id, claims):
+        """State of the user as a dict, or None when the user no longer exists."""
+        from .models import User
+        user_id = str(user_id)
+        if not self._get_broadcast().shared:
+            return User.objects.filter(id=user_id).values(*STATE_FIELDS).first()
+        now = time.monotonic()
+
+        with self._lock:
+            entry = self._states.get(user_id)
+            if entry is not None and entry[1] > now:
+                return entry[0]
+
+        # Tokens issued before claims_at existed carry no time to compare with, their row is read
+        claims_at = claims.get(CLAIMS_AT)
+        if claims_at is not None and all(claim in claims for claim in USER_CLAIMS) and claims_at > self._changed_at(user_id, now):
+            return {'id': user_id, 'is_active': True, **{claim: claims[claim] for claim in USER_CLAIMS}}
+
+        state = User.objects.filter(id=user_id).values(*STATE_FIELDS).first()
+        with self._lock:
+            self._prune(now)
+            self._states[user_id] = (state, now + settings.USER_STATE_CACHE_TTL)
+        return state
+
+    def changed(self, user_id):
+        """Record a change of the user's state for every process, now and started later."""
+        user_id = str(user_id)
+        changed_at = time.time()
+        # Refreshed access tokens keep the claims_at of their refresh token, so both lifetimes count
+        lifetime = settings.SIMPLE_JWT['REFRESH_TOKEN_LIFETIME'] + settings.SIMPLE_JWT['ACCESS_TOKEN_LIFETIME']
+        cache.set(changed_at_key(user_id), changed_at, timeout=int(lifetime.total_seconds()))
+        self._forget(user_id, changed_at)
+        self._get_broadcast().publish(user_id)
+
+
+user_state_cache = UserStateCache()
@@ -0,0 +1,267 @@
+from collections import namedtuple
+from django.db import connection, transaction
+from core.pagination import KeysetPaginator
+from pujo.models import Pujo
+from pujo.serializers import PujoSerializer
+from .models import CollectionItem, User
+
+# Collection names used by the endpoints and serializers, mapped to the CollectionItem kind
+COLLECTION_KINDS = {
+    'favorites': CollectionItem.FAVORITE,
+    'wishlists': CollectionItem.WISHLIST,
+    'saves': CollectionItem.SAVE,
+    'pandal_visits': CollectionItem.VISIT,
+}
+COLLECTION_FIELDS = tuple(COLLECTION_KINDS)
+
+collection_paginator = KeysetPaginator(ordering=('created_at', 'id'))
+
+# username of the user, the collection's pujo ids after the statement ran, whether it
+# changed, and whether the pujo exists (always True for removals)
+CollectionChange = namedtuple('CollectionChange', ['username', 'items', 'changed', 'pujo_exists'])
+
+
+def _names(field):
+    if field not in COLLECTION_KINDS:
+        raise ValueError(f"Unknown collection: {field}")
+    quote = connection.ops.quote_name
+    kind = COLLECTION_KINDS[field]
+    return kind, {
+        'users': quote(User._meta.db_table),
+        'pujos': quote(Pujo._meta.db_table),
+        'items': quote(CollectionItem._meta.db_table),
+        'counter': quote(Pujo._meta.get_field(CollectionItem.COUNTER_FIELDS[kind]).column),
+    }
+
+
+def _execute(sql, params):
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        row = cursor.fetchone()
+    return CollectionChange(*row) if row else None
+
+
+def add_to_collection(user_id, field, item):
+    """Add a pujo to one of the user's collections unless it is already there. None if the user does not exist."""
+    kind, names = _names(field)
+    # One statement: ON CONFLICT makes concurrent adds of the same pujo insert (and count) it
+    # once. Rows written by a CTE are not visible to the rest of the statement, so the
+    # inserted row is merged into the returned collection by hand.
+    sql = """
+        WITH target AS (
+            SELECT u.id AS user_id, u.username, p.id AS pujo_id
+            FROM {users} u LEFT JOIN {pujos} p ON p.id = %(pujo)s
+            WHERE u.id = %(user)s
+        ), inserted AS (
+            INSERT INTO {items} (user_id, pujo_id, kind, created_at)
+            SELECT user_id, pujo_id, %(kind)s, now() FROM target WHERE pujo_id IS NOT NULL
+            ON CONFLICT (user_id, pujo_id, kind) DO NOTHING
+            RETURNING id, pujo_id
+        ), counted AS (
+            UPDATE {pujos} SET {counter} = {counter} + 1 WHERE id IN (SELECT pujo_id FROM inserted)
+        )
+        SELECT target.username,
+               ARRAY(
+                   SELECT collection.pujo_id::text FROM (
+                       SELECT id, pujo_id FROM {items} WHERE user_id = target.user_id AND kind = %(kind)s
+                       UNION ALL
+                       SELECT id, pujo_id FROM inserted
+                   ) collection ORDER BY collection.id
+               ),
+               EXISTS(SELECT 1 FROM inserted),
+               target.pujo_id IS NOT NULL
+        FROM target
+    """.format(**names)
+    return _execute(sql, {'user': str(user_id), 'pujo': str(item), 'kind': kind})
+
+
+def remove_from_collection(user_id, field, item):
+    """Remove a pujo from one of the user's collections if it is there. None if the user does not exist."""
+    kind, names = _names(field)
+    # Concurrent removals of the same row delete (and uncount) it once; the deleted row is
+    # still visible to the rest of the statement, so it is excluded from the result by hand.
+    sql = """
+        WITH target AS (
+            SELECT id AS user_id, username FROM {users} WHERE id = %(user)s
+        ), deleted AS (
+            DELETE FROM {items}
+            WHERE user_id IN (SELECT user_id FROM target) AND pujo_id = %(pujo)s AND kind = %(kind)s
+            RETURNING id, pujo_id
+        ), counted AS (
+            UPDATE {pujos} SET {counter} = {counter} - 1 WHERE id IN (SELECT pujo_id FROM deleted)
+        )
+        SELECT target.username,
+               ARRAY(
+                   SELECT pujo_id::text FROM {items}
+                   WHERE user_id = target.user_id AND kind = %(kind)s AND id NOT IN (SELECT id FROM deleted)
+                   ORDER BY id
+               ),
+               EXISTS(SELECT 1 FROM deleted),
+               TRUE
+        FROM target
+    """.format(**names)
+    return _execute(sql, {'user': str(user_id), 'pujo': str(item), 'kind': kind})
+
+
+def user_collections(user_ids):
+    """Pujo ids of every collection for each of the users, in the order they were added, in one query."""
+    collections = {user_id: {field: [] for field in COLLECTION_KINDS} for user_id in user_ids}
+    fields = {kind: field for field, kind in COLLECTION_KINDS.items()}
+    rows = (CollectionItem.objects.filter(user_id__in=list(collections))
+            .order_by('id').values_list('user_id', 'kind', 'pujo_id'))
+    for user_id, kind, pujo_id in rows:
+        collections[user_id][fields[kind]].append(str(pujo_id))
+    return collections
+
+
+def apply_collection_operations(user_id, operations):
+    """
+    Apply queued add/remove operations to a user's collections in one transaction.
+
+    `operations` are dicts with op ('add' or 'remove'), kind (a collection name),
+    pujo_id and client_ts. Only the latest operation per collection and pujo counts,
+    so replaying a queue is idempotent. Returns the ids of pujos that could not be
+    added because they do not exist.
+    """
+    # Collapse the queue to its final state per (collection, pujo), ordered by the client clock
+    final = {}
+    for _, operation in sorted(enumerate(operations), key=lambda entry: (entry[1]['client_ts'], entry[0])):
+        final[(COLLECTION_KINDS[operation['kind']], str(operation['pujo_id']))] = operation['op']
+    adds = [key for key, op in final.items() if op == 'add']
+    removes = [key for key, op in final.items() if op == 'remove']
+
+    quote = connection.ops.quote_name
+    names = {
+        'pujos': quote(Pujo._meta.db_table),
+        'items': quote(CollectionItem._meta.db_table),
+    }
+    # Set-based: every add is one INSERT ... SELECT, every remove one DELETE, in a single statement
+    changes_sql = """
+        WITH adds AS (
+            SELECT * FROM unnest(%(add_kinds)s::varchar[], %(add_pujos)s::uuid[]) WITH ORDINALITY AS a(kind, pujo_id, position)
+        ), removes AS (
+            SELECT * FROM unnest(%(remove_kinds)s::varchar[], %(remove_pujos)s::uuid[]) AS r(kind, pujo_id)
+        ), inserted AS (
+            INSERT INTO {items} (user_id, pujo_id, kind, created_at)
+            SELECT %(user)s::uuid, adds.pujo_id, adds.kind, now()
+            FROM adds JOIN {pujos} p ON p.id = adds.pujo_id
+            ORDER BY adds.position
+            ON CONFLICT (user_id, pujo_id, kind) DO NOTHING
+            RETURNING pujo_id, kind
+        ), deleted AS (
+            DELETE FROM {items} i USING removes
+            WHERE i.user_id = %(user)s AND i.pujo_id = removes.pujo_id AND i.kind = removes.kind
+            RETURNING i.pujo_id, i.kind
+        )
+        SELECT ARRAY(SELECT pujo_id::text FROM inserted), ARRAY(SELECT kind FROM inserted),
+               ARRAY(SELECT pujo_id::text FROM deleted), ARRAY(SELECT kind FROM deleted),
+               ARRAY(SELECT adds.pujo_id::text FROM adds LEFT JOIN {pujos} p ON p.id = adds.pujo_id WHERE p.id IS NULL)
+    """.format(**names)
+
+    with transaction.atomic():
+        with connection.cursor() as cursor:
+            cursor.execute(changes_sql, {
+                'user': str(user_id),
+                'add_kinds': [kind for kind, _ in adds],
+                'add_pujos': [pujo_id for _, pujo_id in adds],
+                'remove_kinds': [kind for kind, _ in removes],
+                'remove_pujos': [pujo_id for _, pujo_id in removes],
+            })
+            inserted_pujos, inserted_kinds, deleted_pujos, deleted_kinds, missing = cursor.fetchone()
+
+            deltas = {}
+            for pujos, kinds, step in ((inserted_pujos, inserted_kinds, 1), (deleted_pujos, deleted_kinds, -1)):
+                for pujo_id, kind in zip(pujos, kinds):
+                    counters = deltas.setdefault(pujo_id, dict.fromkeys(Pujo.COUNTER_FIELDS, 0))
+                    counters[CollectionItem.COUNTER_FIELDS[kind]] += step
+
+            if deltas:
+                _update_counters(cursor, names, deltas)
+
+    return missing
+
+
+def clear_collections(user_id):
+    """
+    Delete every collection item of a user and take them off the pujo counters, in the
+    caller's transaction; run before the user is deleted, whose cascade would skip the counters.
+    """
+    quote = connection.ops.quote_name
+    names = {
+        'users': quote(User._meta.db_table),
+        'pujos': quote(Pujo._meta.db_table),
+        'items': quote(CollectionItem._meta.db_table),
+    }
+    # The user row is locked first, so no item can be added between this delete and the user's
+    sql = """
+        WITH owner AS (
+            SELECT id FROM {users} WHERE id = %(user)s FOR UPDATE
+        ), deleted AS (
+            DELETE FROM {items} WHERE user_id IN (SELECT id FROM owner)
+            RETURNING pujo_id, kind
+        )
+        SELECT pujo_id::text, kind, count(*) FROM deleted GROUP BY pujo_id, kind
+    """.format(**names)
+
+    with transaction.atomic():
+        with connection.cursor() as cursor:
+            cursor.execute(sql, {'user': str(user_id)})
+            deltas = {}
+            for pujo_id, kind, count in cursor.fetchall():
+                counters = deltas.setdefault(pujo_id, dict.fromkeys(Pujo.COUNTER_FIELDS, 0))
+                counters[CollectionItem.COUNTER_FIELDS[kind]] -= count
+
+            if deltas:
+                _update_counters(cursor, names, deltas)
+
+
+def _update_counters(cursor, names, deltas):
+    quote = connection.ops.quote_name
+    columns = [quote(Pujo._meta.get_field(field).column) for field in Pujo.COUNTER_FIELDS]
+    pujo_ids = sorted(deltas)
+    # Rows are locked in id order so concurrent batches touching the same pujos cannot deadlock
+    sql = """
+        UPDATE {pujos} p SET {assignments}
+        FROM (SELECT id FROM {pujos} WHERE id = ANY(%s::uuid[]) ORDER BY id FOR UPDATE) locked
+        JOIN unnest(%s::uuid[], {arrays}) AS d(pujo_id, {delta_columns}) ON d.pujo_id = locked.id
+        WHERE p.id = locked.id
+    """.format(
+        assignments=', '.join(f"{column} = p.{column} + d.{column}" for column in columns),
+        arrays=', '.join(['%s::int[]'] * len(columns)),
+        delta_columns=', '.join(columns),
+        **names,
+    )
+    params = [pujo_ids, pujo_ids] + [[deltas[pujo_id][field] for pujo_id in pujo_ids] for field in Pujo.COUNTER_FIELDS]
+    cursor.execute(sql, params)
+
+
+def collection_page(user_id, params, field=None, expand=False):
+    """
+    One page of a user's collection items, oldest first, with the cursor of the next page.
+
+    With `expand` the pujos of the page are loaded in one query; ids whose pujo no longer
+    exists are kept in place and marked stale.
+    """
+    fields = {kind: name for name, kind in COLLECTION_KINDS.items()}
+    queryset = CollectionItem.objects.filter(user_id=user_id)
+    if field is not None:
+        queryset = queryset.filter(kind=COLLECTION_KINDS[field])
+    rows, next_cursor = collection_paginator.paginate(queryset.values('id', 'kind', 'pujo_id', 'created_at'), params)
+
+    pujos = {}
+    if expand and rows:
+        pujos = Pujo.objects.in_bulk([row['pujo_id'] for row in rows])
+
+    items = []
+    for row in rows:
+        item = {
+            'kind': fields[row['kind']],
+            'pujo_id': str(row['pujo_id']),
+            'added_at': row['created_at'],
+        }
+        if expand:
+            pujo = pujos.get(row['pujo_id'])
+            item['pujo'] = PujoSerializer(pujo).data if pujo is not None else None
+            item['stale'] = pujo is None
+        items.append(item)
+    return items, next_cursor
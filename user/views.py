@@ -2,7 +2,7 @@ from rest_framework import viewsets, status
 from rest_framework.response import Response
 from django.db.models import Q, F
 from .models import User, BlacklistedToken
-from .serializers import UserSerializer,UserLoginSerializer,UserLogoutSerializer,RefreshTokenSerializer,UserDetailsSerializer,CollectionSerializer
+from .serializers import UserSerializer,UserLoginSerializer,UserLogoutSerializer,RefreshTokenSerializer,UserDetailsSerializer,CollectionSerializer,CollectionBatchSerializer
 from core.ResponseStatus import ResponseStatus
 import logging
 from django.utils import timezone
@@ -10,13 +10,22 @@ from django.contrib.auth import authenticate
 from rest_framework.views import APIView
 from rest_framework import status
 from rest_framework.permissions import AllowAny
-from .permission import IsAuthenticatedUser
+from .permission import IsAuthenticatedUser, get_token_context
+from .authentication import ClaimsJWTAuthentication
 from rest_framework import permissions
 from rest_framework_simplejwt.tokens import RefreshToken
+from .tokens import UserRefreshToken
 from rest_framework_simplejwt.views import TokenRefreshView
-from rest_framework_simplejwt.authentication import JWTAuthentication
 from rest_framework.decorators import action
 from django.core.management import call_command
+from django.conf import settings
+from asgiref.sync import sync_to_async
+from drf_spectacular.types import OpenApiTypes
+from drf_spectacular.utils import extend_schema
+from core.views import AsyncAPIView
+from .login_pool import BoundedExecutor
+from .user_collections import COLLECTION_FIELDS, add_to_collection, remove_from_collection, apply_collection_operations, user_collections, collection_page
+import asyncio
 
 logger = logging.getLogger("user")
 
@@ -100,6 +109,48 @@ class UserViewSet(viewsets.ModelViewSet):
             logger.error(f"Error: {response_data['error']}", extra={'user_id': user_id})
             return Response(response_data, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
+    def get_collections(self, request, uuid=None, *args, **kwargs):
+        self.check_object_permissions(request, request.user)
+        if str(uuid) != str(request.user.id):
+            response_data = {
+                'error': "Collections can only be read by their owner",
+                'status': ResponseStatus.FAIL.value
+            }
+            logger.error(f"Error: {response_data['error']}", extra={'user_id': request.user.id})
+            return Response(response_data, status=status.HTTP_403_FORBIDDEN)
+
+        kind = request.query_params.get('kind') or None
+        if kind is not None and kind not in COLLECTION_FIELDS:
+            response_data = {
+                'error': f"kind must be one of {', '.join(COLLECTION_FIELDS)}",
+                'status': ResponseStatus.FAIL.value
+            }
+            logger.error(f"Error: {response_data['error']}", extra={'user_id': request.user.id})
+            return Response(response_data, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            items, next_cursor = collection_page(
+                uuid, request.query_params, field=kind, expand=request.query_params.get('expand') == 'pujo'
+            )
+        except ValueError as e:
+            response_data = {
+                'error': str(e),
+                'status': ResponseStatus.FAIL.value
+            }
+            logger.error(f"Error: {response_data['error']}", extra={'user_id': request.user.id})
+            return Response(response_data, status=status.HTTP_400_BAD_REQUEST)
+
+        response_data = {
+            'result': {
+                'items': items,
+                'next_cursor': next_cursor,
+            },
+            'message': 'User collections fetched successfully',
+            'status': ResponseStatus.SUCCESS.value
+        }
+        logger.info(f"Success: {response_data['message']}", extra={'user_id': request.user.id})
+        return Response(response_data, status=status.HTTP_200_OK)
+
     def retrieve(self, request, uuid, *args, **kwargs):
         try:
             user = self.get_queryset().filter(id=uuid).first()
@@ -248,45 +299,65 @@ class UserViewSet(viewsets.ModelViewSet):
             user_id = request.user.id if request.user.is_authenticated else None
             logger.error(f"Error: {response_data['error']}", extra={'user_id': user_id})
             return Response(response_data, status=status.HTTP_404_NOT_FOUND)
-class LoginView(APIView):
+login_executor = BoundedExecutor(settings.LOGIN_HASH_WORKERS, settings.LOGIN_QUEUE_SIZE)
+
+
+def issue_login_tokens(user):
+    # Create JWT tokens
+    refresh = UserRefreshToken.for_user(user)
+    return {
+        'user': UserSerializer(user).data,
+        'refresh': str(refresh),
+        'access': str(refresh.access_token),
+    }
+
+
+class LoginView(AsyncAPIView):
+    """
+    Async login. Password hashing runs on a bounded thread pool (PBKDF2 releases the GIL),
+    and requests beyond the pool and its queue get an immediate 503.
+    """
     permission_classes = [AllowAny]
     serializer_class = UserLoginSerializer
 
-    def post(self, request):
+    @extend_schema(request=UserLoginSerializer, responses={200: OpenApiTypes.OBJECT, 400: OpenApiTypes.OBJECT, 503: OpenApiTypes.OBJECT})
+    async def post(self, request):
         serializer = UserLoginSerializer(data=request.data)
         if serializer.is_valid():
             username = serializer.validated_data.get('username')
             password = serializer.validated_data.get('password')
-            user = authenticate(request, username=username, password=password)
-            if user is not None:
-                # Create JWT tokens
-                refresh = RefreshToken.for_user(user)
-                user_data = UserSerializer(user).data
 
+            future = login_executor.try_submit(authenticate, request, username=username, password=password)
+            if future is None:
                 response_data = {
-                    'result': {
-                        'user': user_data,
-                        'refresh': str(refresh),
-                        'access': str(refresh.access_token),
-                    },
+                    'error': 'Too many logins in progress, please retry shortly',
+                    'status': ResponseStatus.FAIL.value
+                }
+                await sync_to_async(logger.error)(f"Error: {response_data['error']}")
+                return Response(response_data, status=status.HTTP_503_SERVICE_UNAVAILABLE, headers={'Retry-After': '1'})
+
+            user = await asyncio.wrap_future(future)
+            if user is not None:
+                response_data = {
+                    'result': await sync_to_async(issue_login_tokens)(user),
                     'message': 'Logged in successfully',
                     'status': ResponseStatus.SUCCESS.value
                 }
-                logger.info(f"Success: {response_data['message']}")
+                await sync_to_async(logger.info)(f"Success: {response_data['message']}")
                 return Response(response_data, status=status.HTTP_200_OK)
             else:
                 response_data = {
                     'error': 'Invalid credentials',
                     'status': ResponseStatus.FAIL.value
                 }
-                logger.info(f"Error: {response_data['error']}")
+                await sync_to_async(logger.info)(f"Error: {response_data['error']}")
                 return Response(response_data, status=status.HTTP_400_BAD_REQUEST)
         else:
                     response_data = {
                         'error': serializer.errors,
                         'status': ResponseStatus.FAIL.value
                     }
-                    logger.info(f"Error: {str(response_data['error'])}")
+                    await sync_to_async(logger.info)(f"Error: {str(response_data['error'])}")
                     return Response(response_data, status=status.HTTP_400_BAD_REQUEST)
 
 class LogoutView(APIView):
@@ -317,7 +388,8 @@ class LogoutView(APIView):
                 return Response(response_data, status=status.HTTP_400_BAD_REQUEST)
 
             # If authenticated and username matches
-            token = request.META.get('HTTP_AUTHORIZATION').split()[1]
+            token_context = get_token_context(request)
+            token = token_context.raw_token if token_context else None
             if not token:
                 user_id = request.user.id if request.user.is_authenticated else None
                 logger.error(f"Error: Token not found", extra={'user_id': user_id})
@@ -326,13 +398,13 @@ class LogoutView(APIView):
                     'status': ResponseStatus.FAIL.value
                 }, status=status.HTTP_400_BAD_REQUEST)
             else:
-                if BlacklistedToken.objects.filter(token=token).exists():
+                if token_context.is_blacklisted:
                     user_id = request.user.id if request.user.is_authenticated else None
                     logger.error(f"Error: Token already invalidated", extra={'user_id': user_id})
                     return Response({'error': 'Token is already invalidated','status': ResponseStatus.FAIL.value}, status=status.HTTP_400_BAD_REQUEST)
 
                 try:
-                    BlacklistedToken.objects.create(token=token)
+                    BlacklistedToken.blacklist(token)
                 except Exception as e:
                     user_id = request.user.id if request.user.is_authenticated else None
                     logger.error(f"Error: {str(e)}", extra={'user_id': user_id})
@@ -357,7 +429,7 @@ class LogoutView(APIView):
         
 class CustomTokenRefreshView(TokenRefreshView):
     permission_classes = [IsAuthenticatedUser]
-    authentication_classes = [JWTAuthentication]
+    authentication_classes = [ClaimsJWTAuthentication]
 
     def post(self, request, *args, **kwargs):
         if not request.user.is_authenticated:
@@ -368,14 +440,15 @@ class CustomTokenRefreshView(TokenRefreshView):
                 return Response(response_data, status=status.HTTP_403_FORBIDDEN)
         else:
             # check if incoming access_token is not in blacklist
-            access_token = request.META.get('HTTP_AUTHORIZATION').split()[1]
+            token_context = get_token_context(request)
+            access_token = token_context.raw_token if token_context else None
             if not access_token:
                 return Response({
                     'error': 'Token not found',
                     'status': ResponseStatus.FAIL.value
                 }, status=status.HTTP_400_BAD_REQUEST)
             else:
-                if BlacklistedToken.objects.filter(token=access_token).exists():
+                if token_context.is_blacklisted:
                     return Response({'error': 'Token is already invalidated','status': ResponseStatus.FAIL.value}, status=status.HTTP_400_BAD_REQUEST)
 
             serializer = RefreshTokenSerializer(data=request.data)
@@ -392,7 +465,7 @@ class CustomTokenRefreshView(TokenRefreshView):
                     return Response(response_data, status=status.HTTP_403_FORBIDDEN)
                     
                 user = User.objects.get(id=user_id)
-                new_refresh = RefreshToken.for_user(user)
+                new_refresh = UserRefreshToken.for_user(user)
                 response_data = {
                     'result': {
                         'accessToken': str(new_refresh.access_token),
@@ -402,8 +475,8 @@ class CustomTokenRefreshView(TokenRefreshView):
                 }
                 #blacklist the previous access token and incoming refresh token
                 try:
-                    BlacklistedToken.objects.create(token=access_token)
-                    BlacklistedToken.objects.create(token=incoming_refresh_token)
+                    BlacklistedToken.blacklist(access_token)
+                    BlacklistedToken.blacklist(incoming_refresh_token)
                 except Exception as e:
                     return Response({'error': str(e),'status': ResponseStatus.FAIL.value}, status=status.HTTP_400_BAD_REQUEST)
 
@@ -420,55 +493,60 @@ class FavoritesViewSet(viewsets.ModelViewSet):
     permission_classes = [IsAuthenticatedUser]
     serializer_class = CollectionSerializer
 
-    def add_favorite(self, request, *args, **kwargs):       
+    def add_favorite(self, request, *args, **kwargs):
         self.check_object_permissions(request, request.user)
 
         serializer = CollectionSerializer(data=request.data)
 
         if serializer.is_valid():
             user_id = serializer.validated_data['user_id']
-            try:
-                user = User.objects.get(id=user_id)
-            except User.DoesNotExist:
+            item = serializer.validated_data['pujo_id']
+
+            if item is None:
                 response_data = {
-                    "error": "User does not exist",
-                    'status': ResponseStatus.FAIL.value
+                        "error": "No favorite item provided",
+                        'status': ResponseStatus.FAIL.value
                 }
                 user_id = request.user.id if request.user.is_authenticated else None
                 logger.error(f"Error: {response_data['error']}", extra={'user_id': user_id})
                 return Response(response_data, status=status.HTTP_400_BAD_REQUEST)
-            
-            favorite_item = serializer.validated_data['pujo_id']
 
-            if favorite_item is None:
+            change = add_to_collection(user_id, 'favorites', item)
+            if change is None:
                 response_data = {
-                        "error": "No favorite item provided",
-                        'status': ResponseStatus.FAIL.value
+                    "error": "User does not exist",
+                    'status': ResponseStatus.FAIL.value
                 }
                 user_id = request.user.id if request.user.is_authenticated else None
                 logger.error(f"Error: {response_data['error']}", extra={'user_id': user_id})
                 return Response(response_data, status=status.HTTP_400_BAD_REQUEST)
 
-
-            if favorite_item in user.favorites:
+            if not change.pujo_exists:
                 response_data = {
-                        'error': f"This pujo is already {user.username}'s favorite",
-                        'status': ResponseStatus.FAIL.value
+                    "error": "Pujo does not exist",
+                    'status': ResponseStatus.FAIL.value
                 }
                 user_id = request.user.id if request.user.is_authenticated else None
                 logger.error(f"Error: {response_data['error']}", extra={'user_id': user_id})
-                return Response(response_data, status=status.HTTP_406_NOT_ACCEPTABLE)
-            else:    
-                user.favorites.append(favorite_item)
-                user.save()
+                return Response(response_data, status=status.HTTP_400_BAD_REQUEST)
+
+            if change.changed:
                 response_data = {
-                        'result': user.favorites,
+                        'result': change.items,
                         'message':'User Favorite set',
                         'status': ResponseStatus.SUCCESS.value
-                    }
+                }
                 user_id = request.user.id if request.user.is_authenticated else None
                 logger.info(f"Success: {response_data['message']}", extra={'user_id': user_id})
                 return Response(response_data, status=status.HTTP_200_OK)
+            else:
+                response_data = {
+                        'error': f"This pujo is already {change.username}'s favorite",
+                        'status': ResponseStatus.FAIL.value
+                }
+                user_id = request.user.id if request.user.is_authenticated else None
+                logger.error(f"Error: {response_data['error']}", extra={'user_id': user_id})
+                return Response(response_data, status=status.HTTP_406_NOT_ACCEPTABLE)
         else:
             response_data = {
                         'error': serializer.errors,
@@ -477,7 +555,7 @@ class FavoritesViewSet(viewsets.ModelViewSet):
             user_id = request.user.id if request.user.is_authenticated else None
             logger.error(f"Error: {str(response_data['error'])}", extra={'user_id': user_id})
             return Response(response_data, status=status.HTTP_406_NOT_ACCEPTABLE)
-    
+
     def remove_favorite(self, request, *args, **kwargs):
         self.check_object_permissions(request, request.user)
 
@@ -485,43 +563,40 @@ class FavoritesViewSet(viewsets.ModelViewSet):
 
         if serializer.is_valid():
             user_id = serializer.validated_data['user_id']
-            try:
-                user = User.objects.get(id=user_id)
-            except User.DoesNotExist:
+            item = serializer.validated_data['pujo_id']
+
+            if item is None:
                 response_data = {
-                    "error": "User does not exist",
-                    'status': ResponseStatus.FAIL.value
+                        "error": "No favorite item provided",
+                        'status': ResponseStatus.FAIL.value
                 }
                 user_id = request.user.id if request.user.is_authenticated else None
                 logger.error(f"Error: {response_data['error']}", extra={'user_id': user_id})
                 return Response(response_data, status=status.HTTP_400_BAD_REQUEST)
-        
-            favorite_item = serializer.validated_data['pujo_id']
 
-            if favorite_item is None:
+            change = remove_from_collection(user_id, 'favorites', item)
+            if change is None:
                 response_data = {
-                    "error": "No favorite item provided",
+                    "error": "User does not exist",
                     'status': ResponseStatus.FAIL.value
                 }
                 user_id = request.user.id if request.user.is_authenticated else None
                 logger.error(f"Error: {response_data['error']}", extra={'user_id': user_id})
                 return Response(response_data, status=status.HTTP_400_BAD_REQUEST)
- 
-            if favorite_item in user.favorites:
-                user.favorites.remove(favorite_item)
-                user.save()
+
+            if change.changed:
                 response_data = {
-                'result': user.favorites,
-                'message':'User favorite removed',
-                'status': ResponseStatus.SUCCESS.value
+                        'result': change.items,
+                        'message':'User favorite removed',
+                        'status': ResponseStatus.SUCCESS.value
                 }
                 user_id = request.user.id if request.user.is_authenticated else None
                 logger.info(f"Success: {response_data['message']}", extra={'user_id': user_id})
                 return Response(response_data, status=status.HTTP_200_OK)
             else:
                 response_data = {
-                    "error": "Favorite item not found",
-                    'status': ResponseStatus.FAIL.value
+                        'error': "Favorite item not found",
+                        'status': ResponseStatus.FAIL.value
                 }
                 user_id = request.user.id if request.user.is_authenticated else None
                 logger.error(f"Error: {response_data['error']}", extra={'user_id': user_id})
@@ -536,123 +611,126 @@ class FavoritesViewSet(viewsets.ModelViewSet):
             return Response(response_data, status=status.HTTP_406_NOT_ACCEPTABLE)
 
 class WishlistViewSet(viewsets.ModelViewSet):
-        permission_classes = [IsAuthenticatedUser]
-        serializer_class = CollectionSerializer
+    permission_classes = [IsAuthenticatedUser]
+    serializer_class = CollectionSerializer
 
-        def add_wishlist(self, request, *args, **kwargs):
-            self.check_object_permissions(request, request.user)
+    def add_wishlist(self, request, *args, **kwargs):
+        self.check_object_permissions(request, request.user)
 
-            serializer = CollectionSerializer(data=request.data)
+        serializer = CollectionSerializer(data=request.data)
 
-            if serializer.is_valid():
-                user_id = serializer.validated_data['user_id']
-                try:
-                    user = User.objects.get(id=user_id)
-                except User.DoesNotExist:
-                    response_data = {
-                        "error": "User does not exist",
+        if serializer.is_valid():
+            user_id = serializer.validated_data['user_id']
+            item = serializer.validated_data['pujo_id']
+
+            if item is None:
+                response_data = {
+                        "error": "No wishlist item provided",
                         'status': ResponseStatus.FAIL.value
-                    }
-                    user_id = request.user.id if request.user.is_authenticated else None
-                    logger.error(f"Error: {response_data['error']}", extra={'user_id': user_id})
-                    return Response(response_data, status=status.HTTP_400_BAD_REQUEST)
-        
-                item = serializer.validated_data['pujo_id']
+                }
+                user_id = request.user.id if request.user.is_authenticated else None
+                logger.error(f"Error: {response_data['error']}", extra={'user_id': user_id})
+                return Response(response_data, status=status.HTTP_400_BAD_REQUEST)
 
-                if item is None:
-                    response_data = {
-                            "error": "No wishlist item provided",
-                            'status': ResponseStatus.FAIL.value
-                    }
-                    user_id = request.user.id if request.user.is_authenticated else None
-                    logger.error(f"Error: {response_data['error']}", extra={'user_id': user_id})
-                    return Response(response_data, status=status.HTTP_400_BAD_REQUEST)
+            change = add_to_collection(user_id, 'wishlists', item)
+            if change is None:
+                response_data = {
+                    "error": "User does not exist",
+                    'status': ResponseStatus.FAIL.value
+                }
+                user_id = request.user.id if request.user.is_authenticated else None
+                logger.error(f"Error: {response_data['error']}", extra={'user_id': user_id})
+                return Response(response_data, status=status.HTTP_400_BAD_REQUEST)
 
-                if item in user.wishlist:
-                    response_data = {
-                            'error': f"This pujo is already {user.username}'s wishlist",
-                            'status': ResponseStatus.FAIL.value
-                    }
-                    user_id = request.user.id if request.user.is_authenticated else None
-                    logger.error(f"Error: {response_data['error']}", extra={'user_id': user_id})
-                    return Response(response_data, status=status.HTTP_406_NOT_ACCEPTABLE)
-                else:    
-                    user.wishlist.append(item)
-                    user.save()
-                    response_data = {
-                            'result': user.wishlist,
-                            'message':'Item added to user wishlist',
-                            'status': ResponseStatus.SUCCESS.value
-                        }
-                    user_id = request.user.id if request.user.is_authenticated else None
-                    logger.info(f"Success: {response_data['message']}", extra={'user_id': user_id})
-                    return Response(response_data, status=status.HTTP_200_OK)
+            if not change.pujo_exists:
+                response_data = {
+                    "error": "Pujo does not exist",
+                    'status': ResponseStatus.FAIL.value
+                }
+                user_id = request.user.id if request.user.is_authenticated else None
+                logger.error(f"Error: {response_data['error']}", extra={'user_id': user_id})
+                return Response(response_data, status=status.HTTP_400_BAD_REQUEST)
+
+            if change.changed:
+                response_data = {
+                        'result': change.items,
+                        'message':'Item added to user wishlist',
+                        'status': ResponseStatus.SUCCESS.value
+                }
+                user_id = request.user.id if request.user.is_authenticated else None
+                logger.info(f"Success: {response_data['message']}", extra={'user_id': user_id})
+                return Response(response_data, status=status.HTTP_200_OK)
             else:
                 response_data = {
-                            'error': serializer.errors,
-                            'status': ResponseStatus.FAIL.value
+                        'error': f"This pujo is already {change.username}'s wishlist",
+                        'status': ResponseStatus.FAIL.value
                 }
                 user_id = request.user.id if request.user.is_authenticated else None
-                logger.error(f"Error: {str(response_data['error'])}", extra={'user_id': user_id})
+                logger.error(f"Error: {response_data['error']}", extra={'user_id': user_id})
                 return Response(response_data, status=status.HTTP_406_NOT_ACCEPTABLE)
-            
-        def remove_wishlist(self, request, *args, **kwargs):
-            self.check_object_permissions(request, request.user)
+        else:
+            response_data = {
+                        'error': serializer.errors,
+                        'status': ResponseStatus.FAIL.value
+            }
+            user_id = request.user.id if request.user.is_authenticated else None
+            logger.error(f"Error: {str(response_data['error'])}", extra={'user_id': user_id})
+            return Response(response_data, status=status.HTTP_406_NOT_ACCEPTABLE)
 
-            serializer = CollectionSerializer(data=request.data)
+    def remove_wishlist(self, request, *args, **kwargs):
+        self.check_object_permissions(request, request.user)
 
-            if serializer.is_valid():
-                user_id = serializer.validated_data['user_id']
-                try:
-                    user = User.objects.get(id=user_id)
-                except User.DoesNotExist:
-                    response_data = {
-                        "error": "User does not exist",
-                        'status': ResponseStatus.FAIL.value
-                    }
-                    user_id = request.user.id if request.user.is_authenticated else None
-                    logger.error(f"Error: {response_data['error']}", extra={'user_id': user_id})
-                    return Response(response_data, status=status.HTTP_400_BAD_REQUEST)
-        
-                item = serializer.validated_data['pujo_id']
+        serializer = CollectionSerializer(data=request.data)
 
-                if item is None:
-                    response_data = {
+        if serializer.is_valid():
+            user_id = serializer.validated_data['user_id']
+            item = serializer.validated_data['pujo_id']
+
+            if item is None:
+                response_data = {
                         "error": "No wishlist item provided",
                         'status': ResponseStatus.FAIL.value
-                    }
-                    user_id = request.user.id if request.user.is_authenticated else None
-                    logger.error(f"Error: {response_data['error']}", extra={'user_id': user_id})
-                    return Response(response_data, status=status.HTTP_400_BAD_REQUEST)
+                }
+                user_id = request.user.id if request.user.is_authenticated else None
+                logger.error(f"Error: {response_data['error']}", extra={'user_id': user_id})
+                return Response(response_data, status=status.HTTP_400_BAD_REQUEST)
 
-                if item in user.wishlist:
-                    user.wishlist.remove(item)
-                    user.save()
-                    response_data = {
-                    'result': user.wishlist,
-                    'message':'Item removed',
-                    'status': ResponseStatus.SUCCESS.value
-                    }
-                    user_id = request.user.id if request.user.is_authenticated else None
-                    logger.info(f"Success: {response_data['message']}", extra={'user_id': user_id})
-                    return Response(response_data, status=status.HTTP_200_OK)
-                else:
-                    response_data = {
-                        "error": "wishlist item not found",
-                        'status': ResponseStatus.FAIL.value
-                    }
-                    user_id = request.user.id if request.user.is_authenticated else None
-                    logger.error(f"Error: {response_data['error']}", extra={'user_id': user_id})
-                    return Response(response_data, status=status.HTTP_400_BAD_REQUEST)
+            change = remove_from_collection(user_id, 'wishlists', item)
+            if change is None:
+                response_data = {
+                    "error": "User does not exist",
+                    'status': ResponseStatus.FAIL.value
+                }
+                user_id = request.user.id if request.user.is_authenticated else None
+                logger.error(f"Error: {response_data['error']}", extra={'user_id': user_id})
+                return Response(response_data, status=status.HTTP_400_BAD_REQUEST)
+
+            if change.changed:
+                response_data = {
+                        'result': change.items,
+                        'message':'Item removed',
+                        'status': ResponseStatus.SUCCESS.value
+                }
+                user_id = request.user.id if request.user.is_authenticated else None
+                logger.info(f"Success: {response_data['message']}", extra={'user_id': user_id})
+                return Response(response_data, status=status.HTTP_200_OK)
             else:
                 response_data = {
-                            'error': serializer.errors,
-                            'status': ResponseStatus.FAIL.value
+                        'error': "wishlist item not found",
+                        'status': ResponseStatus.FAIL.value
                 }
                 user_id = request.user.id if request.user.is_authenticated else None
-                logger.error(f"Error: {str(response_data['error'])}", extra={'user_id': user_id})
-                return Response(response_data, status=status.HTTP_406_NOT_ACCEPTABLE)
-            
+                logger.error(f"Error: {response_data['error']}", extra={'user_id': user_id})
+                return Response(response_data, status=status.HTTP_400_BAD_REQUEST)
+        else:
+            response_data = {
+                        'error': serializer.errors,
+                        'status': ResponseStatus.FAIL.value
+            }
+            user_id = request.user.id if request.user.is_authenticated else None
+            logger.error(f"Error: {str(response_data['error'])}", extra={'user_id': user_id})
+            return Response(response_data, status=status.HTTP_406_NOT_ACCEPTABLE)
+
 class SaveViewSet(viewsets.ModelViewSet):
     permission_classes = [IsAuthenticatedUser]
     serializer_class = CollectionSerializer
@@ -664,57 +742,61 @@ class SaveViewSet(viewsets.ModelViewSet):
 
         if serializer.is_valid():
             user_id = serializer.validated_data['user_id']
-            try:
-                user = User.objects.get(id=user_id)
-            except User.DoesNotExist:
+            item = serializer.validated_data['pujo_id']
+
+            if item is None:
                 response_data = {
-                        "error": "User does not exist",
+                        "error": "No item to save",
                         'status': ResponseStatus.FAIL.value
                 }
                 user_id = request.user.id if request.user.is_authenticated else None
                 logger.error(f"Error: {response_data['error']}", extra={'user_id': user_id})
                 return Response(response_data, status=status.HTTP_400_BAD_REQUEST)
-        
-            item = serializer.validated_data['pujo_id']
 
-            if item is None:
+            change = add_to_collection(user_id, 'saves', item)
+            if change is None:
                 response_data = {
-                            "error": "No item to save",
-                            'status': ResponseStatus.FAIL.value
+                    "error": "User does not exist",
+                    'status': ResponseStatus.FAIL.value
                 }
                 user_id = request.user.id if request.user.is_authenticated else None
                 logger.error(f"Error: {response_data['error']}", extra={'user_id': user_id})
                 return Response(response_data, status=status.HTTP_400_BAD_REQUEST)
 
-
-            if item in user.saves:
+            if not change.pujo_exists:
                 response_data = {
-                            'error': f"This pujo is already {user.username}'s saves",
-                            'status': ResponseStatus.FAIL.value
+                    "error": "Pujo does not exist",
+                    'status': ResponseStatus.FAIL.value
                 }
                 user_id = request.user.id if request.user.is_authenticated else None
                 logger.error(f"Error: {response_data['error']}", extra={'user_id': user_id})
-                return Response(response_data, status=status.HTTP_406_NOT_ACCEPTABLE)
-            else:    
-                user.saves.append(item)
-                user.save()
+                return Response(response_data, status=status.HTTP_400_BAD_REQUEST)
+
+            if change.changed:
                 response_data = {
-                            'result': user.saves,
-                            'message':'item saved',
-                            'status': ResponseStatus.SUCCESS.value
-                    }
+                        'result': change.items,
+                        'message':'item saved',
+                        'status': ResponseStatus.SUCCESS.value
+                }
                 user_id = request.user.id if request.user.is_authenticated else None
                 logger.info(f"Success: {response_data['message']}", extra={'user_id': user_id})
                 return Response(response_data, status=status.HTTP_200_OK)
+            else:
+                response_data = {
+                        'error': f"This pujo is already {change.username}'s saves",
+                        'status': ResponseStatus.FAIL.value
+                }
+                user_id = request.user.id if request.user.is_authenticated else None
+                logger.error(f"Error: {response_data['error']}", extra={'user_id': user_id})
+                return Response(response_data, status=status.HTTP_406_NOT_ACCEPTABLE)
         else:
             response_data = {
-                            'error': serializer.errors,
-                            'status': ResponseStatus.FAIL.value
+                        'error': serializer.errors,
+                        'status': ResponseStatus.FAIL.value
             }
             user_id = request.user.id if request.user.is_authenticated else None
             logger.error(f"Error: {str(response_data['error'])}", extra={'user_id': user_id})
             return Response(response_data, status=status.HTTP_406_NOT_ACCEPTABLE)
-    
 
     def remove_saved(self, request, *args, **kwargs):
         self.check_object_permissions(request, request.user)
@@ -723,58 +805,53 @@ class SaveViewSet(viewsets.ModelViewSet):
 
         if serializer.is_valid():
             user_id = serializer.validated_data['user_id']
-            try:
-                user = User.objects.get(id=user_id)
-            except User.DoesNotExist:
+            item = serializer.validated_data['pujo_id']
+
+            if item is None:
                 response_data = {
-                        "error": "User does not exist",
+                        "error": "No item to save",
                         'status': ResponseStatus.FAIL.value
                 }
                 user_id = request.user.id if request.user.is_authenticated else None
                 logger.error(f"Error: {response_data['error']}", extra={'user_id': user_id})
                 return Response(response_data, status=status.HTTP_400_BAD_REQUEST)
-        
-            item = serializer.validated_data['pujo_id']
-
 
-            if item is None:
+            change = remove_from_collection(user_id, 'saves', item)
+            if change is None:
                 response_data = {
-                    "error": "No item to save",
+                    "error": "User does not exist",
                     'status': ResponseStatus.FAIL.value
                 }
                 user_id = request.user.id if request.user.is_authenticated else None
                 logger.error(f"Error: {response_data['error']}", extra={'user_id': user_id})
                 return Response(response_data, status=status.HTTP_400_BAD_REQUEST)
 
-                
-            if item in user.saves:
-                user.saves.remove(item)
-                user.save()
+            if change.changed:
                 response_data = {
-                'result': user.saves,
-                'message':'Item removed',
-                'status': ResponseStatus.SUCCESS.value
+                        'result': change.items,
+                        'message':'Item removed',
+                        'status': ResponseStatus.SUCCESS.value
                 }
                 user_id = request.user.id if request.user.is_authenticated else None
-                logger.error(f"Error: {response_data['message']}", extra={'user_id': user_id})
+                logger.info(f"Success: {response_data['message']}", extra={'user_id': user_id})
                 return Response(response_data, status=status.HTTP_200_OK)
             else:
                 response_data = {
-                "error": "save item not found",
-                'status': ResponseStatus.FAIL.value
+                        'error': "save item not found",
+                        'status': ResponseStatus.FAIL.value
                 }
                 user_id = request.user.id if request.user.is_authenticated else None
                 logger.error(f"Error: {response_data['error']}", extra={'user_id': user_id})
                 return Response(response_data, status=status.HTTP_400_BAD_REQUEST)
         else:
             response_data = {
-                            'error': serializer.errors,
-                            'status': ResponseStatus.FAIL.value
+                        'error': serializer.errors,
+                        'status': ResponseStatus.FAIL.value
             }
             user_id = request.user.id if request.user.is_authenticated else None
             logger.error(f"Error: {str(response_data['error'])}", extra={'user_id': user_id})
             return Response(response_data, status=status.HTTP_406_NOT_ACCEPTABLE)
-        
+
 class PandalVisitsViewSet(viewsets.ModelViewSet):
     permission_classes = [IsAuthenticatedUser]
     serializer_class = CollectionSerializer
@@ -786,53 +863,158 @@ class PandalVisitsViewSet(viewsets.ModelViewSet):
 
         if serializer.is_valid():
             user_id = serializer.validated_data['user_id']
-            try:
-                user = User.objects.get(id=user_id)
-            except User.DoesNotExist:
+            item = serializer.validated_data['pujo_id']
+
+            if item is None:
                 response_data = {
-                        "error": "User does not exist",
+                        "error": "No pandal visits",
                         'status': ResponseStatus.FAIL.value
                 }
                 user_id = request.user.id if request.user.is_authenticated else None
                 logger.error(f"Error: {response_data['error']}", extra={'user_id': user_id})
                 return Response(response_data, status=status.HTTP_400_BAD_REQUEST)
-        
-            item = serializer.validated_data['pujo_id']
 
-            if item is None:
+            change = add_to_collection(user_id, 'pandal_visits', item)
+            if change is None:
                 response_data = {
-                            "error": "No pandal visits",
-                            'status': ResponseStatus.FAIL.value
+                    "error": "User does not exist",
+                    'status': ResponseStatus.FAIL.value
                 }
                 user_id = request.user.id if request.user.is_authenticated else None
                 logger.error(f"Error: {response_data['error']}", extra={'user_id': user_id})
                 return Response(response_data, status=status.HTTP_400_BAD_REQUEST)
 
+            if not change.pujo_exists:
+                response_data = {
+                    "error": "Pujo does not exist",
+                    'status': ResponseStatus.FAIL.value
+                }
+                user_id = request.user.id if request.user.is_authenticated else None
+                logger.error(f"Error: {response_data['error']}", extra={'user_id': user_id})
+                return Response(response_data, status=status.HTTP_400_BAD_REQUEST)
 
-            if item in user.pandal_visits:
+            if change.changed:
                 response_data = {
-                            'error': f"This pandal has already been visited by {user.username}",
-                            'status': ResponseStatus.FAIL.value
+                        'result': change.items,
+                        'message':'pandal visited by user',
+                        'status': ResponseStatus.SUCCESS.value
+                }
+                user_id = request.user.id if request.user.is_authenticated else None
+                logger.info(f"Success: {response_data['message']}", extra={'user_id': user_id})
+                return Response(response_data, status=status.HTTP_200_OK)
+            else:
+                response_data = {
+                        'error': f"This pandal has already been visited by {change.username}",
+                        'status': ResponseStatus.FAIL.value
                 }
                 user_id = request.user.id if request.user.is_authenticated else None
                 logger.error(f"Error: {response_data['error']}", extra={'user_id': user_id})
                 return Response(response_data, status=status.HTTP_406_NOT_ACCEPTABLE)
-            else:    
-                user.pandal_visits.append(item)
-                user.save()
+        else:
+            response_data = {
+                        'error': serializer.errors,
+                        'status': ResponseStatus.FAIL.value
+            }
+            user_id = request.user.id if request.user.is_authenticated else None
+            logger.error(f"Error: {str(response_data['error'])}", extra={'user_id': user_id})
+            return Response(response_data, status=status.HTTP_406_NOT_ACCEPTABLE)
+
+    def remove_visits(self, request, *args, **kwargs):
+        self.check_object_permissions(request, request.user)
+
+        serializer = CollectionSerializer(data=request.data)
+
+        if serializer.is_valid():
+            user_id = serializer.validated_data['user_id']
+            item = serializer.validated_data['pujo_id']
+
+            if item is None:
                 response_data = {
-                            'result': user.pandal_visits,
-                            'message':'pandal visited by user',
-                            'status': ResponseStatus.SUCCESS.value
-                    }
+                        "error": "No pandal visits",
+                        'status': ResponseStatus.FAIL.value
+                }
+                user_id = request.user.id if request.user.is_authenticated else None
+                logger.error(f"Error: {response_data['error']}", extra={'user_id': user_id})
+                return Response(response_data, status=status.HTTP_400_BAD_REQUEST)
+
+            change = remove_from_collection(user_id, 'pandal_visits', item)
+            if change is None:
+                response_data = {
+                    "error": "User does not exist",
+                    'status': ResponseStatus.FAIL.value
+                }
                 user_id = request.user.id if request.user.is_authenticated else None
-                logger.error(f"Error: {response_data['message']}", extra={'user_id': user_id})
+                logger.error(f"Error: {response_data['error']}", extra={'user_id': user_id})
+                return Response(response_data, status=status.HTTP_400_BAD_REQUEST)
+
+            if change.changed:
+                response_data = {
+                        'result': change.items,
+                        'message':'pandal visit removed',
+                        'status': ResponseStatus.SUCCESS.value
+                }
+                user_id = request.user.id if request.user.is_authenticated else None
+                logger.info(f"Success: {response_data['message']}", extra={'user_id': user_id})
                 return Response(response_data, status=status.HTTP_200_OK)
+            else:
+                response_data = {
+                        'error': "pandal visit not found",
+                        'status': ResponseStatus.FAIL.value
+                }
+                user_id = request.user.id if request.user.is_authenticated else None
+                logger.error(f"Error: {response_data['error']}", extra={'user_id': user_id})
+                return Response(response_data, status=status.HTTP_400_BAD_REQUEST)
         else:
             response_data = {
-                            'error': serializer.errors,
-                            'status': ResponseStatus.FAIL.value
+                        'error': serializer.errors,
+                        'status': ResponseStatus.FAIL.value
             }
             user_id = request.user.id if request.user.is_authenticated else None
             logger.error(f"Error: {str(response_data['error'])}", extra={'user_id': user_id})
-            return Response(response_data, status=status.HTTP_406_NOT_ACCEPTABLE)
\ No newline at end of file
+            return Response(response_data, status=status.HTTP_406_NOT_ACCEPTABLE)
+
+
+class CollectionBatchView(APIView):
+    """Replay collection changes queued by a client while it was offline."""
+    permission_classes = [IsAuthenticatedUser]
+    serializer_class = CollectionBatchSerializer
+
+    def post(self, request):
+        self.check_object_permissions(request, request.user)
+
+        serializer = CollectionBatchSerializer(data=request.data)
+        if not serializer.is_valid():
+            response_data = {
+                'error': serializer.errors,
+                'status': ResponseStatus.FAIL.value
+            }
+            user_id = request.user.id if request.user.is_authenticated else None
+            logger.error(f"Error: {str(response_data['error'])}", extra={'user_id': user_id})
+            return Response(response_data, status=status.HTTP_406_NOT_ACCEPTABLE)
+
+        user_id = serializer.validated_data['user_id']
+        if str(user_id) != str(request.user.id):
+            response_data = {
+                'error': "Collections can only be synced for the logged in user",
+                'status': ResponseStatus.FAIL.value
+            }
+            logger.error(f"Error: {response_data['error']}", extra={'user_id': request.user.id})
+            return Response(response_data, status=status.HTTP_403_FORBIDDEN)
+
+        try:
+            skipped = apply_collection_operations(user_id, serializer.validated_data['operations'])
+            response_data = {
+                'result': user_collections([user_id])[user_id],
+                'skipped': skipped,
+                'message': 'User collections synced',
+                'status': ResponseStatus.SUCCESS.value
+            }
+            logger.info(f"Success: {response_data['message']}", extra={'user_id': request.user.id})
+            return Response(response_data, status=status.HTTP_200_OK)
+        except Exception as e:
+            response_data = {
+                'error': str(e),
+                'status': ResponseStatus.FAIL.value
+            }
+            logger.error(f"Error: {response_data['error']}", extra={'user_id': request.user.id})
+            return Response(response_data, status=status.HTTP_500_INTERNAL_SERVER_ERROR)